@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+"""
+Gunicorn configuration
+
+Usage: gunicorn -c config/gunicorn.py config.wsgi
+
+Workers are synchronous, so each one holds at most one persistent connection
+per database. Their number is capped so that web and Celery workers together
+never open more than DATABASE_MAX_CONNECTIONS connections.
+"""
+import multiprocessing
+import os
+
+max_connections = int(os.environ.get('DATABASE_MAX_CONNECTIONS', 100))
+celery_concurrency = int(
+    os.environ.get('CELERYD_CONCURRENCY', multiprocessing.cpu_count())
+)
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+worker_class = 'sync'
+workers = min(
+    int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1)),
+    max(max_connections - celery_concurrency, 1),
+)
+preload_app = True
+
+
+def post_fork(server, worker):
+    from social_autoscheduler.db.connections import reset_after_fork
+    reset_after_fork()
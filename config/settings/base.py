@@ -61,6 +61,7 @@ THIRD_PARTY_APPS = [
 LOCAL_APPS = [
     # custom users app
     'social_autoscheduler.users.apps.UsersConfig',
+    'social_autoscheduler.db.apps.DatabaseConfig',
     # Your stuff: custom apps go here
     'social_autoscheduler.publication_scheduler.apps.PublicationSchedulerConfig',
 ]
@@ -72,14 +73,22 @@ INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
 # ------------------------------------------------------------------------------
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'social_autoscheduler.db.middleware.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'social_autoscheduler.users.middleware.TimeZoneMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Report the number of database queries of each response in a header, for load
+# tests, see the load_test command
+DB_QUERY_COUNT_HEADER = env.bool('DJANGO_DB_QUERY_COUNT_HEADER', default=False)
+if DB_QUERY_COUNT_HEADER:
+    MIDDLEWARE.insert(0, 'social_autoscheduler.db.middleware.QueryCountMiddleware')
+
 # MIGRATIONS CONFIGURATION
 # ------------------------------------------------------------------------------
 MIGRATION_MODULES = {
@@ -118,7 +127,26 @@ MANAGERS = ADMINS
 DATABASES = {
     'default': env.db('DATABASE_URL', default='postgres:///social_autoscheduler'),
 }
-DATABASES['default']['ATOMIC_REQUESTS'] = True
+# Requests run in autocommit mode, views writing to the database use explicit
+# atomic blocks instead of ATOMIC_REQUESTS
+DATABASES['default']['ATOMIC_REQUESTS'] = False
+# Keep connections open between requests and tasks
+DATABASES['default']['CONN_MAX_AGE'] = env.int('DATABASE_CONN_MAX_AGE', default=60)
+
+# Read replicas, as a comma separated list of database URLs
+for index, replica_url in enumerate(env.list('DATABASE_REPLICA_URLS', default=[])):
+    DATABASES['replica_{0}'.format(index)] = dict(
+        env.db_url_config(replica_url),
+        CONN_MAX_AGE=DATABASES['default']['CONN_MAX_AGE'],
+        TEST={'MIRROR': 'default'},
+    )
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['social_autoscheduler.db.routers.ReplicaRouter']
+# Number of seconds a client reads from the primary after a write, should be
+# greater than the replication lag
+DATABASE_REPLICATION_LAG = env.int('DATABASE_REPLICATION_LAG', default=5)
+# Idle persistent connections are checked before reuse after this many seconds
+DATABASE_HEALTH_CHECK_INTERVAL = env.int('DATABASE_HEALTH_CHECK_INTERVAL', default=30)
 
 
 # GENERAL CONFIGURATION
@@ -251,10 +279,13 @@ AUTH_PASSWORD_VALIDATORS = [
 # AUTHENTICATION CONFIGURATION
 # ------------------------------------------------------------------------------
 AUTHENTICATION_BACKENDS = [
-    'django.contrib.auth.backends.ModelBackend',
-    'allauth.account.auth_backends.AuthenticationBackend',
+    'social_autoscheduler.users.backends.CachedModelBackend',
+    'social_autoscheduler.users.backends.CachedAuthenticationBackend',
 ]
 
+# Sessions are read from the cache, and written through to the database
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
 # Some really nice defaults
 ACCOUNT_AUTHENTICATION_METHOD = 'username'
 ACCOUNT_EMAIL_REQUIRED = True
@@ -280,6 +311,38 @@ if BROKER_URL == 'django://':
     CELERY_RESULT_BACKEND = 'redis://'
 else:
     CELERY_RESULT_BACKEND = BROKER_URL
+# Reuse database connections across tasks instead of closing them after each
+CELERY_DB_REUSE_MAX = env.int('CELERY_DB_REUSE_MAX', default=1000)
+CELERYD_CONCURRENCY = env.int('CELERYD_CONCURRENCY', default=None)
+# Preload the publishing path and freeze it out of the garbage collector before
+# forking worker processes, enabled by the worker settings
+WORKER_PRELOAD = env.bool('WORKER_PRELOAD', default=False)
+CELERYBEAT_SCHEDULE = {
+    'refresh-occurrence-index': {
+        'task': 'social_autoscheduler.publication_scheduler.tasks.refresh_occurrence_index',
+        'schedule': 60 * 60,
+    },
+    'dispatch-due-occurrences': {
+        'task': 'social_autoscheduler.publication_scheduler.tasks.dispatch_due_occurrences',
+        'schedule': 60,
+    },
+    'catch-up-missed-occurrences': {
+        'task': 'social_autoscheduler.publication_scheduler.tasks.catch_up_missed_occurrences',
+        'schedule': 10 * 60,
+    },
+    'poll-engagement': {
+        'task': 'social_autoscheduler.publication_scheduler.tasks.poll_engagement',
+        'schedule': 15 * 60,
+    },
+    'refresh-social-tokens': {
+        'task': 'social_autoscheduler.publication_scheduler.tasks.refresh_social_tokens',
+        'schedule': 5 * 60,
+    },
+    'refresh-media-ids': {
+        'task': 'social_autoscheduler.publication_scheduler.tasks.refresh_media_ids',
+        'schedule': 5 * 60,
+    },
+}
 ########## END CELERY
 
 
@@ -289,3 +352,78 @@ ADMIN_URL = r'^admin/'
 # Your common stuff: Below this line define 3rd party library settings
 # ------------------------------------------------------------------------------
 DJANGO_TABLES2_TEMPLATE = 'django_tables2/bootstrap.html'
+
+# Publication scheduler
+# ------------------------------------------------------------------------------
+# Number of days of upcoming occurrences kept in the occurrence index
+PUBLICATION_SCHEDULER_INDEX_HORIZON = env.int('PUBLICATION_SCHEDULER_INDEX_HORIZON', default=7)
+# Maximum number of occurrences claimed by a single dispatch
+PUBLICATION_SCHEDULER_DISPATCH_BATCH_SIZE = env.int('PUBLICATION_SCHEDULER_DISPATCH_BATCH_SIZE', default=1000)
+# Number of shards of publish events split between sharded dispatcher daemons
+PUBLICATION_SCHEDULER_DISPATCH_SHARDS = env.int('PUBLICATION_SCHEDULER_DISPATCH_SHARDS', default=64)
+# Redis holding the shard leases of sharded dispatcher daemons
+PUBLICATION_SCHEDULER_DISPATCH_REDIS_URL = env('PUBLICATION_SCHEDULER_DISPATCH_REDIS_URL',
+                                               default='redis://127.0.0.1:6379/0')
+# Maximum number of posts per minute and account sent by the dispatcher daemon,
+# 0 for no limit
+PUBLICATION_SCHEDULER_ACCOUNT_RATE = env.int('PUBLICATION_SCHEDULER_ACCOUNT_RATE', default=0)
+# Maximum number of posts per minute and account sent by the dispatcher daemon,
+# by network name, overriding PUBLICATION_SCHEDULER_ACCOUNT_RATE, e.g.
+# Twitter=10,Facebook=30
+PUBLICATION_SCHEDULER_ACCOUNT_RATES = env.dict('PUBLICATION_SCHEDULER_ACCOUNT_RATES', cast={'value': int}, default={})
+# Maximum number of jobs the dispatcher daemon enqueues per tick, 0 for no limit
+PUBLICATION_SCHEDULER_DISPATCH_TICK_BATCH_SIZE = env.int('PUBLICATION_SCHEDULER_DISPATCH_TICK_BATCH_SIZE', default=0)
+# Redis holding the publish jobs delayed until they are due
+PUBLICATION_SCHEDULER_DELAYED_JOBS_REDIS_URL = env('PUBLICATION_SCHEDULER_DELAYED_JOBS_REDIS_URL',
+                                                   default='redis://127.0.0.1:6379/0')
+# Maximum number of retries of a publish job failing on a transient error
+PUBLICATION_SCHEDULER_RETRY_MAX_ATTEMPTS = env.int('PUBLICATION_SCHEDULER_RETRY_MAX_ATTEMPTS', default=8)
+# Number of minutes after which late occurrences are left to the catch-up engine
+PUBLICATION_SCHEDULER_CATCH_UP_GRACE = env.int('PUBLICATION_SCHEDULER_CATCH_UP_GRACE', default=10)
+# Number of hours of missed occurrences looked up by each catch-up
+PUBLICATION_SCHEDULER_CATCH_UP_WINDOW = env.int('PUBLICATION_SCHEDULER_CATCH_UP_WINDOW', default=24)
+# Maximum number of caught up posts per minute and social network
+PUBLICATION_SCHEDULER_CATCH_UP_RATE = env.int('PUBLICATION_SCHEDULER_CATCH_UP_RATE', default=10)
+# Client class used to publish on each social network, by network name
+PUBLICATION_SCHEDULER_NETWORK_CLIENTS = {}
+PUBLICATION_SCHEDULER_DEFAULT_NETWORK_CLIENT = 'social_autoscheduler.publication_scheduler.networks.LoggingClient'
+# Base URL of each social network API used by JSONAPIClient, by network name
+PUBLICATION_SCHEDULER_NETWORK_API_URLS = {}
+# allauth provider of the social accounts posts are published with, by network
+# name
+PUBLICATION_SCHEDULER_NETWORK_PROVIDERS = {}
+# OAuth token endpoint refreshing the tokens of social accounts, by allauth
+# provider
+PUBLICATION_SCHEDULER_TOKEN_REFRESH_URLS = {}
+# Number of minutes ahead of scheduled posts their account tokens are refreshed
+PUBLICATION_SCHEDULER_TOKEN_REFRESH_HORIZON = env.int('PUBLICATION_SCHEDULER_TOKEN_REFRESH_HORIZON', default=30)
+# Maximum number of concurrent token refresh requests
+PUBLICATION_SCHEDULER_TOKEN_REFRESH_CONCURRENCY = env.int('PUBLICATION_SCHEDULER_TOKEN_REFRESH_CONCURRENCY', default=8)
+# Number of seconds access tokens are kept in the memory of worker processes
+PUBLICATION_SCHEDULER_TOKEN_CACHE_TTL = env.int('PUBLICATION_SCHEDULER_TOKEN_CACHE_TTL', default=300)
+# Redis sharing the concurrency limits and circuit breakers of social networks
+# between workers, requests are not limited without it
+PUBLICATION_SCHEDULER_NETWORK_LIMITS_REDIS_URL = env('PUBLICATION_SCHEDULER_NETWORK_LIMITS_REDIS_URL',
+                                                     default=None)
+# Maximum number of concurrent requests to a social network
+PUBLICATION_SCHEDULER_NETWORK_MAX_CONCURRENCY = env.int('PUBLICATION_SCHEDULER_NETWORK_MAX_CONCURRENCY', default=20)
+# Number of milliseconds above which a social network response is slow
+PUBLICATION_SCHEDULER_NETWORK_LATENCY_THRESHOLD = env.int('PUBLICATION_SCHEDULER_NETWORK_LATENCY_THRESHOLD',
+                                                          default=5000)
+# Percentage of failed requests above which the circuit breaker of a social
+# network opens
+PUBLICATION_SCHEDULER_NETWORK_ERROR_THRESHOLD = env.int('PUBLICATION_SCHEDULER_NETWORK_ERROR_THRESHOLD', default=50)
+# Number of seconds an open circuit breaker rejects requests before probing
+PUBLICATION_SCHEDULER_NETWORK_BREAKER_COOLDOWN = env.int('PUBLICATION_SCHEDULER_NETWORK_BREAKER_COOLDOWN', default=30)
+# Number of days during which engagement of published posts is polled
+PUBLICATION_SCHEDULER_ENGAGEMENT_WINDOW = env.int('PUBLICATION_SCHEDULER_ENGAGEMENT_WINDOW', default=7)
+# Maximum number of posts whose engagement is pulled with a single request
+PUBLICATION_SCHEDULER_ENGAGEMENT_BATCH_SIZE = env.int('PUBLICATION_SCHEDULER_ENGAGEMENT_BATCH_SIZE', default=100)
+# Exports with more rows are written to the storage by a task instead of streamed
+PUBLICATION_SCHEDULER_EXPORT_STREAM_LIMIT = env.int('PUBLICATION_SCHEDULER_EXPORT_STREAM_LIMIT', default=100000)
+# Render steps applied to publication contents, by network name
+PUBLICATION_SCHEDULER_RENDER_PIPELINES = {
+    'Twitter': [
+        ('social_autoscheduler.publication_scheduler.rendering.truncate', {'length': 280}),
+    ],
+}
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""
+Worker Configurations
+
+- Production settings without the apps only used to serve pages
+- Preload the publishing path before forking worker processes
+
+Run workers with DJANGO_SETTINGS_MODULE=config.settings.worker
+"""
+from __future__ import absolute_import, unicode_literals
+
+from .production import *  # noqa
+
+# APP CONFIGURATION
+# ------------------------------------------------------------------------------
+# Apps with templates, admin, static files or authentication views, none of
+# which a task renders or uses. allauth apps are kept for the social account
+# tokens posts are published with.
+WORKER_UNUSED_APPS = [
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+    'django.contrib.admin',
+    'crispy_forms',
+    'categories.editor',
+    'django_tables2',
+    'gunicorn',
+    'collectfast',
+]
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in WORKER_UNUSED_APPS]
+
+MIDDLEWARE = []
+
+# CELERY
+# ------------------------------------------------------------------------------
+WORKER_PRELOAD = env.bool('WORKER_PRELOAD', default=True)
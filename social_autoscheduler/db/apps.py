@@ -0,0 +1,22 @@
+from django.apps import AppConfig
+
+
+class DatabaseConfig(AppConfig):
+    name = 'social_autoscheduler.db'
+    verbose_name = 'Database'
+
+    def ready(self):
+        """Connects persistent connections management to request and Celery
+        task signals.
+        """
+        from celery import signals as celery_signals
+        from django.core import signals
+        from django.db.backends.signals import connection_created
+
+        from social_autoscheduler.db import connections
+
+        connection_created.connect(connections.on_connection_created)
+        signals.request_started.connect(connections.on_work_started)
+        signals.request_finished.connect(connections.on_work_finished)
+        celery_signals.task_prerun.connect(connections.on_work_started)
+        celery_signals.task_postrun.connect(connections.on_work_finished)
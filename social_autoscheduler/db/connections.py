@@ -0,0 +1,185 @@
+"""Management of persistent database connections.
+
+Connections are kept open between requests and Celery tasks for
+`CONN_MAX_AGE` seconds. Before a connection is reused after being idle for
+more than `DATABASE_HEALTH_CHECK_INTERVAL` seconds, it is checked and replaced
+if the server closed it. The total number of connections is capped by sizing
+web and Celery workers against `DATABASE_MAX_CONNECTIONS`, see
+`config/gunicorn.py`.
+
+Connections are opened lazily, by the first query of a request or task.
+Connection usage is counted in process and added to the shared cache every
+`STATS_FLUSH_INTERVAL` seconds, so that counting takes no round trip on the
+hot path, see `get_stats`.
+"""
+import collections
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+from social_autoscheduler.publication_scheduler.caching import (
+    incr_shared_counter,
+)
+
+logger = logging.getLogger(__name__)
+
+STATS_PREFIX = 'db_connections'
+
+STATS = (
+    'opened',
+    'reused',
+    'health_check_failures',
+    'wait_time_ms',
+)
+
+# Number of seconds between two additions of the in-process counters to the
+# shared ones.
+STATS_FLUSH_INTERVAL = 10
+
+state = threading.local()
+
+local_stats = collections.Counter()
+local_stats_lock = threading.Lock()
+local_stats_flushed_at = [time.monotonic()]
+
+# Connections inherited from a parent process. They are kept referenced so
+# that garbage collection never closes them: closing would terminate the
+# parent's database session.
+inherited_connections = []
+
+
+def incr_stat(name, value=1):
+    """Increments an in-process connection usage counter.
+    """
+    with local_stats_lock:
+        local_stats[name] += value
+
+
+def flush_stats(force=False):
+    """Adds the in-process counters to the shared ones, at most once every
+    `STATS_FLUSH_INTERVAL` seconds unless forced.
+    """
+    now = time.monotonic()
+    with local_stats_lock:
+        if not force and now - local_stats_flushed_at[0] < STATS_FLUSH_INTERVAL:
+            return
+        stats = dict(local_stats)
+        local_stats.clear()
+        local_stats_flushed_at[0] = now
+    for name, value in stats.items():
+        # Shared counters only hold integers.
+        if int(value):
+            incr_shared_counter(
+                '{0}:{1}'.format(STATS_PREFIX, name),
+                int(value)
+            )
+
+
+def get_stats():
+    """Returns the shared connection usage counters, including the ones of
+    the current process.
+
+    Returns:
+        dict: the counters by name, plus the mean time spent making
+            connections usable per request or task in `mean_wait_time_ms`, and
+            the share of requests and tasks which reused a connection in
+            `reuse_ratio`.
+    """
+    flush_stats(force=True)
+    values = cache.get_many(
+        ['{0}:{1}'.format(STATS_PREFIX, name) for name in STATS]
+    )
+    stats = dict(
+        (name, values.get('{0}:{1}'.format(STATS_PREFIX, name), 0))
+        for name in STATS
+    )
+    work = stats['opened'] + stats['reused']
+    stats['mean_wait_time_ms'] = stats['wait_time_ms'] / work if work else 0
+    stats['reuse_ratio'] = stats['reused'] / work if work else 0
+    return stats
+
+
+def get_last_used():
+    if not hasattr(state, 'last_used'):
+        state.last_used = {}
+    return state.last_used
+
+
+def check_connections():
+    """Prepares the database connections of the current thread for use.
+
+    Obsolete connections are closed and idle ones are health checked,
+    counting the time it takes. Missing connections are left to be opened by
+    the first query, and connections in a transaction, e.g. of the test
+    client, are left alone.
+    """
+    last_used = get_last_used()
+    now = time.monotonic()
+    reused = connections['default'].connection is not None
+    for connection in connections.all():
+        if connection.in_atomic_block:
+            continue
+        connection.close_if_unusable_or_obsolete()
+        if connection.connection is None:
+            continue
+        idle = now - last_used.get(connection.alias, now)
+        if (idle > settings.DATABASE_HEALTH_CHECK_INTERVAL and
+                not connection.is_usable()):
+            logger.warning('Closing unusable connection to %s', connection.alias)
+            incr_stat('health_check_failures')
+            connection.close()
+    if reused and connections['default'].connection is not None:
+        incr_stat('reused')
+    incr_stat('wait_time_ms', (time.monotonic() - now) * 1000)
+
+
+def release_connections():
+    """Records connections last use, and closes the obsolete ones which
+    are not in a transaction.
+    """
+    last_used = get_last_used()
+    now = time.monotonic()
+    for connection in connections.all():
+        if connection.in_atomic_block:
+            continue
+        connection.close_if_unusable_or_obsolete()
+        if connection.connection is not None:
+            last_used[connection.alias] = now
+    flush_stats()
+
+
+def reset_after_fork():
+    """Drops database connections inherited from a parent process.
+
+    Call this in a freshly forked process, e.g. from a gunicorn `post_fork`
+    hook, so that parent and child never share a database socket. Celery
+    prefork workers are handled by Celery's Django fixup.
+    """
+    for connection in connections.all():
+        if connection.connection is not None:
+            inherited_connections.append(connection.connection)
+            connection.connection = None
+    get_last_used().clear()
+
+
+def on_connection_created(sender, connection, **kwargs):
+    """Signal receiver called when a database connection is opened.
+    """
+    if connection.alias == 'default':
+        incr_stat('opened')
+
+
+def on_work_started(**kwargs):
+    """Signal receiver called when a request or a Celery task starts.
+    """
+    check_connections()
+
+
+def on_work_finished(**kwargs):
+    """Signal receiver called when a request or a Celery task finishes.
+    """
+    release_connections()
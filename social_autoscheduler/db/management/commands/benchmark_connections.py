@@ -0,0 +1,61 @@
+import multiprocessing
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from social_autoscheduler.db import connections as db_connections
+
+
+def run_tasks(tasks, persistent):
+    """Runs `tasks` simulated tasks, each one running a single query.
+
+    Returns:
+        float: the elapsed time, in seconds.
+    """
+    db_connections.reset_after_fork()
+    connection = connections['default']
+    connection.settings_dict['CONN_MAX_AGE'] = None if persistent else 0
+    started_at = time.perf_counter()
+    for _ in range(tasks):
+        db_connections.on_work_started()
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+        db_connections.on_work_finished()
+    elapsed = time.perf_counter() - started_at
+    connection.close()
+    db_connections.flush_stats(force=True)
+    return elapsed
+
+
+class Command(BaseCommand):
+    help = (
+        'Load tests the database with simulated tasks from several processes, '
+        'with and without persistent connections.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=1000,
+                            help='Number of tasks per process and mode.')
+        parser.add_argument('--processes', type=int, default=4,
+                            help='Number of worker processes.')
+
+    def handle(self, *args, **options):
+        connections.close_all()
+        for persistent in (False, True):
+            with multiprocessing.Pool(options['processes']) as pool:
+                elapsed = pool.starmap(
+                    run_tasks,
+                    [(options['tasks'], persistent)] * options['processes']
+                )
+            total_tasks = options['tasks'] * options['processes']
+            self.stdout.write(
+                '{mode}: {rate:.0f} tasks/s'.format(
+                    mode='persistent' if persistent else 'one connection per task',
+                    rate=total_tasks / max(elapsed),
+                )
+            )
+        self.stdout.write('Connection stats: {0}'.format(
+            db_connections.get_stats()
+        ))
@@ -0,0 +1,67 @@
+from django.conf import settings
+from django.db import connections
+
+from social_autoscheduler.db.routers import replica_reads
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+PIN_COOKIE_NAME = 'db_primary_pin'
+
+QUERY_COUNT_HEADER = 'X-DB-Query-Count'
+
+
+class ReplicaRoutingMiddleware(object):
+    """Middleware enabling replica reads for read-only requests.
+
+    A client which just sent a write request is pinned to the primary database
+    for `DATABASE_REPLICATION_LAG` seconds with a cookie, so that it reads its
+    own writes even if replicas are lagging behind.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        is_write = request.method not in SAFE_METHODS
+        is_pinned = is_write or PIN_COOKIE_NAME in request.COOKIES
+        with replica_reads(not is_pinned):
+            response = self.get_response(request)
+        if is_write:
+            response.set_cookie(
+                PIN_COOKIE_NAME,
+                '1',
+                max_age=settings.DATABASE_REPLICATION_LAG,
+                httponly=True
+            )
+        return response
+
+
+class QueryCountMiddleware(object):
+    """Middleware reporting the number of database queries of each response.
+
+    Queries of every database are counted, and the total is sent in the
+    `X-DB-Query-Count` header, read by load tests. Queries are recorded even
+    when `DEBUG` is off, so only enable this middleware for load tests, with
+    `DJANGO_DB_QUERY_COUNT_HEADER`.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        databases = connections.all()
+        debug_cursors = [
+            connection.force_debug_cursor for connection in databases
+        ]
+        for connection in databases:
+            connection.queries_log.clear()
+            connection.force_debug_cursor = True
+        try:
+            response = self.get_response(request)
+        finally:
+            for connection, debug_cursor in zip(databases, debug_cursors):
+                connection.force_debug_cursor = debug_cursor
+        response[QUERY_COUNT_HEADER] = str(sum(
+            len(connection.queries_log) for connection in databases
+        ))
+        return response
@@ -0,0 +1,66 @@
+"""Routing of read queries to database replicas.
+
+Reads go to the primary database unless replica reads are enabled for the
+current thread, either by `ReplicaRoutingMiddleware` for read-only requests or
+explicitly with the `replica_reads` context manager, e.g. for reporting
+queries. Writes always go to the primary, and so does everything running in
+Celery workers, such as the dispatcher.
+"""
+import contextlib
+import random
+import threading
+
+from django.conf import settings
+
+PRIMARY = 'default'
+
+state = threading.local()
+
+
+def replica_reads_enabled():
+    """Tells whether replica reads are enabled for the current thread.
+    """
+    return getattr(state, 'replica_reads', False)
+
+
+@contextlib.contextmanager
+def replica_reads(enabled=True):
+    """Context manager enabling or disabling replica reads.
+
+    Args:
+        enabled (bool): `False` to force reads on the primary database.
+    """
+    previous = replica_reads_enabled()
+    state.replica_reads = enabled
+    try:
+        yield
+    finally:
+        state.replica_reads = previous
+
+
+class ReplicaRouter(object):
+    """Database router sending reads to the replicas listed in the
+    `DATABASE_REPLICAS` setting, when replica reads are enabled.
+    """
+
+    def db_for_read(self, model, **hints):
+        """Picks a random replica, or the primary if replica reads are
+        disabled or no replica is configured.
+        """
+        if replica_reads_enabled() and settings.DATABASE_REPLICAS:
+            return random.choice(settings.DATABASE_REPLICAS)
+        return PRIMARY
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        """Allows relations between objects, replicas hold the same data as
+        the primary.
+        """
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        """Only migrates the primary database, replicas follow it.
+        """
+        return db == PRIMARY
@@ -0,0 +1,63 @@
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import TransactionTestCase, override_settings
+
+from ..connections import (
+    check_connections,
+    flush_stats,
+    get_stats,
+    inherited_connections,
+    release_connections,
+    reset_after_fork,
+)
+
+
+class TestPersistentConnections(TransactionTestCase):
+
+    def setUp(self):
+        flush_stats(force=True)
+        cache.clear()
+        connection.close()
+
+    def run_work(self):
+        check_connections()
+        connection.ensure_connection()
+        release_connections()
+
+    def test_connection_is_opened_once(self):
+        self.run_work()
+        self.run_work()
+        stats = get_stats()
+        self.assertEqual(stats['opened'], 1)
+        self.assertEqual(stats['reused'], 1)
+        self.assertEqual(stats['reuse_ratio'], 0.5)
+
+    def test_connection_is_opened_lazily(self):
+        check_connections()
+        self.assertIsNone(connection.connection)
+
+    def test_connections_in_transaction_are_kept(self):
+        with transaction.atomic():
+            check_connections()
+            release_connections()
+            self.assertIsNotNone(connection.connection)
+            self.assertTrue(connection.is_usable())
+
+    @override_settings(DATABASE_HEALTH_CHECK_INTERVAL=-1)
+    def test_unusable_connection_is_replaced(self):
+        self.run_work()
+        connection.connection.close()
+        check_connections()
+        self.assertEqual(get_stats()['health_check_failures'], 1)
+        self.assertIsNone(connection.connection)
+        connection.ensure_connection()
+        self.assertTrue(connection.is_usable())
+
+    def test_reset_after_fork_drops_connections(self):
+        connection.ensure_connection()
+        inherited = connection.connection
+        reset_after_fork()
+        self.assertIsNone(connection.connection)
+        self.assertFalse(inherited.closed)
+        inherited_connections.remove(inherited)
+        inherited.close()
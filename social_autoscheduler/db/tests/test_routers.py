@@ -0,0 +1,74 @@
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    override_settings,
+)
+
+from ..middleware import (
+    PIN_COOKIE_NAME,
+    QUERY_COUNT_HEADER,
+    QueryCountMiddleware,
+    ReplicaRoutingMiddleware,
+)
+from ..routers import ReplicaRouter, replica_reads, replica_reads_enabled
+
+
+@override_settings(DATABASE_REPLICAS=['replica_0'])
+class TestReplicaRouter(SimpleTestCase):
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def test_reads_use_primary_by_default(self):
+        self.assertEqual(self.router.db_for_read(None), 'default')
+
+    def test_reads_use_replica_when_enabled(self):
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(None), 'replica_0')
+            self.assertEqual(self.router.db_for_write(None), 'default')
+        self.assertFalse(replica_reads_enabled())
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_reads_use_primary_without_replicas(self):
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(None), 'default')
+
+
+class TestReplicaRoutingMiddleware(SimpleTestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.middleware = ReplicaRoutingMiddleware(self.get_response)
+
+    def get_response(self, request):
+        self.replica_reads = replica_reads_enabled()
+        return HttpResponse()
+
+    def test_get_enables_replica_reads(self):
+        self.middleware(self.factory.get('/'))
+        self.assertTrue(self.replica_reads)
+
+    def test_post_pins_client_to_primary(self):
+        response = self.middleware(self.factory.post('/'))
+        self.assertFalse(self.replica_reads)
+        self.assertIn(PIN_COOKIE_NAME, response.cookies)
+        request = self.factory.get('/')
+        request.COOKIES[PIN_COOKIE_NAME] = '1'
+        self.middleware(request)
+        self.assertFalse(self.replica_reads)
+
+
+class TestQueryCountMiddleware(TestCase):
+
+    def get_response(self, request):
+        list(get_user_model().objects.all())
+        get_user_model().objects.count()
+        return HttpResponse()
+
+    def test_counts_queries(self):
+        middleware = QueryCountMiddleware(self.get_response)
+        response = middleware(RequestFactory().get('/'))
+        self.assertEqual(response[QUERY_COUNT_HEADER], '2')
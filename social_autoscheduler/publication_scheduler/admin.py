@@ -1,3 +1,60 @@
 from django.contrib import admin
 
-# Register your models here.
+from social_autoscheduler.publication_scheduler.models import (
+    BlackoutWindow,
+    Category,
+    SocialNetwork,
+)
+from social_autoscheduler.publication_scheduler.occurrences import (
+    set_paused,
+    update_suppression,
+)
+
+
+def pause(modeladmin, request, queryset):
+    """Admin action pausing the selected categories or social networks.
+    """
+    for instance in queryset:
+        set_paused(instance, True)
+
+
+pause.short_description = 'Pause selected items'
+
+
+def resume(modeladmin, request, queryset):
+    """Admin action resuming the selected categories or social networks.
+    """
+    for instance in queryset:
+        set_paused(instance, False)
+
+
+resume.short_description = 'Resume selected items'
+
+
+@admin.register(SocialNetwork)
+class SocialNetworkAdmin(admin.ModelAdmin):
+    list_display = ('name', 'is_paused')
+    actions = [pause, resume]
+
+
+@admin.register(Category)
+class CategoryAdmin(admin.ModelAdmin):
+    list_display = ('name', 'created_by', 'is_paused')
+    actions = [pause, resume]
+
+
+@admin.register(BlackoutWindow)
+class BlackoutWindowAdmin(admin.ModelAdmin):
+    list_display = ('created_by', 'start', 'end', 'category', 'social_network')
+
+    def save_model(self, request, obj, form, change):
+        """Saves the window then updates the suppressed occurrences.
+        """
+        super().save_model(request, obj, form, change)
+        update_suppression(publish_event__creator=obj.created_by)
+
+    def delete_model(self, request, obj):
+        """Deletes the window then releases the occurrences it suppressed.
+        """
+        super().delete_model(request, obj)
+        update_suppression(publish_event__creator=obj.created_by)
@@ -4,3 +4,14 @@ from django.apps import AppConfig
 class PublicationSchedulerConfig(AppConfig):
     name = 'social_autoscheduler.publication_scheduler'
     verbose_name = "Publication scheduler"
+
+    def ready(self):
+        """Connects the invalidation of cached rotation samplers.
+        """
+        from django.db.models.signals import post_delete, post_save
+
+        from .models import Publication
+        from .rotation import invalidate_sampler
+
+        post_save.connect(invalidate_sampler, sender=Publication)
+        post_delete.connect(invalidate_sampler, sender=Publication)
@@ -0,0 +1,158 @@
+"""Two-level caching helpers.
+
+Values are first looked up in a small in-process LRU, then in the default
+Django cache (Redis in production), which is shared by every web and Celery
+worker.
+"""
+import collections
+import threading
+
+from django.core.cache import cache
+
+
+def incr_shared_counter(key, value=1):
+    """Increments a counter of the shared cache, which never expires.
+    """
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key, value)
+    except ValueError:
+        # Evicted between add and incr, the increment is lost.
+        pass
+
+
+class LRUCache(object):
+    """Thread-safe in-process cache evicting the least recently used keys.
+
+    Attributes:
+        maxsize (int): maximum number of cached keys.
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.data = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Returns the value cached for `key`, or `default` if missing.
+        """
+        with self.lock:
+            try:
+                self.data.move_to_end(key)
+            except KeyError:
+                return default
+            return self.data[key]
+
+    def set(self, key, value):
+        """Caches `value` for `key`, evicting the oldest key if full.
+        """
+        with self.lock:
+            self.data[key] = value
+            self.data.move_to_end(key)
+            if len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+    def delete(self, key):
+        """Removes `key` from the cache, if present.
+        """
+        with self.lock:
+            self.data.pop(key, None)
+
+    def clear(self):
+        """Removes every key from the cache.
+        """
+        with self.lock:
+            self.data.clear()
+
+
+class TieredCache(object):
+    """In-process LRU cache backed by the shared Django cache.
+
+    Keys are tuples, joined with `:` and prefixed to build the shared cache
+    keys. Usage statistics are counted in the shared cache, so they aggregate
+    every process.
+
+    Attributes:
+        prefix (str): prefix of the shared cache keys.
+        timeout (int): shared cache timeout in seconds, `None` to use the
+            cache default.
+        local (:obj:`LRUCache`): the in-process cache.
+    """
+
+    def __init__(self, prefix, maxsize=1024, timeout=None):
+        self.prefix = prefix
+        self.timeout = timeout
+        self.local = LRUCache(maxsize)
+
+    def make_key(self, key):
+        """Builds the shared cache key of a tuple key.
+
+        Returns:
+            str: the shared cache key.
+        """
+        return ':'.join([self.prefix] + [str(part) for part in key])
+
+    def get(self, key, default=None):
+        """Returns the value cached for `key`, or `default` if missing.
+
+        Values found in the shared cache are copied to the local cache.
+        """
+        value = self.local.get(key)
+        if value is not None:
+            return value
+        value = cache.get(self.make_key(key))
+        if value is None:
+            return default
+        self.local.set(key, value)
+        return value
+
+    def set(self, key, value, timeout=None):
+        """Caches `value` for `key` in both levels.
+        """
+        self.local.set(key, value)
+        cache.set(self.make_key(key), value, timeout or self.timeout)
+
+    def delete(self, key):
+        """Removes `key` from both levels.
+
+        Note:
+            Only the local cache of the current process is cleared, other
+            processes keep their copy until it is evicted.
+        """
+        self.local.delete(key)
+        cache.delete(self.make_key(key))
+
+    def incr_stat(self, name):
+        """Increments a shared usage counter, e.g. `hits` or `misses`.
+        """
+        incr_shared_counter(self.make_key(('stats', name)))
+
+    def get_stats(self, *names):
+        """Returns shared usage counters.
+
+        Returns:
+            dict: the counter values, by name.
+        """
+        keys = dict((self.make_key(('stats', name)), name) for name in names)
+        values = cache.get_many(list(keys))
+        return dict(
+            (name, values.get(key, 0)) for key, name in keys.items()
+        )
+
+    def get_or_set(self, key, compute, timeout=None):
+        """Returns the value cached for `key`, computing it if missing.
+
+        Args:
+            key (tuple): the cache key.
+            compute (callable): called without arguments to compute a missing
+                value.
+            timeout (int): shared cache timeout, in seconds.
+
+        Returns:
+            the cached or computed value.
+        """
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.set(key, value, timeout)
+        return value
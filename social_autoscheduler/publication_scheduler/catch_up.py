@@ -0,0 +1,253 @@
+"""Catch-up of occurrences missed while publishing was down.
+
+The dispatcher only claims occurrences due within the last
+`PUBLICATION_SCHEDULER_CATCH_UP_GRACE` minutes, older ones are left here. The
+occurrences expected from the event rules over a time range are diffed
+against the publish log, and the ones which were never published are handled
+according to the catch-up policy of their category. Handled occurrences get a
+`caught_up_at` timestamp, so missed publications can be listed afterwards and
+are never caught up twice.
+
+Claimed occurrences are never missed, even without a published post: their
+jobs may still be waiting in the dispatcher, which also holds them in the
+delayed job queue in case it crashes, in the delayed job queue or the broker,
+or have failed after the network may have created the post.
+
+Jobs of the occurrences posted late are spread over time with a token bucket
+per social network, so a restart after an outage does not flood the networks.
+Jobs which are not due yet wait in the delayed job queue.
+"""
+import collections
+import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from social_autoscheduler.publication_scheduler.delayed_jobs import (
+    get_delayed_queue,
+)
+from social_autoscheduler.publication_scheduler.models import (
+    Category,
+    PublishedPost,
+    PublishEvent,
+    ScheduledOccurrence,
+)
+from social_autoscheduler.publication_scheduler.occurrences import (
+    BULK_BATCH_SIZE,
+    get_expected_occurrences,
+)
+from social_autoscheduler.publication_scheduler.publishing import (
+    get_claimed_jobs,
+)
+from social_autoscheduler.publication_scheduler.throttling import TokenBucket
+
+CatchUpReport = collections.namedtuple(
+    'CatchUpReport',
+    ['missed', 'caught_up', 'jobs']
+)
+
+
+def get_catch_up_grace():
+    """Returns how long the dispatcher keeps claiming late occurrences.
+
+    Returns:
+        :obj:`datetime.timedelta`: the grace period.
+    """
+    return datetime.timedelta(
+        minutes=settings.PUBLICATION_SCHEDULER_CATCH_UP_GRACE
+    )
+
+
+def find_missed_occurrences(start, end):
+    """Lists the occurrences of a time range which were never published.
+
+    Suppressed, claimed and already caught up occurrences are ignored.
+
+    Args:
+        start (:obj:`datetime.datetime`): beginning of the range.
+        end (:obj:`datetime.datetime`): end of the range, excluded.
+
+    Returns:
+        list: `(publish_event_pk, fire_at, excluded_social_networks)` tuples,
+            by fire time.
+    """
+    expected = get_expected_occurrences(start, end)
+    published = set(PublishedPost.objects.filter(
+        occurrence__fire_at__gte=start,
+        occurrence__fire_at__lt=end,
+    ).values_list('occurrence__publish_event', 'occurrence__fire_at'))
+    handled = set(ScheduledOccurrence.objects.filter(
+        Q(caught_up_at__isnull=False) | Q(claimed_at__isnull=False),
+        fire_at__gte=start,
+        fire_at__lt=end,
+    ).values_list('publish_event', 'fire_at'))
+    return sorted(
+        (
+            (event_pk, fire_at, excluded)
+            for (event_pk, fire_at), (is_suppressed, excluded)
+            in expected.items()
+            if not is_suppressed and
+            (event_pk, fire_at) not in published and
+            (event_pk, fire_at) not in handled
+        ),
+        key=lambda missed_occurrence: missed_occurrence[1]
+    )
+
+
+def select_late_posts(missed):
+    """Applies the catch-up policy of each category to missed occurrences.
+
+    Args:
+        missed (list): `(publish_event_pk, fire_at, excluded_social_networks)`
+            tuples, by fire time.
+
+    Returns:
+        set: `(publish_event_pk, fire_at)` keys of the occurrences to post
+            late.
+    """
+    policies = dict(PublishEvent.objects.filter(
+        pk__in=set(event_pk for event_pk, _, _ in missed)
+    ).values_list('pk', 'category__catch_up_policy'))
+    late = set()
+    last_missed = {}
+    for event_pk, fire_at, _ in missed:
+        policy = policies.get(event_pk, Category.SKIP)
+        if policy == Category.POST_LATE:
+            late.add((event_pk, fire_at))
+        elif policy == Category.COMPRESS:
+            last_missed[event_pk] = fire_at
+    late.update(last_missed.items())
+    return late
+
+
+def mark_caught_up(missed, late, now):
+    """Records missed occurrences in the index and claims the ones posted late.
+
+    Args:
+        missed (list): `(publish_event_pk, fire_at, excluded_social_networks)`
+            tuples.
+        late (set): `(publish_event_pk, fire_at)` keys of the occurrences to
+            post late.
+        now (:obj:`datetime.datetime`): current time.
+
+    Returns:
+        (int, list): the number of caught up occurrences, and primary keys of
+            the claimed ones. Occurrences locked by a concurrent catch-up, or
+            claimed since they were found missed, are left alone.
+    """
+    start, end = missed[0][1], missed[-1][1]
+    with transaction.atomic():
+        existing = set(ScheduledOccurrence.objects.filter(
+            publish_event__in=set(event_pk for event_pk, _, _ in missed),
+            fire_at__gte=start,
+            fire_at__lte=end,
+        ).values_list('publish_event', 'fire_at'))
+        ScheduledOccurrence.objects.bulk_create(
+            [
+                ScheduledOccurrence(
+                    publish_event_id=event_pk,
+                    fire_at=fire_at,
+                    excluded_social_networks=excluded,
+                )
+                for event_pk, fire_at, excluded in missed
+                if (event_pk, fire_at) not in existing
+            ],
+            batch_size=BULK_BATCH_SIZE
+        )
+        keys = set((event_pk, fire_at) for event_pk, fire_at, _ in missed)
+        pending = ScheduledOccurrence.objects.select_for_update(
+            skip_locked=True
+        ).filter(
+            publish_event__in=set(event_pk for event_pk, _ in keys),
+            fire_at__gte=start,
+            fire_at__lte=end,
+            caught_up_at__isnull=True,
+            claimed_at__isnull=True,
+        )
+        locked = [
+            (pk, (event_pk, fire_at))
+            for pk, event_pk, fire_at
+            in pending.values_list('pk', 'publish_event', 'fire_at')
+            if (event_pk, fire_at) in keys
+        ]
+        caught_up_pks = [pk for pk, _ in locked]
+        late_pks = [pk for pk, key in locked if key in late]
+        ScheduledOccurrence.objects.filter(
+            pk__in=caught_up_pks
+        ).update(caught_up_at=now)
+        ScheduledOccurrence.objects.filter(
+            pk__in=late_pks
+        ).update(claimed_at=now)
+    return len(caught_up_pks), late_pks
+
+
+def schedule_jobs(jobs, now, rate=None):
+    """Spreads jobs over time to respect a rate per social network.
+
+    Args:
+        jobs (list): the `PublishJob` instances to run.
+        now (:obj:`datetime.datetime`): current time.
+        rate (int): maximum number of posts per minute and social network,
+            defaults to `PUBLICATION_SCHEDULER_CATCH_UP_RATE` setting. Up to
+            one minute worth of posts is sent at once.
+
+    Returns:
+        list: `(job, eta)` tuples, `eta` being the time the job may run at.
+    """
+    rate = rate or settings.PUBLICATION_SCHEDULER_CATCH_UP_RATE
+    timestamp = now.timestamp()
+    buckets = {}
+    schedule = []
+    for job in jobs:
+        if job.social_network_pk not in buckets:
+            buckets[job.social_network_pk] = TokenBucket(
+                rate / 60,
+                rate,
+                now=timestamp
+            )
+        eta = buckets[job.social_network_pk].reserve(now=timestamp)
+        schedule.append(
+            (job, datetime.datetime.fromtimestamp(eta, tz=timezone.utc))
+        )
+    return schedule
+
+
+def catch_up(start=None, end=None, now=None):
+    """Catches up occurrences missed over a time range.
+
+    Args:
+        start (:obj:`datetime.datetime`): beginning of the range, defaults to
+            `PUBLICATION_SCHEDULER_CATCH_UP_WINDOW` hours before its end.
+        end (:obj:`datetime.datetime`): end of the range, defaults to and
+            capped at the beginning of the dispatcher grace period.
+        now (:obj:`datetime.datetime`): defaults to current time.
+
+    Returns:
+        :obj:`CatchUpReport`: the number of missed and caught up occurrences,
+            and of enqueued jobs.
+    """
+    from social_autoscheduler.publication_scheduler.tasks import publish_job
+
+    now = now or timezone.now()
+    grace_start = now - get_catch_up_grace()
+    end = min(end or grace_start, grace_start)
+    start = start or end - datetime.timedelta(
+        hours=settings.PUBLICATION_SCHEDULER_CATCH_UP_WINDOW
+    )
+    missed = find_missed_occurrences(start, end)
+    if not missed:
+        return CatchUpReport(0, 0, 0)
+
+    caught_up, late_pks = mark_caught_up(missed, select_late_posts(missed), now)
+    schedule = schedule_jobs(get_claimed_jobs(late_pks), now)
+    delayed = []
+    for job, eta in schedule:
+        if eta <= now:
+            publish_job.delay(job)
+        else:
+            delayed.append((job, eta.timestamp()))
+    if delayed:
+        get_delayed_queue().add_many(delayed)
+    return CatchUpReport(len(missed), caught_up, len(schedule))
@@ -0,0 +1,285 @@
+"""Publish jobs delayed in a Redis sorted set until they are due.
+
+Celery delivers `countdown` and `eta` messages to workers right away, which
+keep them in memory until due, so a large backlog of delayed jobs exhausts
+the workers. Delayed jobs are instead added to a sorted set scored by due
+timestamp, and a `DelayedJobMover` process promotes the due ones to the
+publish queue in batches: workers only ever receive jobs they can run now.
+
+Jobs failing on a transient network error are retried through the sorted
+set, after an exponential backoff with jitter, up to
+`PUBLICATION_SCHEDULER_RETRY_MAX_ATTEMPTS` attempts.
+"""
+import json
+import logging
+import random
+import time
+import uuid
+
+import redis
+import requests
+from django.conf import settings
+
+from social_autoscheduler.publication_scheduler.network_limits import (
+    NetworkUnavailable,
+)
+
+logger = logging.getLogger(__name__)
+
+DELAYED_KEY = 'publish:delayed'
+
+# Delay of the first retry, doubled by each attempt, in seconds.
+RETRY_BASE_DELAY = 5
+
+# Maximum delay between two attempts, in seconds.
+RETRY_MAX_DELAY = 60 * 60
+
+# HTTP statuses of requests the network refused to process.
+TRANSIENT_STATUSES = (429, 503)
+
+POP_DUE_SCRIPT = """
+local due = redis.call('zrangebyscore', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+if #due > 0 then
+    redis.call('zrem', KEYS[1], unpack(due))
+end
+return due
+"""
+
+
+def get_redis():
+    return redis.StrictRedis.from_url(
+        settings.PUBLICATION_SCHEDULER_DELAYED_JOBS_REDIS_URL
+    )
+
+
+class DelayedQueue(object):
+    """Sorted set of delayed jobs, scored by due timestamp.
+
+    Members are JSON objects with the `job` fields, the `attempt` number and
+    a unique `id`, so that identical jobs are kept apart.
+
+    Attributes:
+        redis (:obj:`redis.StrictRedis`): the Redis client.
+        key (str): key of the sorted set.
+    """
+
+    def __init__(self, client, key=DELAYED_KEY):
+        self.redis = client
+        self.key = key
+        self.pop_due_script = client.register_script(POP_DUE_SCRIPT)
+
+    def encode(self, job, attempt):
+        return json.dumps(
+            {'id': uuid.uuid4().hex, 'job': list(job), 'attempt': attempt},
+            separators=(',', ':')
+        )
+
+    def zadd(self, scored):
+        """Adds `(member, due_at)` tuples, with a command understood by
+        every version of the Redis client.
+        """
+        args = []
+        for member, due_at in scored:
+            args.extend((due_at, member))
+        if args:
+            self.redis.execute_command('ZADD', self.key, *args)
+
+    def add(self, job, due_at, attempt=0):
+        """Delays a job until a timestamp.
+        """
+        self.zadd([(self.encode(job, attempt), due_at)])
+
+    def add_many(self, delayed, chunk_size=1000):
+        """Delays several jobs.
+
+        Args:
+            delayed (list): `(job, due_at)` tuples.
+            chunk_size (int): number of jobs added per command.
+        """
+        for start in range(0, len(delayed), chunk_size):
+            self.zadd(
+                (self.encode(job, 0), due_at)
+                for job, due_at in delayed[start:start + chunk_size]
+            )
+
+    def remove(self, members):
+        """Removes members, e.g. of jobs run before they were due.
+        """
+        if members:
+            self.redis.zrem(self.key, *members)
+
+    def restore(self, members, due_at):
+        """Adds back members taken by `pop_due`.
+        """
+        self.zadd((member, due_at) for member in members)
+
+    def pop_due(self, now, count):
+        """Takes the jobs due at `now` out of the set, earliest first.
+
+        Args:
+            now (float): current timestamp.
+            count (int): maximum number of taken jobs.
+
+        Returns:
+            list: the taken members.
+        """
+        return self.pop_due_script(keys=[self.key], args=[now, count])
+
+    def __len__(self):
+        return self.redis.zcard(self.key)
+
+
+def get_delayed_queue():
+    return DelayedQueue(get_redis())
+
+
+def decode(member):
+    """Decodes a member of the delayed queue.
+
+    Returns:
+        (list, int): the job fields and the attempt number.
+    """
+    data = json.loads(member)
+    return data['job'], data['attempt']
+
+
+def is_transient(error):
+    """Tells whether a publication failed on an error worth retrying.
+
+    Only errors raised before the network processed the post are transient,
+    so that a retry cannot publish it twice.
+    """
+    if isinstance(error, (NetworkUnavailable, requests.ConnectionError)):
+        return True
+    return (
+        isinstance(error, requests.HTTPError) and
+        error.response is not None and
+        error.response.status_code in TRANSIENT_STATUSES
+    )
+
+
+def get_minimum_delay(error):
+    """Returns the delay a transient error asks to wait, in seconds.
+    """
+    if isinstance(error, NetworkUnavailable):
+        return error.retry_after
+    response = getattr(error, 'response', None)
+    if response is not None:
+        try:
+            return float(response.headers.get('Retry-After', 0))
+        except ValueError:
+            pass
+    return 0
+
+
+def get_retry_delay(attempt, minimum=0):
+    """Returns the delay of a retry, by exponential backoff with jitter.
+
+    The backoff doubles with each attempt up to `RETRY_MAX_DELAY`, and the
+    delay is drawn between its half and itself, so that jobs failing together
+    are not retried together.
+
+    Args:
+        attempt (int): number of the retry, from 1.
+        minimum (float): lowest delay, in seconds.
+
+    Returns:
+        float: the delay, in seconds.
+    """
+    backoff = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (attempt - 1))
+    return max(minimum, random.uniform(backoff / 2, backoff))
+
+
+def schedule_retry(job, attempt, minimum_delay=0, now=None):
+    """Delays the retry of a failed job.
+
+    Args:
+        job (list): the `PublishJob` fields.
+        attempt (int): number of the retry, from 1.
+        minimum_delay (float): lowest delay, in seconds.
+        now (float): current timestamp, defaults to `time.time()`.
+
+    Returns:
+        bool: whether the retry was scheduled, `False` once the attempts are
+            exhausted.
+    """
+    if attempt > settings.PUBLICATION_SCHEDULER_RETRY_MAX_ATTEMPTS:
+        logger.warning('Dropped job %s after %s attempts', job, attempt)
+        return False
+    now = now if now is not None else time.time()
+    get_delayed_queue().add(
+        job,
+        now + get_retry_delay(attempt, minimum_delay),
+        attempt
+    )
+    return True
+
+
+class DelayedJobMover(object):
+    """Promotes the due delayed jobs to the publish queue.
+
+    Attributes:
+        queue (:obj:`DelayedQueue`): the delayed jobs.
+        batch_size (int): maximum number of jobs taken at once.
+        interval (float): seconds between two promotions.
+        enqueue (callable): called with the job fields and attempt number of
+            each due job, instead of `publish_job.apply_async`.
+    """
+
+    def __init__(self, queue, batch_size=1000, interval=1, enqueue=None):
+        self.queue = queue
+        self.batch_size = batch_size
+        self.interval = interval
+        self.enqueue = enqueue
+        self.running = False
+
+    def get_enqueue(self):
+        if self.enqueue is not None:
+            return self.enqueue
+        from social_autoscheduler.publication_scheduler.tasks import (
+            publish_job,
+        )
+
+        return lambda job, attempt: publish_job.apply_async(
+            (job,),
+            {'attempt': attempt}
+        )
+
+    def step(self, now):
+        """Promotes every due job, batch after batch.
+
+        Jobs of a batch which could not be enqueued are put back in the
+        queue, due at once.
+
+        Returns:
+            int: the number of promoted jobs.
+        """
+        enqueue = self.get_enqueue()
+        moved = 0
+        while True:
+            members = self.queue.pop_due(now, self.batch_size)
+            for index, member in enumerate(members):
+                try:
+                    enqueue(*decode(member))
+                except Exception:
+                    self.queue.restore(members[index:], now)
+                    raise
+            moved += len(members)
+            if len(members) < self.batch_size:
+                return moved
+
+    def run(self):
+        """Runs until `stop` is called.
+        """
+        self.running = True
+        while self.running:
+            now = time.time()
+            try:
+                self.step(now)
+            except Exception:
+                logger.exception('Promotion of delayed jobs failed')
+            elapsed = time.time() - now
+            time.sleep(max(self.interval - elapsed, 0))
+
+    def stop(self, *args):
+        self.running = False
@@ -0,0 +1,479 @@
+"""Dispatcher daemon firing occurrences on time.
+
+The daemon keeps the next `horizon` seconds of pending occurrences in a
+`TimingWheel` and claims each occurrence within a tick of its fire time,
+instead of waiting for the next beat of `dispatch_due_occurrences`, which
+keeps running as a fallback. The wheel is refilled incrementally with the
+occurrences entering the horizon, and periodically reconciled with the index
+so that occurrences created or removed by event edits are inserted or
+cancelled. Claims are made against the index when timers fire, so an
+occurrence suppressed after it was loaded is never published.
+
+Several daemons can run at once with `ShardLeases`: each one then only loads
+and claims the occurrences of the shards it holds the lease of.
+
+The jobs of claimed occurrences wait in one `DeadlineQueue` per account, the
+social account of the job, or its event creator on the social network when it
+has none. With a rate, jobs are enqueued as the token bucket of their account
+allows, earliest deadline first. The deadline of a job is its fire time plus
+the lateness tolerance of its category, so that time-critical posts overtake
+evergreen ones. Waiting jobs are enqueued regardless of the rate when the
+daemon stops. With a `journal`, they are also held in the delayed job queue,
+due once a lease the daemon keeps renewing expires, and removed from it when
+the daemon enqueues or drops them: if the daemon crashes, the delayed job
+mover publishes them when their lease expires, as their occurrences are
+claimed and never caught up.
+
+Accounts are served round-robin, one job each per round, and a step enqueues
+at most `batch_size` jobs, so that an account with thousands of due posts
+does not hold back the posts of the others. Accounts left unserved by a full
+batch are served first by the next step.
+"""
+import collections
+import datetime
+import logging
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from social_autoscheduler.publication_scheduler.catch_up import (
+    get_catch_up_grace,
+)
+from social_autoscheduler.publication_scheduler.models import (
+    Category,
+    ScheduledOccurrence,
+    SocialNetwork,
+)
+from social_autoscheduler.publication_scheduler.occurrences import (
+    claim_occurrences,
+)
+from social_autoscheduler.publication_scheduler.publishing import (
+    get_claimed_jobs,
+)
+from social_autoscheduler.publication_scheduler.sharding import (
+    StaleLeaseError,
+    check_fencing_token,
+)
+from social_autoscheduler.publication_scheduler.tasks import publish_job
+from social_autoscheduler.publication_scheduler.throttling import (
+    DeadlineQueue,
+    TokenBucket,
+)
+from social_autoscheduler.publication_scheduler.timing_wheel import TimingWheel
+
+logger = logging.getLogger(__name__)
+
+# Number of seconds waiting jobs are held in the journal without renewal.
+JOURNAL_LEASE = 60
+
+
+def to_datetime(timestamp):
+    return datetime.datetime.fromtimestamp(timestamp, tz=timezone.utc)
+
+
+def get_account_rates():
+    """Returns the account rates of the social networks, by primary key,
+    from `PUBLICATION_SCHEDULER_ACCOUNT_RATES`.
+    """
+    rates = settings.PUBLICATION_SCHEDULER_ACCOUNT_RATES
+    if not rates:
+        return {}
+    return {
+        pk: rates[name] or None
+        for pk, name in SocialNetwork.objects.filter(
+            name__in=list(rates)
+        ).values_list('pk', 'name')
+    }
+
+
+class Dispatcher(object):
+    """Occurrence dispatcher driven by a timing wheel.
+
+    Attributes:
+        horizon (float): number of seconds of occurrences kept in the wheel.
+        refill_interval (float): seconds between two refills of the wheel.
+        reconcile_interval (float): seconds between two reconciliations of
+            the wheel with the index.
+        leases (:obj:`ShardLeases`): leases of the dispatched shards, `None`
+            to dispatch every publish event.
+        enqueue (callable): called with each `PublishJob` to run, instead of
+            `publish_job.delay`.
+        rate (int): maximum number of posts per minute and account, `None`
+            to enqueue jobs as soon as their occurrence fires.
+        rates (dict): maximum number of posts per minute and account, by
+            social network primary key, overriding `rate`.
+        batch_size (int): maximum number of jobs enqueued per step, `None`
+            for no limit.
+        wheel (:obj:`TimingWheel`): the pending occurrence timers, with
+            `(occurrence_pk, shard)` values.
+        loaded_until (float): timestamp up to which occurrences are loaded.
+        tokens (dict): fencing tokens of the owned shards, by shard.
+        queues (:obj:`collections.OrderedDict`): `DeadlineQueue` of the
+            waiting jobs, by `(user_pk, social_network_pk, account_pk)`
+            account, in serving order.
+        buckets (dict): `TokenBucket` of the accounts, by account.
+        journal (:obj:`DelayedQueue`): delayed job queue holding the waiting
+            jobs, `None` to keep them in memory only.
+        journaled (dict): `(job, member)` tuples of the jobs held in the
+            journal, by job `id`.
+        stats (:obj:`collections.Counter`): numbers of `claimed` occurrences
+            and `dropped` late jobs since the dispatcher started.
+    """
+
+    def __init__(self, horizon=600, tick=0.1, refill_interval=5,
+                 reconcile_interval=30, leases=None, enqueue=None, rate=None,
+                 rates=None, batch_size=None, journal=None, now=None):
+        now = now if now is not None else time.time()
+        self.horizon = horizon
+        self.tick = tick
+        self.refill_interval = refill_interval
+        self.reconcile_interval = reconcile_interval
+        self.leases = leases
+        self.enqueue = enqueue
+        self.rate = rate
+        self.rates = rates or {}
+        self.batch_size = batch_size
+        if horizon >= TimingWheel(tick=tick).capacity:
+            raise ValueError('Horizon exceeds the timing wheel capacity')
+        self.tokens = {}
+        self.leases_updated_at = None
+        self.queues = collections.OrderedDict()
+        self.buckets = {}
+        self.journal = journal
+        self.journaled = {}
+        self.unjournaled = {}
+        self.released = []
+        self.journal_renewed_at = None
+        self.stats = collections.Counter()
+        self.reset(now)
+        self.running = False
+
+    def reset(self, now, since=None):
+        """Empties the wheel, to load it again on next step.
+
+        Args:
+            now (float): current timestamp.
+            since (float): timestamp from which occurrences are loaded,
+                defaults to `now`. Occurrences already due fire on next step.
+        """
+        self.wheel = TimingWheel(tick=self.tick, now=now)
+        self.loaded_until = since if since is not None else now
+        self.refilled_at = self.reconciled_at = None
+
+    def update_leases(self, now):
+        """Renews and rebalances the shard leases.
+
+        The wheel is reloaded when the owned shards change, including the
+        occurrences still in the catch-up grace period, so that occurrences of
+        acquired shards which fell due meanwhile, e.g. while their previous
+        owner was down, are claimed.
+        """
+        tokens = self.leases.update(now)
+        if set(tokens) != set(self.tokens):
+            logger.info('Dispatching shards %s', sorted(tokens))
+            self.reset(now, since=now - get_catch_up_grace().total_seconds())
+        self.tokens = tokens
+        self.leases_updated_at = now
+
+    def get_pending(self, start, end):
+        """Returns pending occurrences due in a time range.
+
+        Returns:
+            dict: `(fire_timestamp, shard)` tuples, by occurrence primary key.
+                Shards are `None` without leases.
+        """
+        pending = ScheduledOccurrence.objects.filter(
+            claimed_at__isnull=True,
+            is_suppressed=False,
+            fire_at__gte=to_datetime(start),
+            fire_at__lt=to_datetime(end),
+        )
+        if self.leases is None:
+            return {
+                pk: (fire_at.timestamp(), None)
+                for pk, fire_at in pending.values_list('pk', 'fire_at')
+            }
+        pending = pending.annotate(
+            shard=F('publish_event__creator_id') % self.leases.shards
+        ).filter(shard__in=list(self.tokens))
+        return {
+            pk: (fire_at.timestamp(), shard)
+            for pk, fire_at, shard in pending.values_list(
+                'pk', 'fire_at', 'shard')
+        }
+
+    def refill(self, now):
+        """Loads the occurrences which entered the horizon since last refill.
+
+        Returns:
+            int: the number of loaded occurrences.
+        """
+        end = now + self.horizon
+        pending = self.get_pending(self.loaded_until, end)
+        for pk, (deadline, shard) in pending.items():
+            self.wheel.insert(pk, deadline, (pk, shard))
+        self.loaded_until = end
+        self.refilled_at = now
+        return len(pending)
+
+    def reconcile(self, now):
+        """Inserts and cancels timers to match the index over the horizon.
+
+        Returns:
+            (int, int): the number of inserted and cancelled timers.
+        """
+        pending = self.get_pending(now, self.loaded_until)
+        inserted = cancelled = 0
+        for pk, (deadline, shard) in pending.items():
+            if pk not in self.wheel:
+                self.wheel.insert(pk, deadline, (pk, shard))
+                inserted += 1
+        for pk in list(self.wheel.locations):
+            if pk not in pending and self.wheel.cancel(pk):
+                cancelled += 1
+        self.reconciled_at = now
+        return inserted, cancelled
+
+    def fire(self, fired, now):
+        """Claims fired occurrences and queues their jobs.
+
+        With leases, occurrences are claimed per shard, with the fencing
+        token of the shard lease.
+
+        Args:
+            fired (list): `(occurrence_pk, shard)` tuples.
+            now (float): current timestamp.
+
+        Returns:
+            int: the number of queued jobs.
+        """
+        by_shard = collections.defaultdict(list)
+        for pk, shard in fired:
+            by_shard[shard].append(pk)
+        claimed = []
+        for shard, pks in by_shard.items():
+            try:
+                with transaction.atomic():
+                    if shard is not None:
+                        check_fencing_token(shard, self.tokens.get(shard, 0))
+                    claimed.extend(claim_occurrences(pks, now=to_datetime(now)))
+            except StaleLeaseError:
+                logger.warning('Skipped %s occurrences of lost shard %s',
+                               len(pks), shard)
+        self.stats['claimed'] += len(claimed)
+        jobs = get_claimed_jobs(claimed)
+        if jobs:
+            self.queue_jobs(jobs, now)
+        return len(jobs)
+
+    def queue_jobs(self, jobs, now):
+        """Adds jobs to the queues of their accounts, with the deadlines of
+        their occurrences.
+
+        Jobs are never late when queued, even if their occurrence fired
+        later than their lateness tolerance.
+        """
+        occurrences = ScheduledOccurrence.objects.filter(
+            pk__in=set(job.occurrence_pk for job in jobs)
+        ).values_list(
+            'pk',
+            'publish_event__creator',
+            'fire_at',
+            'publish_event__category__lateness_tolerance',
+            'publish_event__category__priority',
+            'publish_event__category__catch_up_policy',
+        )
+        deadlines = {
+            pk: (
+                user_pk,
+                max(fire_at.timestamp() + tolerance * 60, now),
+                priority,
+                policy != Category.SKIP,
+            )
+            for pk, user_pk, fire_at, tolerance, priority, policy in occurrences
+        }
+        for job in jobs:
+            self.push(job, *deadlines[job.occurrence_pk])
+
+    def push(self, job, user_pk, deadline, priority, reschedule=True):
+        """Adds a job to the queue of its account.
+
+        Args:
+            job (:obj:`PublishJob`): the job to enqueue.
+            user_pk (int): primary key of the event creator.
+            deadline (float): timestamp the job should be enqueued by.
+            priority (int): priority of the job category.
+            reschedule (bool): whether the job is kept once late.
+        """
+        account = (user_pk, job.social_network_pk, job.account_pk)
+        if account not in self.queues:
+            self.queues[account] = DeadlineQueue()
+        self.queues[account].push(job, deadline, priority, reschedule)
+        if self.journal is not None:
+            self.unjournaled[id(job)] = job
+
+    def release(self, jobs):
+        """Forgets jobs which no longer wait, to remove them from the
+        journal.
+        """
+        if self.journal is None:
+            return
+        for job in jobs:
+            self.unjournaled.pop(id(job), None)
+            entry = self.journaled.pop(id(job), None)
+            if entry is not None:
+                self.released.append(entry[1])
+
+    def update_journal(self, now):
+        """Holds the new waiting jobs in the journal, removes the released
+        ones, and renews the lease of the others every third of
+        `JOURNAL_LEASE`.
+        """
+        if self.released:
+            self.journal.remove(self.released)
+            self.released = []
+        due_at = now + JOURNAL_LEASE
+        if (self.journal_renewed_at is None or
+                now - self.journal_renewed_at >= JOURNAL_LEASE / 3):
+            self.journal.zadd(
+                (member, due_at) for _, member in self.journaled.values()
+            )
+            self.journal_renewed_at = now
+        if self.unjournaled:
+            added = {
+                key: (job, self.journal.encode(job, 0))
+                for key, job in self.unjournaled.items()
+            }
+            self.journal.zadd((member, due_at) for _, member in added.values())
+            self.journaled.update(added)
+            self.unjournaled = {}
+
+    def get_bucket(self, account, now):
+        rate = self.rates.get(account[1], self.rate)
+        if rate is None:
+            return None
+        if account not in self.buckets:
+            self.buckets[account] = TokenBucket(rate / 60, rate, now)
+        return self.buckets[account]
+
+    def drain(self, now):
+        """Enqueues the waiting jobs the rates of their accounts allow, up to
+        `batch_size` jobs.
+
+        Accounts are served one job at a time, in rounds, and move to the
+        end of the serving order once served. Late jobs which cannot be
+        rescheduled are dropped. Buckets which refilled are forgotten along
+        with emptied queues, so that idle accounts take no memory.
+
+        Returns:
+            int: the number of enqueued jobs.
+        """
+        enqueue = self.enqueue or publish_job.delay
+        enqueued = 0
+        for account, queue in self.queues.items():
+            dropped = queue.expire(now)
+            if dropped:
+                self.release(dropped)
+                self.stats['dropped'] += len(dropped)
+                logger.warning('Dropped %s late jobs of account %s',
+                               len(dropped), account)
+        serving = list(self.queues)
+        while serving:
+            next_round = []
+            for account in serving:
+                if self.batch_size is not None and enqueued >= self.batch_size:
+                    next_round = []
+                    break
+                queue = self.queues[account]
+                bucket = self.get_bucket(account, now)
+                if not queue or (bucket is not None and
+                                 not bucket.take(now=now)):
+                    continue
+                job = queue.pop()
+                enqueue(job)
+                self.release([job])
+                enqueued += 1
+                self.queues.move_to_end(account)
+                next_round.append(account)
+            serving = next_round
+        for account, queue in list(self.queues.items()):
+            if not queue:
+                del self.queues[account]
+        for account, bucket in list(self.buckets.items()):
+            bucket.refill(now)
+            if account not in self.queues and bucket.tokens >= bucket.capacity:
+                del self.buckets[account]
+        return enqueued
+
+    def flush(self, now):
+        """Enqueues every waiting job regardless of the rates, but the late
+        jobs which cannot be rescheduled.
+
+        Returns:
+            int: the number of enqueued jobs.
+        """
+        enqueue = self.enqueue or publish_job.delay
+        enqueued = 0
+        for queue in self.queues.values():
+            dropped = queue.expire(now)
+            self.release(dropped)
+            self.stats['dropped'] += len(dropped)
+            while queue:
+                job = queue.pop()
+                enqueue(job)
+                self.release([job])
+                enqueued += 1
+        self.queues = collections.OrderedDict()
+        if self.journal is not None:
+            self.update_journal(now)
+        return enqueued
+
+    def step(self, now):
+        """Runs the periodic maintenance and fires due occurrences.
+
+        Returns:
+            int: the number of enqueued jobs.
+        """
+        if self.leases is not None and (
+                self.leases_updated_at is None or
+                now - self.leases_updated_at >= self.leases.ttl / 3):
+            self.update_leases(now)
+        if (self.refilled_at is None or
+                now - self.refilled_at >= self.refill_interval):
+            self.refill(now)
+        fired = self.wheel.advance(now)
+        if fired:
+            self.fire(fired, now)
+        enqueued = self.drain(now) if self.queues else 0
+        if self.journal is not None:
+            self.update_journal(now)
+        # Reconcile once due timers fired: the remaining ones are all due
+        # after `now`.
+        if (self.reconciled_at is None or
+                now - self.reconciled_at >= self.reconcile_interval):
+            self.reconcile(now)
+        return enqueued
+
+    def run(self):
+        """Runs until `stop` is called, waking up once per tick.
+        """
+        self.running = True
+        while self.running:
+            now = time.time()
+            try:
+                self.step(now)
+            except Exception:
+                logger.exception('Dispatch failed')
+                close_old_connections()
+            elapsed = time.time() - now
+            time.sleep(max(self.wheel.tick - elapsed, 0))
+
+        self.flush(time.time())
+        if self.leases is not None:
+            self.leases.release()
+
+    def stop(self, *args):
+        self.running = False
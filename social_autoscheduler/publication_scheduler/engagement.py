@@ -0,0 +1,276 @@
+"""Ingestion of engagement metrics pulled from social networks.
+
+Published posts are polled in batches per social network. Each poll appends
+raw `EngagementSample` rows, and adds the engagement gained since the previous
+sample to hourly, daily and weekly slot `EngagementRollup` rows, per
+publication, category and user. Dashboards and recommendations only ever read
+rollups.
+
+The previous sample of each post is read from its row, locked until the new
+one is stored, so that overlapping polls never count the same engagement
+twice.
+"""
+import collections
+import datetime
+import logging
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from psycopg2.extras import execute_values
+
+from social_autoscheduler.publication_scheduler.models import (
+    EngagementRollup,
+    EngagementSample,
+    PublishedPost,
+    SocialNetwork,
+)
+from social_autoscheduler.publication_scheduler.network_limits import (
+    NetworkUnavailable,
+    get_limiter,
+)
+from social_autoscheduler.publication_scheduler.networks import get_client
+from social_autoscheduler.publication_scheduler.recommendations import (
+    SLOTS_PER_DAY,
+    apply_rollup_deltas,
+    get_engagement,
+)
+from social_autoscheduler.publication_scheduler.rotation import (
+    apply_publication_engagement,
+)
+
+logger = logging.getLogger(__name__)
+
+METRICS = ('likes', 'shares', 'clicks')
+
+UPSERT_ROLLUPS_SQL = """
+    INSERT INTO {table} (granularity, scope, scope_id, social_network_id,
+                         bucket, posts, likes, shares, clicks)
+    VALUES %s
+    ON CONFLICT (granularity, scope, scope_id, social_network_id, bucket)
+    DO UPDATE SET posts = {table}.posts + EXCLUDED.posts,
+                  likes = {table}.likes + EXCLUDED.likes,
+                  shares = {table}.shares + EXCLUDED.shares,
+                  clicks = {table}.clicks + EXCLUDED.clicks
+"""
+
+
+UPDATE_POSTS_SQL = """
+    UPDATE {table} AS post
+    SET sampled_at = sample.sampled_at,
+        likes = sample.likes,
+        shares = sample.shares,
+        clicks = sample.clicks
+    FROM (VALUES %s) AS sample (id, sampled_at, likes, shares, clicks)
+    WHERE post.id = sample.id
+"""
+
+
+def get_slot(moment):
+    """Returns the weekly 10-minute slot of a datetime.
+
+    Returns:
+        int: the slot, from 0 (Monday 00:00) to 1007 (Sunday 23:50).
+    """
+    return (
+        moment.weekday() * SLOTS_PER_DAY +
+        moment.hour * 6 +
+        moment.minute // 10
+    )
+
+
+def get_buckets(published_at, time_zone=None):
+    """Returns the rollup buckets a post published at a given time belongs to.
+
+    Args:
+        published_at (:obj:`datetime.datetime`): when the post was published.
+        time_zone (:obj:`datetime.tzinfo`): time zone of the daily and slot
+            buckets, defaults to the current time zone.
+
+    Returns:
+        dict: the buckets, by granularity.
+    """
+    local_time = timezone.localtime(published_at, time_zone)
+    return {
+        EngagementRollup.HOUR: int(published_at.timestamp()) // 3600,
+        EngagementRollup.DAY: local_time.date().toordinal(),
+        EngagementRollup.SLOT: get_slot(local_time),
+    }
+
+
+def upsert_rollups(deltas):
+    """Adds deltas to rollups, creating the missing ones, in one query.
+
+    Args:
+        deltas (dict): `[posts, likes, shares, clicks]` lists, by
+            `(granularity, scope, scope_id, social_network_id, bucket)` key.
+    """
+    if not deltas:
+        return
+    sql = UPSERT_ROLLUPS_SQL.format(table=EngagementRollup._meta.db_table)
+    with connection.cursor() as cursor:
+        execute_values(
+            cursor.cursor,
+            sql,
+            [key + tuple(values) for key, values in sorted(deltas.items())]
+        )
+
+
+def update_posts(updates):
+    """Stores the latest sample of posts, in one query.
+
+    Args:
+        updates (list): `(post_pk, sampled_at, likes, shares, clicks)` tuples.
+    """
+    if not updates:
+        return
+    sql = UPDATE_POSTS_SQL.format(table=PublishedPost._meta.db_table)
+    with connection.cursor() as cursor:
+        execute_values(cursor.cursor, sql, updates)
+
+
+def lock_last_samples(posts):
+    """Locks posts and reads their latest sample.
+
+    Rows are locked in primary key order, so that overlapping polls cannot
+    deadlock.
+
+    Returns:
+        dict: `(sampled_at, (likes, shares, clicks))` tuples, by post primary
+            key.
+    """
+    rows = PublishedPost.objects.select_for_update().filter(
+        pk__in=[post.pk for post in posts]
+    ).order_by('pk').values_list('pk', 'sampled_at', *METRICS)
+    return dict((row[0], (row[1], row[2:])) for row in rows)
+
+
+def ingest_samples(posts, engagement, sampled_at):
+    """Stores engagement pulled for posts and updates rollups.
+
+    Changes are computed against the latest sample stored for each post, not
+    the one of the given instances, which may be outdated by an overlapping
+    poll. Counts pulled before the latest sample are ignored.
+
+    Args:
+        posts (list): the sampled `PublishedPost` instances, with their
+            publications and authors selected.
+        engagement (dict): engagement counts dicts, by network post id.
+        sampled_at (:obj:`datetime.datetime`): when counts were pulled.
+
+    Returns:
+        int: the number of stored samples.
+    """
+    samples = []
+    updates = []
+    deltas = collections.defaultdict(lambda: [0, 0, 0, 0])
+    publication_changes = collections.defaultdict(lambda: [0, 0])
+    posts = [post for post in posts if post.network_post_id in engagement]
+    with transaction.atomic():
+        last_samples = lock_last_samples(posts)
+        for post in posts:
+            if post.pk not in last_samples:
+                continue
+            last_sampled_at, previous = last_samples[post.pk]
+            if last_sampled_at is not None and last_sampled_at >= sampled_at:
+                continue
+            counts = engagement[post.network_post_id]
+            values = [int(counts.get(metric, 0)) for metric in METRICS]
+            changes = [
+                value - previous_value
+                for value, previous_value in zip(values, previous)
+            ]
+            samples.append(EngagementSample(
+                post=post,
+                sampled_at=sampled_at,
+                **dict(zip(METRICS, values))
+            ))
+            updates.append((post.pk, sampled_at) + tuple(values))
+
+            scopes = [
+                (EngagementRollup.PUBLICATION, post.publication_id),
+                (EngagementRollup.USER, post.publication.author_id),
+            ]
+            if post.category_id is not None:
+                scopes.append((EngagementRollup.CATEGORY, post.category_id))
+            new_posts = 1 if last_sampled_at is None else 0
+            if post.publication.category_id is not None:
+                publication_change = publication_changes[
+                    (post.publication.category_id, post.publication_id)
+                ]
+                publication_change[0] += new_posts
+                publication_change[1] += get_engagement(*changes)
+            buckets = get_buckets(
+                post.published_at,
+                post.publication.author.get_time_zone()
+            )
+            for granularity, bucket in buckets.items():
+                for scope, scope_id in scopes:
+                    delta = deltas[(granularity, scope, scope_id,
+                                    post.social_network_id, bucket)]
+                    delta[0] += new_posts
+                    for index, change in enumerate(changes, 1):
+                        delta[index] += change
+
+        EngagementSample.objects.bulk_create(samples)
+        update_posts(updates)
+        upsert_rollups(deltas)
+    apply_rollup_deltas(deltas)
+    apply_publication_engagement(publication_changes)
+    return len(samples)
+
+
+def poll_engagement(now=None, batch_size=None):
+    """Pulls engagement of recently published posts from social networks.
+
+    Posts published within the last `PUBLICATION_SCHEDULER_ENGAGEMENT_WINDOW`
+    days are polled, in batches of at most `batch_size` posts per request.
+    Networks accepting no more requests are polled next time.
+
+    Args:
+        now (:obj:`datetime.datetime`): defaults to current time.
+        batch_size (int): defaults to
+            `PUBLICATION_SCHEDULER_ENGAGEMENT_BATCH_SIZE` setting.
+
+    Returns:
+        int: the number of stored samples.
+    """
+    now = now or timezone.now()
+    batch_size = batch_size or settings.PUBLICATION_SCHEDULER_ENGAGEMENT_BATCH_SIZE
+    since = now - datetime.timedelta(
+        days=settings.PUBLICATION_SCHEDULER_ENGAGEMENT_WINDOW
+    )
+    sampled = 0
+    for social_network in SocialNetwork.objects.all():
+        client = get_client(social_network)
+        posts = PublishedPost.objects.filter(
+            social_network=social_network,
+            published_at__gte=since,
+        ).exclude(network_post_id='').select_related(
+            'publication__author'
+        ).order_by('pk')
+        batch = []
+        try:
+            for post in posts.iterator():
+                batch.append(post)
+                if len(batch) == batch_size:
+                    sampled += poll_batch(client, batch, now)
+                    batch = []
+            if batch:
+                sampled += poll_batch(client, batch, now)
+        except NetworkUnavailable as error:
+            logger.warning('Skipped engagement polling: %s', error)
+    return sampled
+
+
+def poll_batch(client, posts, sampled_at):
+    """Pulls and ingests engagement of a batch of posts.
+
+    Returns:
+        int: the number of stored samples.
+    """
+    with get_limiter(client.social_network.pk).request():
+        engagement = client.get_engagement(
+            [post.network_post_id for post in posts]
+        )
+    return ingest_samples(posts, engagement, sampled_at)
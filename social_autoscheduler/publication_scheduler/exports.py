@@ -0,0 +1,272 @@
+"""Streaming export of user publications, categories and publish events.
+
+Rows are read with `QuerySet.iterator()`, which fetches them in chunks from a
+server-side cursor on PostgreSQL, and encoded one at a time: memory use does
+not depend on the size of the account. Exports are streamed in HTTP responses,
+or written to the default storage by a Celery task for large accounts.
+
+Supported formats are CSV and JSON lines for every export, and iCalendar for
+publish events.
+"""
+import collections
+import csv
+import json
+import tempfile
+import time
+
+import pytz
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from social_autoscheduler.publication_scheduler.models import (
+    Category,
+    Publication,
+    PublishEvent,
+)
+
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+    'ics': 'text/calendar',
+}
+
+ICS_WEEKDAYS = ['MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU']
+
+Export = collections.namedtuple(
+    'Export',
+    ['columns', 'get_queryset', 'formats']
+)
+
+
+def get_publications(user):
+    return Publication.objects.filter(author=user).annotate(
+        social_network_names=ArrayAgg('social_networks__name'),
+    ).order_by('pk').values_list(
+        'pk',
+        'category__name',
+        'content',
+        'social_network_names',
+    )
+
+
+def get_categories(user):
+    return Category.objects.filter(created_by=user).order_by('pk').values_list(
+        'pk',
+        'name',
+        'parent__name',
+        'is_paused',
+        'rotation',
+        'catch_up_policy',
+        'priority',
+        'lateness_tolerance',
+    )
+
+
+def get_publish_events(user):
+    return PublishEvent.objects.filter(creator=user).annotate(
+        social_network_names=ArrayAgg('social_networks__name'),
+    ).order_by('pk').values_list(
+        'pk',
+        'title',
+        'category__name',
+        'social_network_names',
+        'start',
+        'rule__frequency',
+        'rule__params',
+        'creator__time_zone',
+    )
+
+
+EXPORTS = {
+    'publications': Export(
+        ['id', 'category', 'content', 'social_networks'],
+        get_publications,
+        ['csv', 'jsonl'],
+    ),
+    'categories': Export(
+        ['id', 'name', 'parent', 'is_paused', 'rotation', 'catch_up_policy',
+         'priority', 'lateness_tolerance'],
+        get_categories,
+        ['csv', 'jsonl'],
+    ),
+    'events': Export(
+        ['id', 'title', 'category', 'social_networks', 'start', 'frequency',
+         'params', 'time_zone'],
+        get_publish_events,
+        ['csv', 'jsonl', 'ics'],
+    ),
+}
+
+
+def is_supported(kind, export_format):
+    return kind in EXPORTS and export_format in EXPORTS[kind].formats
+
+
+def clean_value(value):
+    """Drops the `None` entry aggregated for rows without social network.
+    """
+    if isinstance(value, list):
+        return [item for item in value if item is not None]
+    return value
+
+
+class Echo(object):
+    """File-like object returning what is written, for `csv.writer`.
+    """
+
+    def write(self, value):
+        return value
+
+
+def encode_csv(columns, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow([
+            ', '.join(value) if isinstance(value, list) else value
+            for value in map(clean_value, row)
+        ])
+
+
+def encode_jsonl(columns, rows):
+    for row in rows:
+        yield json.dumps(
+            dict(zip(columns, map(clean_value, row))),
+            cls=DjangoJSONEncoder
+        ) + '\n'
+
+
+def escape_ics_text(text):
+    return (
+        (text or '').replace('\\', '\\\\').replace(';', '\\;')
+        .replace(',', '\\,').replace('\n', '\\n')
+    )
+
+
+def fold_ics_line(line):
+    """Splits a content line in lines of at most 75 characters.
+    """
+    parts = [line[:75]]
+    for index in range(75, len(line), 74):
+        parts.append(' ' + line[index:index + 74])
+    return '\r\n'.join(parts) + '\r\n'
+
+
+def get_rrule(frequency, params):
+    """Converts a django-scheduler rule to an iCalendar `RRULE` value.
+
+    Args:
+        frequency (str): the rule frequency, e.g. `WEEKLY`.
+        params (str): the rule parameters, e.g. `byweekday:0;byhour:9`.
+    """
+    parts = ['FREQ=' + frequency]
+    for param in filter(None, (params or '').split(';')):
+        name, _, values = param.partition(':')
+        name = name.strip().lower()
+        if name == 'byweekday':
+            values = ','.join(
+                ICS_WEEKDAYS[int(value)] for value in values.split(',')
+            )
+            name = 'byday'
+        parts.append('{0}={1}'.format(name.upper(), values))
+    return ';'.join(parts)
+
+
+def encode_ics(columns, rows):
+    """Encodes publish events as iCalendar events.
+
+    Events start in the time zone of their creator, which their weekly rules
+    are expressed in, so that occurrences follow its DST transitions.
+    """
+    stamp = timezone.now().strftime('%Y%m%dT%H%M%SZ')
+    yield 'BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//social_autoscheduler//EN\r\n'
+    for (pk, title, category, social_networks, start, frequency,
+         params, time_zone) in rows:
+        start = start.astimezone(pytz.timezone(time_zone))
+        yield ''.join(map(fold_ics_line, [
+            'BEGIN:VEVENT',
+            'UID:publish-event-{0}@social_autoscheduler'.format(pk),
+            'DTSTAMP:' + stamp,
+            'DTSTART;TZID={0}:{1}'.format(
+                time_zone,
+                start.strftime('%Y%m%dT%H%M%S')
+            ),
+            'SUMMARY:' + escape_ics_text(title),
+            'CATEGORIES:' + escape_ics_text(category),
+            'DESCRIPTION:' + escape_ics_text(
+                ', '.join(clean_value(social_networks))
+            ),
+            'RRULE:' + get_rrule(frequency, params),
+            'END:VEVENT',
+        ]))
+    yield 'END:VCALENDAR\r\n'
+
+
+ENCODERS = {
+    'csv': encode_csv,
+    'jsonl': encode_jsonl,
+    'ics': encode_ics,
+}
+
+
+def encode(kind, export_format, rows):
+    """Encodes exported rows.
+
+    Args:
+        kind (str): `publications`, `categories` or `events`.
+        export_format (str): `csv`, `jsonl` or `ics`.
+        rows (iterable): rows of the export queryset.
+
+    Returns:
+        generator: the encoded export, as consecutive strings.
+    """
+    return ENCODERS[export_format](EXPORTS[kind].columns, rows)
+
+
+def get_export_path(user, kind, export_format):
+    return 'exports/{user}/{kind}-{timestamp}.{export_format}'.format(
+        user=user.pk,
+        kind=kind,
+        timestamp=timezone.now().strftime('%Y%m%d%H%M%S'),
+        export_format=export_format,
+    )
+
+
+def is_export_of(user, path):
+    """Returns whether a storage path is an export of a user.
+    """
+    return path.startswith('exports/{0}/'.format(user.pk))
+
+
+def export_to_storage(user, kind, export_format, path):
+    """Writes an export to the default storage, through a temporary file.
+
+    Returns:
+        dict: the storage `path` of the export, which differs from the given
+            one if a file already exists there, the number of exported `rows`
+            and `rows_per_second`.
+    """
+    started_at = time.perf_counter()
+    row_count = 0
+
+    def count_rows(rows):
+        nonlocal row_count
+        for row in rows:
+            row_count += 1
+            yield row
+
+    queryset = EXPORTS[kind].get_queryset(user)
+    with tempfile.TemporaryFile() as output:
+        for chunk in encode(kind, export_format, count_rows(queryset.iterator())):
+            output.write(chunk.encode())
+        output.seek(0)
+        name = default_storage.save(path, File(output))
+    elapsed = time.perf_counter() - started_at
+    return {
+        'path': name,
+        'rows': row_count,
+        'rows_per_second': row_count / elapsed if elapsed else 0,
+    }
@@ -1,15 +1,23 @@
 import calendar
 import datetime
 
+from allauth.socialaccount.models import SocialAccount
 from django import forms
+from django.db import transaction
 from django.forms import widgets
-from django.utils import dates
+from django.utils import dates, timezone
 
 from schedule.models import Rule
 
+from social_autoscheduler.publication_scheduler.media import (attach_blobs,
+                                                              store_blob)
 from social_autoscheduler.publication_scheduler.models import (SocialNetwork,
                                                                Category,
+                                                               Publication,
                                                                PublishEvent)
+from social_autoscheduler.publication_scheduler.social_tokens import (
+    get_provider,
+)
 
 
 def get_round_up_time_tuple(time):
@@ -91,6 +99,54 @@ class SelectTimeWidget(widgets.MultiWidget):
         return datetime.time(hour=int(hour), minute=int(minute))
 
 
+class PublicationForm(forms.ModelForm):
+    """Form used to create a publication along with its media attachments.
+
+    Attributes:
+        blobs (list): the `MediaBlob` instances of the uploaded files, `None`
+            until they are stored.
+    """
+
+    blobs = None
+
+    attachments = forms.FileField(
+        required=False,
+        widget=widgets.ClearableFileInput(attrs={'multiple': True})
+    )
+
+    class Meta:
+        """Meta data for `PublicationForm` class.
+        """
+        model = Publication
+        fields = ['content', 'category', 'social_networks']
+
+    def store_attachments(self):
+        """Stores the uploaded files.
+
+        Storing streams the files to the storage: call this before opening the
+        transaction saving the publication.
+        """
+        self.blobs = [
+            store_blob(uploaded_file)
+            for uploaded_file
+            in self.files.getlist(self.add_prefix('attachments'))
+        ]
+
+    def save(self, commit=True):
+        """Saves the publication then attaches uploaded files, storing them
+        if `store_attachments` was not called.
+
+        Returns:
+            :obj:`Publication`: the saved publication.
+        """
+        publication = super().save(commit=commit)
+        if commit:
+            if self.blobs is None:
+                self.store_attachments()
+            attach_blobs(publication, self.blobs)
+        return publication
+
+
 class EventForm(forms.Form):
     """Form used to create a recurring publication publish event.
     """
@@ -101,13 +157,19 @@ class EventForm(forms.Form):
 
     weekday = forms.ChoiceField(choices=WEEKDAY_CHOICES)
     time = forms.TimeField(widget=SelectTimeWidget())
-    social_network = forms.ModelChoiceField(
+    social_networks = forms.ModelMultipleChoiceField(
         queryset=SocialNetwork.objects.all()
     )
     category = forms.ModelChoiceField(queryset=None)
+    social_accounts = forms.ModelMultipleChoiceField(
+        queryset=None,
+        required=False,
+        help_text='Defaults to your latest account on each social network.'
+    )
 
     def __init__(self, *args, user, **kwargs):
-        """Initializes the form, sets `user` attribute and `category` queryset.
+        """Initializes the form, sets `user` attribute, `category` and
+        `social_accounts` querysets.
 
         Args:
             user (:obj:`User`): the user who wants to create the `PublishEvent`.
@@ -117,6 +179,9 @@ class EventForm(forms.Form):
         self.fields['category'].queryset = Category.objects.filter(
             created_by=self.user
         )
+        self.fields['social_accounts'].queryset = SocialAccount.objects.filter(
+            user=self.user
+        )
 
     def clean_category(self):
         """Ensures selected `category` belongs to current user.
@@ -126,20 +191,41 @@ class EventForm(forms.Form):
             raise forms.ValidationError('You must choose a category you own')
         return category
 
+    def clean(self):
+        """Ensures selected `social_accounts` belong to selected
+        `social_networks`.
+        """
+        cleaned_data = super().clean()
+        providers = set(
+            get_provider(social_network)
+            for social_network in cleaned_data.get('social_networks', [])
+        )
+        for social_account in cleaned_data.get('social_accounts', []):
+            if social_account.provider not in providers:
+                self.add_error(
+                    'social_accounts',
+                    'You must choose accounts of the selected social networks'
+                )
+                break
+        return cleaned_data
+
+    @transaction.atomic
     def get_or_create_event(self):
         """Gets or Create a `PublishEvent` instance matching the form criterias.
 
+        The weekday and time are in the time zone of the user.
+
         Returns:
             publish_event (:obj:`PublishEvent`): the retrieved or created
                 `PublishEvent` instance.
             created (bool): a boolean telling whether the `PublishEvent` has
                 been created or retrieved.
         """
-        social_network = self.cleaned_data['social_network']
+        social_networks = self.cleaned_data['social_networks']
         weekday = int(self.cleaned_data['weekday'])
         time = self.cleaned_data['time']
         category = self.cleaned_data['category']
-        now = datetime.datetime.now()
+        now = timezone.now()
         time_description = ' every {weekday} at {time}'.format(
             weekday=dates.WEEKDAYS[weekday],
             time=time
@@ -159,11 +245,15 @@ class EventForm(forms.Form):
             creator=self.user,
             start=now,
             end=get_next_year(now),
-            title=('{social_network} post' + time_description).format(
-                social_network=social_network,
+            title=('{social_networks} post' + time_description).format(
+                social_networks=', '.join(map(str, social_networks)),
             ),
             category=category,
-            social_network=social_network,
         )
+        if created:
+            publish_event.social_networks.set(social_networks)
+            publish_event.social_accounts.set(
+                self.cleaned_data['social_accounts']
+            )
         return publish_event, created
 
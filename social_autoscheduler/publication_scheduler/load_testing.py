@@ -0,0 +1,305 @@
+"""Load testing of the publication scheduler pages against a running server.
+
+Virtual users log in through the allauth login form, then repeatedly pick a
+scenario, weighted like real traffic: browsing their publications, or filling
+in one of the creation forms. Every request is timed, and the number of
+database queries it ran is read from the header sent by
+`QueryCountMiddleware`. Results per endpoint are compared with a stored
+baseline, to catch throughput, latency or query count regressions.
+"""
+import collections
+import random
+import re
+import threading
+import time
+import uuid
+
+import requests
+from django.conf import settings
+from django.core.urlresolvers import reverse
+
+from social_autoscheduler.db.middleware import QUERY_COUNT_HEADER
+from social_autoscheduler.publication_scheduler.models import Category
+
+CSRF_INPUT_RE = re.compile(r'name=["\']csrfmiddlewaretoken["\'] value=["\']([^"\']+)')
+
+DEFAULT_MIX = {
+    'list_publications': 5,
+    'create_publication': 2,
+    'create_event': 2,
+    'create_category': 1,
+}
+
+Sample = collections.namedtuple(
+    'Sample',
+    ['endpoint', 'latency', 'status', 'queries']
+)
+
+SyntheticUser = collections.namedtuple(
+    'SyntheticUser',
+    ['username', 'password', 'category_pks', 'social_network_pks']
+)
+
+
+class LoadTestError(Exception):
+    """Raised when a virtual user cannot log in.
+    """
+
+
+def get_percentile(values, percentile):
+    """Returns a percentile of a list of values, by nearest rank.
+    """
+    values = sorted(values)
+    rank = max(int(round(percentile / 100 * len(values))) - 1, 0)
+    return values[min(rank, len(values) - 1)]
+
+
+class VirtualUser(object):
+    """Synthetic user browsing the publication scheduler pages.
+
+    Attributes:
+        base_url (str): root URL of the tested server.
+        user (:obj:`SyntheticUser`): credentials and objects of the user.
+        session (:obj:`requests.Session`): the HTTP session, with cookies.
+        samples (list): `Sample` instances of every request sent.
+    """
+
+    def __init__(self, base_url, user, rng):
+        self.base_url = base_url.rstrip('/')
+        self.user = user
+        self.rng = rng
+        self.session = requests.Session()
+        self.samples = []
+
+    def get_url(self, url_name):
+        return self.base_url + reverse(url_name)
+
+    def request(self, endpoint, method, url, **kwargs):
+        """Sends a request and records its latency and query count.
+
+        Returns:
+            :obj:`requests.Response`: the response.
+        """
+        started_at = time.perf_counter()
+        response = self.session.request(
+            method,
+            url,
+            allow_redirects=False,
+            **kwargs
+        )
+        latency = time.perf_counter() - started_at
+        queries = response.headers.get(QUERY_COUNT_HEADER)
+        self.samples.append(Sample(
+            endpoint,
+            latency,
+            response.status_code,
+            int(queries) if queries is not None else None,
+        ))
+        return response
+
+    def get_csrf_token(self, response):
+        match = CSRF_INPUT_RE.search(response.text)
+        if match:
+            return match.group(1)
+        return self.session.cookies.get('csrftoken', '')
+
+    def log_in(self):
+        """Logs in through the allauth login form.
+
+        Raises:
+            LoadTestError: if the credentials were refused.
+        """
+        url = self.get_url('account_login')
+        token = self.get_csrf_token(self.session.get(url))
+        response = self.session.post(url, data={
+            'login': self.user.username,
+            'password': self.user.password,
+            'csrfmiddlewaretoken': token,
+        }, headers={'Referer': url}, allow_redirects=False)
+        if (response.status_code != 302 or
+                settings.SESSION_COOKIE_NAME not in self.session.cookies):
+            raise LoadTestError('Could not log {0} in'.format(
+                self.user.username
+            ))
+
+    def submit_form(self, url_name, data):
+        """Gets a form page, then posts it with the given data.
+        """
+        url = self.get_url(url_name)
+        endpoint = url_name.rpartition(':')[2]
+        response = self.request(endpoint + ' GET', 'GET', url)
+        data['csrfmiddlewaretoken'] = self.get_csrf_token(response)
+        self.request(endpoint + ' POST', 'POST', url, data=data,
+                     headers={'Referer': url})
+
+    def list_publications(self):
+        self.request(
+            'publication-list GET',
+            'GET',
+            self.get_url('publication:publication-list')
+        )
+
+    def create_publication(self):
+        self.submit_form('publication:publication-create', {
+            'content': 'Load test publication {0}'.format(uuid.uuid4().hex),
+            'category': self.rng.choice(self.user.category_pks),
+            'social_networks': [self.rng.choice(self.user.social_network_pks)],
+        })
+
+    def create_event(self):
+        self.submit_form('publication:publish-event-create', {
+            'weekday': self.rng.randrange(7),
+            'time_0': self.rng.randrange(24),
+            'time_1': self.rng.randrange(0, 60, 10),
+            'category': self.rng.choice(self.user.category_pks),
+            'social_networks': [self.rng.choice(self.user.social_network_pks)],
+        })
+
+    def create_category(self):
+        self.submit_form('publication:category-create', {
+            'name': 'Load test {0}'.format(uuid.uuid4().hex),
+            'rotation': Category.ROUND_ROBIN,
+            'catch_up_policy': Category.COMPRESS,
+            'priority': Category.NORMAL,
+            'lateness_tolerance': 60,
+        })
+
+    def run(self, deadline, mix):
+        """Runs scenarios picked from `mix` until `deadline`.
+
+        Args:
+            deadline (float): `time.perf_counter` value to stop at.
+            mix (dict): weights, by scenario method name.
+        """
+        scenarios, weights = zip(*sorted(mix.items()))
+        while time.perf_counter() < deadline:
+            getattr(self, self.rng.choices(scenarios, weights)[0])()
+
+
+def run_load_test(base_url, users, duration, mix=None, seed=0):
+    """Logs users in, then runs them concurrently, one thread each.
+
+    Args:
+        base_url (str): root URL of the tested server.
+        users (list): `SyntheticUser` instances.
+        duration (float): seconds the users keep sending requests.
+        mix (dict): scenario weights, defaults to `DEFAULT_MIX`.
+        seed (int): seed of the scenario choices.
+
+    Returns:
+        (list, float): the `Sample` instances and the elapsed time.
+    """
+    virtual_users = [
+        VirtualUser(base_url, user, random.Random(seed + index))
+        for index, user in enumerate(users)
+    ]
+    for virtual_user in virtual_users:
+        virtual_user.log_in()
+    started_at = time.perf_counter()
+    threads = [
+        threading.Thread(
+            target=virtual_user.run,
+            args=(started_at + duration, mix or DEFAULT_MIX)
+        )
+        for virtual_user in virtual_users
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started_at
+    samples = [
+        sample
+        for virtual_user in virtual_users
+        for sample in virtual_user.samples
+    ]
+    return samples, elapsed
+
+
+def is_error(sample):
+    """Tells whether a request failed.
+
+    Successful form posts redirect, so a posted form rendered again had
+    errors, and pages redirect when the session was lost.
+    """
+    if sample.endpoint.endswith(' POST'):
+        return sample.status != 302
+    return sample.status != 200
+
+
+def summarize(samples, elapsed):
+    """Aggregates samples per endpoint.
+
+    Returns:
+        dict: dicts with the `requests` count, `throughput` in requests per
+            second, `p50`, `p95` and `p99` latencies in milliseconds, mean
+            `queries` (`None` without query count header) and `errors`
+            count, by endpoint.
+    """
+    by_endpoint = collections.defaultdict(list)
+    for sample in samples:
+        by_endpoint[sample.endpoint].append(sample)
+    results = {}
+    for endpoint, endpoint_samples in sorted(by_endpoint.items()):
+        latencies = [sample.latency * 1000 for sample in endpoint_samples]
+        queries = [
+            sample.queries for sample in endpoint_samples
+            if sample.queries is not None
+        ]
+        results[endpoint] = {
+            'requests': len(endpoint_samples),
+            'throughput': len(endpoint_samples) / elapsed,
+            'p50': get_percentile(latencies, 50),
+            'p95': get_percentile(latencies, 95),
+            'p99': get_percentile(latencies, 99),
+            'queries': sum(queries) / len(queries) if queries else None,
+            'errors': sum(1 for sample in endpoint_samples if is_error(sample)),
+        }
+    return results
+
+
+def compare_with_baseline(results, baseline, tolerance=0.2):
+    """Lists the budget regressions of results against a baseline.
+
+    Throughput and p95 latency may regress by `tolerance` at most, query
+    counts not at all, and no request may fail.
+
+    Args:
+        results (dict): results of `summarize`.
+        baseline (dict): stored results of `summarize`.
+        tolerance (float): allowed relative regression.
+
+    Returns:
+        list: descriptions of the regressions.
+    """
+    regressions = []
+    for endpoint, result in sorted(results.items()):
+        if result['errors']:
+            regressions.append('{0}: {1} failed requests'.format(
+                endpoint,
+                result['errors']
+            ))
+        expected = baseline.get(endpoint)
+        if expected is None:
+            continue
+        if result['throughput'] < expected['throughput'] * (1 - tolerance):
+            regressions.append('{0}: throughput {1:.1f}/s < {2:.1f}/s'.format(
+                endpoint,
+                result['throughput'],
+                expected['throughput']
+            ))
+        if result['p95'] > expected['p95'] * (1 + tolerance):
+            regressions.append('{0}: p95 {1:.1f} ms > {2:.1f} ms'.format(
+                endpoint,
+                result['p95'],
+                expected['p95']
+            ))
+        if (result['queries'] is not None and
+                expected['queries'] is not None and
+                result['queries'] > expected['queries'] + 0.5):
+            regressions.append('{0}: {1:.1f} queries > {2:.1f}'.format(
+                endpoint,
+                result['queries'],
+                expected['queries']
+            ))
+    return regressions
@@ -0,0 +1,98 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from social_autoscheduler.publication_scheduler.dispatcher import Dispatcher
+from social_autoscheduler.publication_scheduler.models import Category
+from social_autoscheduler.publication_scheduler.publishing import PublishJob
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures how the dispatcher serves thousands of accounts when one '
+        'noisy account has a burst of due posts. Runs in memory only.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--accounts', type=int, default=5000,
+                            help='Number of quiet accounts.')
+        parser.add_argument('--jobs-per-account', type=int, default=2,
+                            help='Number of due posts per quiet account.')
+        parser.add_argument('--noisy-jobs', type=int, default=20000,
+                            help='Number of due posts of the noisy account.')
+        parser.add_argument('--rate', type=int, default=0,
+                            help='Maximum number of posts per minute and '
+                                 'account, 0 for no limit.')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Maximum number of jobs enqueued per step, '
+                                 '0 for no limit.')
+
+    def handle(self, *args, **options):
+        now = time.time()
+        enqueued = []
+        dispatcher = Dispatcher(
+            horizon=60,
+            enqueue=enqueued.append,
+            rate=options['rate'] or None,
+            batch_size=options['batch_size'] or None,
+            now=now,
+        )
+        # The noisy account queues first, as if its occurrences fired first.
+        accounts = [(0, options['noisy_jobs'])] + [
+            (pk, options['jobs_per_account'])
+            for pk in range(1, options['accounts'] + 1)
+        ]
+        fifo_positions = []
+        pushed = 0
+        for account_pk, count in accounts:
+            for index in range(count):
+                job = PublishJob(pushed, 0, 0, 1, '', [], account_pk)
+                dispatcher.push(job, account_pk, now + 3600, Category.NORMAL)
+                if account_pk and not index:
+                    fifo_positions.append(pushed)
+                pushed += 1
+
+        steps = []
+        while dispatcher.queues:
+            start = time.perf_counter()
+            count = dispatcher.drain(now)
+            steps.append(time.perf_counter() - start)
+            if not count:
+                break
+        elapsed = sum(steps)
+
+        first_positions = {}
+        for position, job in enumerate(enqueued):
+            if job.account_pk and job.account_pk not in first_positions:
+                first_positions[job.account_pk] = position
+        positions = list(first_positions.values())
+        self.stdout.write(
+            '{jobs} jobs of {accounts} accounts enqueued in {steps} steps, '
+            '{throughput:.0f} jobs/s, {step:.2f} ms per step'.format(
+                jobs=len(enqueued),
+                accounts=len(accounts),
+                steps=len(steps),
+                throughput=len(enqueued) / max(elapsed, 1e-9),
+                step=elapsed / max(len(steps), 1) * 1000,
+            )
+        )
+        if positions:
+            self.stdout.write(
+                'First post of quiet accounts enqueued at position '
+                'p50 {p50}, p99 {p99}, against p50 {fifo_p50}, p99 {fifo_p99} '
+                'first in first out'.format(
+                    p50=percentile(positions, 0.5),
+                    p99=percentile(positions, 0.99),
+                    fifo_p50=percentile(fifo_positions, 0.5),
+                    fifo_p99=percentile(fifo_positions, 0.99),
+                )
+            )
+        if dispatcher.queues:
+            self.stdout.write('{0} jobs are waiting for their rate'.format(
+                sum(len(queue) for queue in dispatcher.queues.values())
+            ))
@@ -0,0 +1,156 @@
+import datetime
+import multiprocessing
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.utils import timezone
+
+from schedule.models import Rule
+
+from social_autoscheduler.publication_scheduler.dispatcher import Dispatcher
+from social_autoscheduler.publication_scheduler.models import (
+    Category,
+    PublishEvent,
+    ScheduledOccurrence,
+)
+from social_autoscheduler.publication_scheduler.sharding import (
+    ShardLeases,
+    get_redis,
+)
+from social_autoscheduler.publication_scheduler.simulation import (
+    create_synthetic_schedule,
+)
+
+
+def run_instance(instance_id, lease_ttl, start, deadline, results):
+    """Runs a sharded dispatcher with a no-op enqueue until its wheel drains.
+
+    The time at which the wheel drained is put in the `results` queue.
+    """
+    leases = ShardLeases(get_redis(), instance_id=instance_id, ttl=lease_ttl)
+    dispatcher = Dispatcher(
+        horizon=60,
+        tick=0.01,
+        refill_interval=1,
+        leases=leases,
+        enqueue=lambda job: None,
+    )
+    try:
+        while time.time() < deadline:
+            now = time.time()
+            dispatcher.step(now)
+            if now > start and not dispatcher.wheel:
+                break
+            time.sleep(max(dispatcher.wheel.tick - (time.time() - now), 0))
+    finally:
+        results.put(time.time())
+        leases.release()
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures how occurrence claims scale with the number of sharded '
+        'dispatcher instances, run as local processes. Requires Redis.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--instances', default='1,2,4',
+                            help='Comma separated numbers of instances to '
+                                 'benchmark.')
+        parser.add_argument('--events', type=int, default=512,
+                            help='Number of synthetic publish events.')
+        parser.add_argument('--occurrences', type=int, default=10,
+                            help='Number of occurrences due per event.')
+        parser.add_argument('--lease-ttl', type=float, default=2,
+                            help='Lifetime of shard leases, in seconds.')
+        parser.add_argument('--timeout', type=float, default=60,
+                            help='Seconds after which instances give up.')
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        networks = create_synthetic_schedule(
+            options['events'],
+            now=now + datetime.timedelta(days=365),
+        )
+        events = PublishEvent.objects.filter(
+            social_networks__in=networks
+        ).distinct()
+        event_pks = list(events.values_list('pk', flat=True))
+        try:
+            baseline = None
+            for instances in map(int, options['instances'].split(',')):
+                throughput = self.benchmark(event_pks, instances, options)
+                if not baseline:
+                    baseline = throughput / instances
+                self.stdout.write(
+                    '{instances} instances: {throughput:.0f} claims/s, '
+                    'scaling efficiency {efficiency:.0%}'.format(
+                        instances=instances,
+                        throughput=throughput,
+                        efficiency=(
+                            throughput / instances / baseline if baseline else 0
+                        ),
+                    )
+                )
+        finally:
+            rule_pks = set(events.values_list('rule', flat=True))
+            category_pks = set(events.values_list('category', flat=True))
+            PublishEvent.objects.filter(pk__in=event_pks).delete()
+            Rule.objects.filter(pk__in=rule_pks).delete()
+            Category.objects.filter(pk__in=category_pks).delete()
+            for network in networks:
+                network.delete()
+
+    def benchmark(self, event_pks, instances, options):
+        """Claims occurrences due at once with several instances.
+
+        Returns:
+            float: the number of claimed occurrences per second.
+        """
+        # Leave the instances time to join and settle their leases before
+        # occurrences are due.
+        start = timezone.now() + datetime.timedelta(
+            seconds=options['lease_ttl'] * 3
+        )
+        occurrences = ScheduledOccurrence.objects.bulk_create(
+            ScheduledOccurrence(
+                publish_event_id=pk,
+                fire_at=start + datetime.timedelta(microseconds=index),
+            )
+            for pk in event_pks
+            for index in range(options['occurrences'])
+        )
+        # Forked processes must not share the parent's connection.
+        connections.close_all()
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(target=run_instance, args=(
+                'benchmark-{0}'.format(index),
+                options['lease_ttl'],
+                start.timestamp(),
+                start.timestamp() + options['timeout'],
+                results,
+            ))
+            for index in range(instances)
+        ]
+        for process in processes:
+            process.start()
+        finished_at = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+
+        count = ScheduledOccurrence.objects.filter(
+            publish_event_id__in=event_pks,
+            claimed_at__isnull=False,
+        ).count()
+        ScheduledOccurrence.objects.filter(
+            publish_event_id__in=event_pks
+        ).delete()
+        if count < len(occurrences):
+            self.stderr.write('{0} occurrences were not claimed'.format(
+                len(occurrences) - count
+            ))
+        elapsed = max(finished_at) - start.timestamp()
+        return count / max(elapsed, 0.001)
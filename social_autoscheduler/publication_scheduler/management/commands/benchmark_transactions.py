@@ -0,0 +1,90 @@
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test import Client
+
+URL_NAMES = [
+    'publication:publication-list',
+    'publication:publication-create',
+    'publication:category-create',
+    'publication:publish-event-create',
+]
+
+
+class TransactionTimer(object):
+    """Measures the time a database connection spends inside transactions.
+
+    Wraps the connection's `set_autocommit` method, which atomic blocks call
+    when entering and leaving the outermost transaction.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.set_autocommit = connection.set_autocommit
+        self.started_at = None
+        self.total = 0.0
+
+    def __enter__(self):
+        self.connection.set_autocommit = self.wrapped_set_autocommit
+        return self
+
+    def __exit__(self, *exc_info):
+        self.connection.set_autocommit = self.set_autocommit
+
+    def wrapped_set_autocommit(self, autocommit, *args, **kwargs):
+        if not autocommit:
+            self.started_at = time.perf_counter()
+        elif self.started_at is not None:
+            self.total += time.perf_counter() - self.started_at
+            self.started_at = None
+        return self.set_autocommit(autocommit, *args, **kwargs)
+
+
+class Command(BaseCommand):
+    help = (
+        'Compares request latency and transaction hold time with '
+        'ATOMIC_REQUESTS enabled and with per-view transactions.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=100,
+                            help='Number of requests per URL and mode.')
+
+    def handle(self, *args, **options):
+        user, _ = get_user_model().objects.get_or_create(
+            username='transaction-benchmark'
+        )
+        client = Client()
+        client.force_login(user)
+        atomic_requests = connection.settings_dict['ATOMIC_REQUESTS']
+        try:
+            for mode in (True, False):
+                connection.settings_dict['ATOMIC_REQUESTS'] = mode
+                self.stdout.write('ATOMIC_REQUESTS = {0}'.format(mode))
+                for url_name in URL_NAMES:
+                    self.benchmark(client, reverse(url_name), options['requests'])
+        finally:
+            connection.settings_dict['ATOMIC_REQUESTS'] = atomic_requests
+
+    def benchmark(self, client, url, requests):
+        """Sends `requests` GET requests to `url` and prints timings.
+        """
+        latencies, transaction_times = [], []
+        for _ in range(requests):
+            with TransactionTimer(connection) as timer:
+                started_at = time.perf_counter()
+                client.get(url)
+                latencies.append(time.perf_counter() - started_at)
+            transaction_times.append(timer.total)
+        self.stdout.write(
+            '  {url}: latency {latency:.2f} ms, '
+            'in transaction {transaction:.2f} ms'.format(
+                url=url,
+                latency=statistics.mean(latencies) * 1000,
+                transaction=statistics.mean(transaction_times) * 1000,
+            )
+        )
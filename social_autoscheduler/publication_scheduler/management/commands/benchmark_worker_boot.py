@@ -0,0 +1,68 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        'Compares worker boot time and per-child memory between settings '
+        'profiles. Each profile is booted in a fresh interpreter which forks '
+        'children like the prefork pool.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles',
+                            default='config.settings.production,'
+                                    'config.settings.worker',
+                            help='Comma separated settings modules to '
+                                 'compare.')
+        parser.add_argument('--children', type=int, default=4,
+                            help='Number of forked children per profile.')
+        parser.add_argument('--runs', type=int, default=3,
+                            help='Number of boots per profile.')
+
+    def handle(self, *args, **options):
+        for profile in options['profiles'].split(','):
+            results = [
+                self.boot(profile, options['children'])
+                for _ in range(options['runs'])
+            ]
+            children = [
+                usage for result in results for usage in result['children']
+            ]
+            self.stdout.write(
+                '{profile}: boot {boot:.0f} ms, main RSS {main:.0f} kB, '
+                'child RSS {rss:.0f} kB of which private {private:.0f} kB'.format(
+                    profile=profile,
+                    boot=statistics.median(
+                        result['boot_time'] for result in results
+                    ) * 1000,
+                    main=statistics.median(
+                        result['main']['rss'] for result in results
+                    ),
+                    rss=statistics.median(usage['rss'] for usage in children),
+                    private=statistics.median(
+                        usage['private'] for usage in children
+                    ),
+                )
+            )
+
+    def boot(self, profile, children):
+        """Boots a settings profile in a new interpreter.
+
+        Returns:
+            dict: the measures printed by `social_autoscheduler.taskapp.boot`.
+        """
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=profile)
+        output = subprocess.check_output(
+            [sys.executable, '-m', 'social_autoscheduler.taskapp.boot',
+             str(children)],
+            env=env,
+            cwd=str(settings.ROOT_DIR),
+        )
+        return json.loads(output.decode().splitlines()[-1])
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from social_autoscheduler.publication_scheduler.catch_up import catch_up
+
+
+def parse_option(value):
+    if value is None:
+        return None
+    moment = parse_datetime(value)
+    if moment is None or moment.tzinfo is None:
+        raise CommandError(
+            'Invalid datetime {0!r}, use ISO 8601 with a UTC offset.'.format(value)
+        )
+    return moment
+
+
+class Command(BaseCommand):
+    help = (
+        'Handles publish event occurrences missed during a downtime window, '
+        'according to the catch-up policy of their category.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since',
+                            help='Beginning of the downtime window, e.g. '
+                                 '2026-10-19T08:00:00+00:00.')
+        parser.add_argument('--until',
+                            help='End of the downtime window, defaults to '
+                                 'the beginning of the dispatcher grace '
+                                 'period.')
+
+    def handle(self, *args, **options):
+        report = catch_up(
+            start=parse_option(options['since']),
+            end=parse_option(options['until'])
+        )
+        self.stdout.write(
+            '{0.missed} missed occurrences, {0.caught_up} caught up, '
+            '{0.jobs} jobs enqueued.'.format(report)
+        )
@@ -0,0 +1,154 @@
+import json
+import os
+
+from allauth.account.models import EmailAddress
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from social_autoscheduler.publication_scheduler.load_testing import (
+    SyntheticUser,
+    compare_with_baseline,
+    run_load_test,
+    summarize,
+)
+from social_autoscheduler.publication_scheduler.models import (
+    Category,
+    SocialNetwork,
+)
+
+PASSWORD = 'load-test-password'
+
+USERNAME_PREFIX = 'load-test-'
+
+SOCIAL_NETWORK_PREFIX = 'Load test network '
+
+
+def delete_synthetic_data():
+    """Deletes the synthetic users, with everything they created.
+    """
+    get_user_model().objects.filter(
+        username__startswith=USERNAME_PREFIX
+    ).delete()
+    SocialNetwork.objects.filter(
+        name__startswith=SOCIAL_NETWORK_PREFIX
+    ).delete()
+
+
+class Command(BaseCommand):
+    help = (
+        'Load tests the publication scheduler pages of a running server with '
+        'synthetic users, and fails if throughput, latency or query counts '
+        'regress against the stored baseline. Start the server with '
+        'DJANGO_DB_QUERY_COUNT_HEADER=True to record query counts.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000',
+                            help='Root URL of the tested server.')
+        parser.add_argument('--users', type=int, default=10,
+                            help='Number of concurrent synthetic users.')
+        parser.add_argument('--duration', type=float, default=60,
+                            help='Seconds of load.')
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Seed of the scenario choices.')
+        parser.add_argument('--baseline',
+                            default=str(settings.ROOT_DIR.path(
+                                'loadtest_baseline.json')),
+                            help='Path of the baseline results.')
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help='Allowed relative regression of throughput '
+                                 'and p95 latency.')
+        parser.add_argument('--save-baseline', action='store_true',
+                            help='Store the results as the new baseline '
+                                 'instead of comparing them.')
+
+    def handle(self, *args, **options):
+        # Left over by an interrupted run.
+        delete_synthetic_data()
+        try:
+            samples, elapsed = run_load_test(
+                options['url'],
+                self.create_users(options['users']),
+                options['duration'],
+                seed=options['seed'],
+            )
+        finally:
+            delete_synthetic_data()
+        results = summarize(samples, elapsed)
+        self.report(results)
+
+        if options['save_baseline']:
+            with open(options['baseline'], 'w') as output:
+                json.dump(results, output, indent=2, sort_keys=True)
+            self.stdout.write('Baseline saved to ' + options['baseline'])
+            return
+        baseline = {}
+        if os.path.exists(options['baseline']):
+            with open(options['baseline']) as baseline_file:
+                baseline = json.load(baseline_file)
+        else:
+            self.stderr.write('No baseline at {0}, record one with '
+                              '--save-baseline'.format(options['baseline']))
+        regressions = compare_with_baseline(
+            results,
+            baseline,
+            options['tolerance']
+        )
+        if regressions:
+            raise CommandError('Budget regressed:\n' + '\n'.join(regressions))
+
+    def create_users(self, count):
+        """Creates verified users, each owning a category.
+
+        Returns:
+            list: the `SyntheticUser` instances.
+        """
+        social_networks = [
+            SocialNetwork.objects.create(name=SOCIAL_NETWORK_PREFIX + str(index))
+            for index in range(2)
+        ]
+        users = []
+        for index in range(count):
+            user = get_user_model().objects.create_user(
+                username=USERNAME_PREFIX + str(index),
+                email='{0}{1}@example.com'.format(USERNAME_PREFIX, index),
+                password=PASSWORD,
+            )
+            EmailAddress.objects.create(
+                user=user,
+                email=user.email,
+                verified=True,
+                primary=True,
+            )
+            category = Category.objects.create(
+                name='Load test category {0}'.format(index),
+                created_by=user,
+            )
+            users.append(SyntheticUser(
+                user.username,
+                PASSWORD,
+                [category.pk],
+                [social_network.pk for social_network in social_networks],
+            ))
+        return users
+
+    def report(self, results):
+        """Prints the results per endpoint.
+        """
+        for endpoint, result in results.items():
+            self.stdout.write(
+                '{endpoint}: {requests} requests, {throughput:.1f}/s, '
+                'p50 {p50:.1f} ms, p95 {p95:.1f} ms, p99 {p99:.1f} ms, '
+                'queries {queries}, errors {errors}'.format(
+                    endpoint=endpoint,
+                    queries=(
+                        '-' if result['queries'] is None
+                        else '{0:.1f}'.format(result['queries'])
+                    ),
+                    **{
+                        key: value for key, value in result.items()
+                        if key != 'queries'
+                    }
+                )
+            )
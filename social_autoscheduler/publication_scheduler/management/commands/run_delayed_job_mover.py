@@ -0,0 +1,33 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from social_autoscheduler.publication_scheduler.delayed_jobs import (
+    DelayedJobMover,
+    get_delayed_queue,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Runs the mover promoting due delayed publish jobs, such as retries, '
+        'to the publish queue.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Maximum number of jobs taken at once.')
+        parser.add_argument('--interval', type=float, default=1,
+                            help='Seconds between two promotions.')
+
+    def handle(self, *args, **options):
+        mover = DelayedJobMover(
+            get_delayed_queue(),
+            batch_size=options['batch_size'],
+            interval=options['interval'],
+        )
+        signal.signal(signal.SIGTERM, mover.stop)
+        signal.signal(signal.SIGINT, mover.stop)
+        self.stdout.write('Delayed job mover started')
+        mover.run()
+        self.stdout.write('Delayed job mover stopped')
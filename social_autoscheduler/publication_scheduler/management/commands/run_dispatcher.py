@@ -0,0 +1,69 @@
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from social_autoscheduler.publication_scheduler.delayed_jobs import (
+    get_delayed_queue,
+)
+from social_autoscheduler.publication_scheduler.dispatcher import (
+    Dispatcher,
+    get_account_rates,
+)
+from social_autoscheduler.publication_scheduler.sharding import (
+    ShardLeases,
+    get_redis,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Runs the dispatcher daemon, publishing occurrences within a tick of '
+        'their fire time.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--horizon', type=float, default=600,
+                            help='Seconds of occurrences kept in memory.')
+        parser.add_argument('--tick', type=float, default=0.1,
+                            help='Dispatch precision, in seconds.')
+        parser.add_argument('--refill-interval', type=float, default=5,
+                            help='Seconds between two loads of occurrences '
+                                 'entering the horizon.')
+        parser.add_argument('--reconcile-interval', type=float, default=30,
+                            help='Seconds between two reconciliations with '
+                                 'the occurrence index.')
+        parser.add_argument('--sharded', action='store_true',
+                            help='Only dispatch the shards leased by this '
+                                 'instance, to run several instances.')
+        parser.add_argument('--lease-ttl', type=float, default=10,
+                            help='Lifetime of shard leases, in seconds.')
+        parser.add_argument('--rate', type=int,
+                            default=settings.PUBLICATION_SCHEDULER_ACCOUNT_RATE,
+                            help='Maximum number of posts per minute and '
+                                 'account, 0 for no limit.')
+        parser.add_argument('--batch-size', type=int,
+                            default=settings.PUBLICATION_SCHEDULER_DISPATCH_TICK_BATCH_SIZE,
+                            help='Maximum number of jobs enqueued per tick, '
+                                 '0 for no limit.')
+
+    def handle(self, *args, **options):
+        leases = None
+        if options['sharded']:
+            leases = ShardLeases(get_redis(), ttl=options['lease_ttl'])
+        dispatcher = Dispatcher(
+            horizon=options['horizon'],
+            tick=options['tick'],
+            refill_interval=options['refill_interval'],
+            reconcile_interval=options['reconcile_interval'],
+            leases=leases,
+            rate=options['rate'] or None,
+            rates=get_account_rates(),
+            batch_size=options['batch_size'] or None,
+            journal=get_delayed_queue(),
+        )
+        signal.signal(signal.SIGTERM, dispatcher.stop)
+        signal.signal(signal.SIGINT, dispatcher.stop)
+        self.stdout.write('Dispatcher started')
+        dispatcher.run()
+        self.stdout.write('Dispatcher stopped')
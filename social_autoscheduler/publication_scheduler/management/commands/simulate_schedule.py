@@ -0,0 +1,129 @@
+import csv
+import datetime
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from social_autoscheduler.publication_scheduler.dispatcher import (
+    get_account_rates,
+)
+from social_autoscheduler.publication_scheduler.occurrences import (
+    refresh_occurrence_index,
+)
+from social_autoscheduler.publication_scheduler.simulation import (
+    MinuteStats,
+    Simulation,
+    create_synthetic_schedule,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Replays the dispatch of publish events over virtual time, through '
+        'the dispatcher daemon and a fake network, and reports queue depth, '
+        'worker utilization and deferred or dropped posts. Nothing is '
+        'published nor persisted.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=7,
+                            help='Number of days to simulate.')
+        parser.add_argument('--rules', type=int, default=0,
+                            help='Number of synthetic weekly publish events '
+                                 'to add to the existing ones.')
+        parser.add_argument('--networks', type=int, default=1,
+                            help='Number of synthetic social networks.')
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Seed of the synthetic schedule.')
+        parser.add_argument('--workers', type=int,
+                            default=settings.CELERYD_CONCURRENCY or 4,
+                            help='Number of concurrent workers.')
+        parser.add_argument('--job-duration', type=float, default=1.0,
+                            help='Seconds the fake network takes per post.')
+        parser.add_argument('--rate', type=int,
+                            default=settings.PUBLICATION_SCHEDULER_ACCOUNT_RATE,
+                            help='Maximum posts per minute and account, 0 '
+                                 'for no limit.')
+        parser.add_argument('--batch-size', type=int,
+                            default=settings.PUBLICATION_SCHEDULER_DISPATCH_TICK_BATCH_SIZE,
+                            help='Maximum number of jobs enqueued per tick, '
+                                 '0 for no limit.')
+        parser.add_argument('--tick', type=float, default=1,
+                            help='Dispatch precision, in seconds.')
+        parser.add_argument('--output',
+                            help='Path of a CSV file receiving per-minute '
+                                 'statistics.')
+
+    def handle(self, *args, **options):
+        if options['days'] < 1:
+            raise CommandError('Simulate at least one day.')
+        started_at = time.perf_counter()
+        start = timezone.now().replace(second=0, microsecond=0)
+        with transaction.atomic():
+            if options['rules']:
+                create_synthetic_schedule(
+                    options['rules'],
+                    social_networks=options['networks'],
+                    now=start,
+                    seed=options['seed'],
+                )
+            refresh_occurrence_index(
+                now=start,
+                horizon=datetime.timedelta(days=options['days'])
+            )
+            self.stdout.write('Schedule ready in {0:.1f}s'.format(
+                time.perf_counter() - started_at
+            ))
+            simulation = Simulation(
+                options['workers'],
+                options['job_duration'],
+                rate=options['rate'] or None,
+                rates=get_account_rates(),
+                batch_size=options['batch_size'] or None,
+                tick=options['tick'],
+            )
+            minutes = list(simulation.run(start, options['days'] * 24 * 60))
+            transaction.set_rollback(True)
+
+        if options['output']:
+            with open(options['output'], 'w', newline='') as output:
+                writer = csv.writer(output)
+                writer.writerow(MinuteStats._fields)
+                writer.writerows(minutes)
+        self.report(minutes, time.perf_counter() - started_at)
+
+    def report(self, minutes, elapsed):
+        """Prints the totals of a simulation.
+        """
+        depths = sorted(stats.queue_depth for stats in minutes)
+        self.stdout.write(
+            'claimed={claimed} published={published} deferred={deferred} '
+            'dropped={dropped}'.format(
+                claimed=sum(stats.claimed for stats in minutes),
+                published=sum(stats.published for stats in minutes),
+                deferred=sum(stats.deferred for stats in minutes),
+                dropped=sum(stats.dropped for stats in minutes),
+            )
+        )
+        self.stdout.write(
+            'queue depth: p50={p50} p99={p99} max={max}'.format(
+                p50=depths[len(depths) // 2],
+                p99=depths[int(len(depths) * 0.99)],
+                max=depths[-1],
+            )
+        )
+        busy = [stats.utilization for stats in minutes if stats.published]
+        self.stdout.write(
+            'worker utilization: mean={mean:.1%} busy-minutes mean={busy:.1%} '
+            'max={max:.1%}'.format(
+                mean=sum(stats.utilization for stats in minutes) / len(minutes),
+                busy=sum(busy) / len(busy) if busy else 0,
+                max=max(stats.utilization for stats in minutes),
+            )
+        )
+        self.stdout.write(
+            'Simulated {0} minutes in {1:.1f}s'.format(len(minutes), elapsed)
+        )
@@ -0,0 +1,262 @@
+"""Content-addressed storage of publication media files.
+
+Uploaded files are hashed while being read in chunks, and stored under their
+SHA-256 digest: a file attached to many publications is stored only once.
+Thumbnails are generated by a Celery task, outside of the request.
+
+Network-side media ids are cached per blob, social network and account, so a
+media posted again by a rotation is not uploaded again while its id is valid.
+"""
+import hashlib
+import io
+import mimetypes
+import time
+
+from django.core.files.base import ContentFile
+from django.db import IntegrityError, transaction
+
+from social_autoscheduler.publication_scheduler.caching import TieredCache
+
+from social_autoscheduler.publication_scheduler.models import (
+    Attachment,
+    MediaBlob,
+    get_blob_path,
+)
+
+CHUNK_SIZE = 64 * 1024
+
+THUMBNAIL_SIZE = (320, 320)
+
+# Media ids expiring within this number of seconds are refreshed before use.
+MEDIA_ID_REFRESH_MARGIN = 60 * 60
+
+
+def get_sha256(uploaded_file):
+    """Hashes a file by reading it in chunks.
+
+    Args:
+        uploaded_file (:obj:`File`): the file to hash.
+
+    Returns:
+        str: the hex digest of the file content.
+    """
+    sha256 = hashlib.sha256()
+    for chunk in uploaded_file.chunks(CHUNK_SIZE):
+        sha256.update(chunk)
+    uploaded_file.seek(0)
+    return sha256.hexdigest()
+
+
+def store_blob(uploaded_file):
+    """Stores a file, unless a file with the same content is already stored.
+
+    Args:
+        uploaded_file (:obj:`UploadedFile`): the file to store.
+
+    Returns:
+        :obj:`MediaBlob`: the new or existing blob.
+    """
+    sha256 = get_sha256(uploaded_file)
+    blob = MediaBlob.objects.filter(sha256=sha256).first()
+    if blob is not None:
+        return blob
+
+    content_type = (
+        getattr(uploaded_file, 'content_type', None) or
+        mimetypes.guess_type(uploaded_file.name)[0] or
+        'application/octet-stream'
+    )
+    blob = MediaBlob(
+        sha256=sha256,
+        content_type=content_type,
+        size=uploaded_file.size,
+    )
+    path = get_blob_path(blob, uploaded_file.name)
+    if blob.file.storage.exists(path):
+        blob.file.name = path
+    else:
+        blob.file.save(uploaded_file.name, uploaded_file, save=False)
+    try:
+        with transaction.atomic():
+            blob.save()
+    except IntegrityError:
+        # Stored concurrently by another request, both wrote the same content
+        # at the same path.
+        return MediaBlob.objects.get(sha256=sha256)
+
+    if blob.is_image:
+        from social_autoscheduler.publication_scheduler.tasks import (
+            generate_thumbnail,
+        )
+        transaction.on_commit(lambda: generate_thumbnail.delay(blob.pk))
+    return blob
+
+
+def attach_blobs(publication, blobs):
+    """Attaches stored blobs to a publication, in order.
+
+    Args:
+        publication (:obj:`Publication`): the publication to attach blobs to.
+        blobs (list): the `MediaBlob` instances to attach.
+
+    Returns:
+        list: the created `Attachment` instances.
+    """
+    return Attachment.objects.bulk_create([
+        Attachment(publication=publication, blob=blob, position=position)
+        for position, blob in enumerate(blobs)
+    ])
+
+
+def attach_files(publication, uploaded_files):
+    """Stores files and attaches them to a publication.
+
+    Args:
+        publication (:obj:`Publication`): the publication to attach files to.
+        uploaded_files (list): the `UploadedFile` instances to attach.
+
+    Returns:
+        list: the created `Attachment` instances.
+    """
+    return attach_blobs(
+        publication,
+        [store_blob(uploaded_file) for uploaded_file in uploaded_files]
+    )
+
+
+def iter_blob_chunks(blob, chunk_size=CHUNK_SIZE):
+    """Reads a stored blob in chunks, without loading it fully in memory.
+
+    Args:
+        blob (:obj:`MediaBlob`): the blob to read.
+        chunk_size (int): size of the chunks, in bytes.
+
+    Yields:
+        bytes: the consecutive chunks of the blob.
+    """
+    blob.file.open('rb')
+    try:
+        for chunk in blob.file.chunks(chunk_size):
+            yield chunk
+    finally:
+        blob.file.close()
+
+
+def generate_thumbnail(blob):
+    """Generates and stores the thumbnail of an image blob.
+
+    Args:
+        blob (:obj:`MediaBlob`): the image blob.
+    """
+    from PIL import Image
+
+    blob.file.open('rb')
+    try:
+        image = Image.open(blob.file)
+        image.thumbnail(THUMBNAIL_SIZE)
+        output = io.BytesIO()
+        image.convert('RGB').save(output, format='JPEG')
+    finally:
+        blob.file.close()
+    blob.thumbnail.save(
+        'thumbnail.jpg',
+        ContentFile(output.getvalue()),
+        save=False
+    )
+    MediaBlob.objects.filter(pk=blob.pk).update(thumbnail=blob.thumbnail.name)
+
+
+class MediaIdCache(object):
+    """Cache of network-side media ids, by blob, social network and account.
+
+    Entries are `(media_id, expires_at)` tuples stored until they expire. An
+    entry close to its expiry is refreshed by uploading the media again before
+    it is used, so posts never reference an expired media id. Entries which
+    would need a refresh when upcoming posts are published are refreshed ahead
+    of time by `refresh_media_id`, see `publishing.refresh_media_ids`.
+
+    Hits, misses and refreshes are counted in the shared cache, see
+    `get_stats`.
+    """
+
+    STATS = ('hits', 'misses', 'refreshes')
+
+    def __init__(self, refresh_margin=MEDIA_ID_REFRESH_MARGIN):
+        self.refresh_margin = refresh_margin
+        self.cache = TieredCache('media_id')
+
+    def get_media_id(self, client, blob, now=None):
+        """Returns a valid network-side id of a blob, uploading it if needed.
+
+        Args:
+            client (:obj:`NetworkClient`): the client of the network account
+                the media is posted with.
+            blob (:obj:`MediaBlob`): the media blob.
+            now (float): current timestamp, defaults to `time.time()`.
+
+        Returns:
+            str: the network-side media id.
+        """
+        now = now or time.time()
+        key = self.get_key(client, blob)
+        entry = self.cache.get(key)
+        if entry is not None and self.is_live(entry[1], now):
+            self.cache.incr_stat('hits')
+            return entry[0]
+
+        self.cache.incr_stat('misses' if entry is None else 'refreshes')
+        return self.upload(client, blob, key, now)
+
+    def refresh_media_id(self, client, blob, due_at, now=None):
+        """Uploads a blob again if its cached id would need a refresh when
+        used by a post due at a given time.
+
+        Blobs without a cached id are left to be uploaded when used, and so
+        are blobs whose new id would need a refresh by then anyway.
+
+        Args:
+            client (:obj:`NetworkClient`): the client of the network account
+                the media will be posted with.
+            blob (:obj:`MediaBlob`): the media blob.
+            due_at (float): timestamp of the post.
+            now (float): current timestamp, defaults to `time.time()`.
+
+        Returns:
+            bool: whether the blob was uploaded.
+        """
+        now = now or time.time()
+        key = self.get_key(client, blob)
+        entry = self.cache.get(key)
+        if entry is None or self.is_live(entry[1], due_at):
+            return False
+        if not self.is_live(now + client.media_id_lifetime, due_at):
+            return False
+        self.cache.incr_stat('refreshes')
+        self.upload(client, blob, key, now)
+        return True
+
+    def is_live(self, expires_at, at):
+        """Returns whether an id expiring at a given time can be used
+        without refresh at another time.
+        """
+        return expires_at - at > self.refresh_margin
+
+    def get_key(self, client, blob):
+        return (blob.sha256, client.social_network.pk, client.account_key)
+
+    def upload(self, client, blob, key, now):
+        media_id = client.upload_media(blob, iter_blob_chunks(blob))
+        lifetime = client.media_id_lifetime
+        self.cache.set(key, (media_id, now + lifetime), timeout=lifetime)
+        return media_id
+
+    def get_stats(self):
+        """Returns the cache usage counters.
+
+        Returns:
+            dict: `hits`, `misses` and `refreshes` counters.
+        """
+        return self.cache.get_stats(*self.STATS)
+
+
+media_id_cache = MediaIdCache()
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11 on 2026-10-19 09:12
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('publication_scheduler', '0006_auto_20170512_1500'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='is_paused',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='socialnetwork',
+            name='is_paused',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='publishevent',
+            name='rotation_position',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='BlackoutWindow',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start', models.DateTimeField()),
+                ('end', models.DateTimeField()),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='blackout_windows', to='publication_scheduler.Category')),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='blackout_windows', to=settings.AUTH_USER_MODEL)),
+                ('social_network', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='blackout_windows', to='publication_scheduler.SocialNetwork')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ScheduledOccurrence',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fire_at', models.DateTimeField()),
+                ('is_suppressed', models.BooleanField(default=False)),
+                ('claimed_at', models.DateTimeField(blank=True, null=True)),
+                ('publish_event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='scheduled_occurrences', to='publication_scheduler.PublishEvent')),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='scheduledoccurrence',
+            unique_together=set([('publish_event', 'fire_at')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='scheduledoccurrence',
+            index_together=set([('claimed_at', 'is_suppressed', 'fire_at')]),
+        ),
+    ]
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11 on 2026-10-19 11:40
+from __future__ import unicode_literals
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def copy_social_networks(apps, schema_editor):
+    """Copies single social network foreign keys to the new many to many
+    relations.
+
+    Data migration function passed to migrations' `RunPython` method.
+    """
+    for model_name in ('Publication', 'PublishEvent'):
+        model = apps.get_model('publication_scheduler', model_name)
+        through = model.social_networks.through
+        foreign_key = '{0}_id'.format(model_name.lower())
+        through.objects.bulk_create([
+            through(**{foreign_key: pk, 'socialnetwork_id': social_network_id})
+            for pk, social_network_id
+            in model.objects.values_list('pk', 'social_network')
+        ])
+
+
+def copy_first_social_networks(apps, schema_editor):
+    """Copies the first many to many social network back to the single
+    social network foreign keys.
+
+    Reverse data migration function passed to migrations' `RunPython` method.
+    """
+    for model_name in ('Publication', 'PublishEvent'):
+        model = apps.get_model('publication_scheduler', model_name)
+        through = model.social_networks.through
+        foreign_key = '{0}_id'.format(model_name.lower())
+        first_social_networks = {}
+        for pk, social_network_id in through.objects.order_by(
+                'pk').values_list(foreign_key, 'socialnetwork_id'):
+            first_social_networks.setdefault(pk, social_network_id)
+        for pk, social_network_id in first_social_networks.items():
+            model.objects.filter(pk=pk).update(
+                social_network_id=social_network_id
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('publication_scheduler', '0007_occurrence_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='publication',
+            name='social_networks',
+            field=models.ManyToManyField(related_name='publications', to='publication_scheduler.SocialNetwork'),
+        ),
+        migrations.AddField(
+            model_name='publishevent',
+            name='social_networks',
+            field=models.ManyToManyField(related_name='publish_events', to='publication_scheduler.SocialNetwork'),
+        ),
+        migrations.AddField(
+            model_name='scheduledoccurrence',
+            name='excluded_social_networks',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.IntegerField(), blank=True, default=list, size=None),
+        ),
+        # Nullable, so that the foreign keys can be added back empty when the
+        # migration is unapplied.
+        migrations.AlterField(
+            model_name='publication',
+            name='social_network',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='publication_scheduler.SocialNetwork'),
+        ),
+        migrations.AlterField(
+            model_name='publishevent',
+            name='social_network',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='publication_scheduler.SocialNetwork'),
+        ),
+        migrations.RunPython(copy_social_networks, copy_first_social_networks),
+        migrations.RemoveField(
+            model_name='publication',
+            name='social_network',
+        ),
+        migrations.RemoveField(
+            model_name='publishevent',
+            name='social_network',
+        ),
+    ]
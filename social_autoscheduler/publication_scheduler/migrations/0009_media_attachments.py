@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11 on 2026-10-19 14:05
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+import social_autoscheduler.publication_scheduler.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('publication_scheduler', '0008_multi_network_fan_out'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True)),
+                ('file', models.FileField(max_length=255, upload_to=social_autoscheduler.publication_scheduler.models.get_blob_path)),
+                ('content_type', models.CharField(max_length=255)),
+                ('size', models.BigIntegerField()),
+                ('thumbnail', models.ImageField(blank=True, max_length=255, upload_to=social_autoscheduler.publication_scheduler.models.get_thumbnail_path)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Attachment',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveSmallIntegerField(default=0)),
+                ('blob', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attachments', to='publication_scheduler.MediaBlob')),
+                ('publication', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attachments', to='publication_scheduler.Publication')),
+            ],
+            options={
+                'ordering': ['position'],
+            },
+        ),
+    ]
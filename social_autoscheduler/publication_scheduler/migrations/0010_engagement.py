@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11 on 2026-10-19 16:20
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('publication_scheduler', '0009_media_attachments'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PublishedPost',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('network_post_id', models.CharField(blank=True, max_length=255)),
+                ('published_at', models.DateTimeField(db_index=True)),
+                ('likes', models.PositiveIntegerField(default=0)),
+                ('shares', models.PositiveIntegerField(default=0)),
+                ('clicks', models.PositiveIntegerField(default=0)),
+                ('sampled_at', models.DateTimeField(blank=True, null=True)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='published_posts', to='publication_scheduler.Category')),
+                ('occurrence', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='published_posts', to='publication_scheduler.ScheduledOccurrence')),
+                ('publication', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='published_posts', to='publication_scheduler.Publication')),
+                ('social_network', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='published_posts', to='publication_scheduler.SocialNetwork')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='EngagementSample',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sampled_at', models.DateTimeField()),
+                ('likes', models.PositiveIntegerField()),
+                ('shares', models.PositiveIntegerField()),
+                ('clicks', models.PositiveIntegerField()),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='engagement_samples', to='publication_scheduler.PublishedPost')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='EngagementRollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day'), ('slot', 'Weekly slot')], max_length=16)),
+                ('scope', models.CharField(choices=[('publication', 'Publication'), ('category', 'Category'), ('user', 'User')], max_length=16)),
+                ('scope_id', models.IntegerField()),
+                ('bucket', models.IntegerField()),
+                ('posts', models.PositiveIntegerField(default=0)),
+                ('likes', models.IntegerField(default=0)),
+                ('shares', models.IntegerField(default=0)),
+                ('clicks', models.IntegerField(default=0)),
+                ('social_network', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='engagement_rollups', to='publication_scheduler.SocialNetwork')),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='engagementrollup',
+            unique_together=set([('granularity', 'scope', 'scope_id', 'social_network', 'bucket')]),
+        ),
+    ]
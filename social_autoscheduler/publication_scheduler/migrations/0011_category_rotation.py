@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11 on 2026-10-19 17:05
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('publication_scheduler', '0010_engagement'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='rotation',
+            field=models.CharField(choices=[('round_robin', 'Round robin'), ('weighted', 'Weighted by engagement')], default='round_robin', max_length=16),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11 on 2026-10-19 17:40
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('publication_scheduler', '0011_category_rotation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='catch_up_policy',
+            field=models.CharField(choices=[('skip', 'Skip missed publications'), ('post_late', 'Post missed publications late'), ('compress', 'Post the last missed publication late')], default='compress', max_length=16),
+        ),
+        migrations.AddField(
+            model_name='scheduledoccurrence',
+            name='caught_up_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11 on 2026-10-19 18:30
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('publication_scheduler', '0012_catch_up'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DispatchShard',
+            fields=[
+                ('shard', models.IntegerField(primary_key=True, serialize=False)),
+                ('fencing_token', models.BigIntegerField(default=0)),
+            ],
+        ),
+    ]
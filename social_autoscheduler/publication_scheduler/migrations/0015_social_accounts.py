@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11 on 2026-10-19 23:40
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('socialaccount', '0003_extra_data_default_dict'),
+        ('publication_scheduler', '0014_category_deadlines'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='publishedpost',
+            name='social_account',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='published_posts', to='socialaccount.SocialAccount'),
+        ),
+        migrations.AddField(
+            model_name='publishevent',
+            name='social_accounts',
+            field=models.ManyToManyField(blank=True, related_name='publish_events', to='socialaccount.SocialAccount'),
+        ),
+    ]
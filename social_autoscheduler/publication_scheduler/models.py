@@ -1,4 +1,7 @@
+import os
+
 from django.conf import settings
+from django.contrib.postgres.fields import ArrayField
 from django.db import models
 from django.utils.text import Truncator
 
@@ -17,8 +20,64 @@ class Category(CategoryBase):
     Attributes:
         created_by (:obj:`models.ForeignKey`): user who created the category
             (foreign key to custom User model)
+        is_paused (:obj:`models.BooleanField`): whether publish events of the
+            category are currently suspended.
+        rotation (:obj:`models.CharField`): how publications of the category
+            are picked, in turn or weighted by their engagement.
+        catch_up_policy (:obj:`models.CharField`): what happens to occurrences
+            missed while publishing was down: skipped, all posted late, or
+            compressed into a single late post per event.
+        priority (:obj:`models.PositiveSmallIntegerField`): rank of the
+            publications of the category among the ones waiting for the same
+            account, at equal deadline.
+        lateness_tolerance (:obj:`models.PositiveIntegerField`): number of
+            minutes a publication may wait behind a rate limit after its
+            scheduled time. Once missed, it is dropped if the catch up policy
+            skips missed publications, else posted after the ones which are
+            still on time.
     """
+    ROUND_ROBIN = 'round_robin'
+    WEIGHTED = 'weighted'
+    ROTATION_CHOICES = [
+        (ROUND_ROBIN, 'Round robin'),
+        (WEIGHTED, 'Weighted by engagement'),
+    ]
+
+    SKIP = 'skip'
+    POST_LATE = 'post_late'
+    COMPRESS = 'compress'
+    CATCH_UP_POLICY_CHOICES = [
+        (SKIP, 'Skip missed publications'),
+        (POST_LATE, 'Post missed publications late'),
+        (COMPRESS, 'Post the last missed publication late'),
+    ]
+
+    LOW = 0
+    NORMAL = 1
+    HIGH = 2
+    PRIORITY_CHOICES = [
+        (LOW, 'Low'),
+        (NORMAL, 'Normal'),
+        (HIGH, 'High'),
+    ]
+
     created_by = models.ForeignKey(settings.AUTH_USER_MODEL)
+    is_paused = models.BooleanField(default=False)
+    rotation = models.CharField(
+        max_length=16,
+        choices=ROTATION_CHOICES,
+        default=ROUND_ROBIN
+    )
+    catch_up_policy = models.CharField(
+        max_length=16,
+        choices=CATCH_UP_POLICY_CHOICES,
+        default=COMPRESS
+    )
+    priority = models.PositiveSmallIntegerField(
+        choices=PRIORITY_CHOICES,
+        default=NORMAL
+    )
+    lateness_tolerance = models.PositiveIntegerField(default=60)
 
 
 class SocialNetwork(models.Model):
@@ -26,8 +85,11 @@ class SocialNetwork(models.Model):
 
     Attributes:
         name (:obj:`models.CharField`): name of the social network.
+        is_paused (:obj:`models.BooleanField`): whether publish events of the
+            social network are currently suspended.
     """
     name = models.CharField(max_length=255)
+    is_paused = models.BooleanField(default=False)
 
     def __str__(self):
         return self.name
@@ -39,14 +101,18 @@ class Publication(models.Model):
     Attributes:
         author (:obj:`models.ForeignKey`): user who posted the publication
             (foreign key to custom User model).
-        social_network (:obj:`models.ForeignKey`): social network the
-            publication belongs to (foreign key to `SocialNetwork` model).
+        social_networks (:obj:`models.ManyToManyField`): social networks the
+            publication can be posted on (many to many relation to
+            `SocialNetwork` model).
         content (:obj:`models.TextField`): text content of the publication.
         category (:obj:`models.ForeignKey`): category in which the publication
             belongs to (foreign key to `Category` model).
     """
     author = models.ForeignKey(settings.AUTH_USER_MODEL)
-    social_network = models.ForeignKey(SocialNetwork)
+    social_networks = models.ManyToManyField(
+        SocialNetwork,
+        related_name='publications'
+    )
     content = models.TextField()
     category = models.ForeignKey(
         Category,
@@ -65,13 +131,352 @@ class PublishEvent(Event):
     Inherits from django-scheduler `Event` class.
 
     Attributes:
-        social_network (:obj:`models.ForeignKey`): social network the event
-            belongs to (foreign key to `SocialNetwork` model).
+        social_networks (:obj:`models.ManyToManyField`): social networks the
+            event publishes on (many to many relation to `SocialNetwork`
+            model).
+        social_accounts (:obj:`models.ManyToManyField`): social accounts the
+            event publishes with (many to many relation to allauth
+            `SocialAccount` model). The event publishes with each account of
+            the provider of a social network, or with the account of its
+            creator if it has none.
         category (:obj:`models.ForeignKey`): category in which the event belongs
             to (foreign key to `Category` model).
+        rotation_position (:obj:`models.PositiveIntegerField`): number of
+            publications already picked by the event, used to rotate over the
+            category publications.
     """
-    social_network = models.ForeignKey(SocialNetwork)
+    social_networks = models.ManyToManyField(
+        SocialNetwork,
+        related_name='publish_events'
+    )
+    social_accounts = models.ManyToManyField(
+        'socialaccount.SocialAccount',
+        blank=True,
+        related_name='publish_events'
+    )
     category = models.ForeignKey(Category, related_name='publish_events')
+    rotation_position = models.PositiveIntegerField(default=0)
 
     def __str__(self):
         return self.title
+
+
+class BlackoutWindow(models.Model):
+    """Model representing a period during which nothing must be published.
+
+    A blackout window applies to every publish event of its creator, unless it
+    is restricted to a given category and/or social network.
+
+    Attributes:
+        created_by (:obj:`models.ForeignKey`): user who created the window
+            (foreign key to custom User model).
+        start (:obj:`models.DateTimeField`): beginning of the window.
+        end (:obj:`models.DateTimeField`): end of the window (excluded).
+        category (:obj:`models.ForeignKey`): optional category the window is
+            restricted to (foreign key to `Category` model).
+        social_network (:obj:`models.ForeignKey`): optional social network the
+            window is restricted to (foreign key to `SocialNetwork` model).
+    """
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        related_name='blackout_windows'
+    )
+    start = models.DateTimeField()
+    end = models.DateTimeField()
+    category = models.ForeignKey(
+        Category,
+        blank=True,
+        null=True,
+        related_name='blackout_windows'
+    )
+    social_network = models.ForeignKey(
+        SocialNetwork,
+        blank=True,
+        null=True,
+        related_name='blackout_windows'
+    )
+
+    def __str__(self):
+        return '{start} - {end}'.format(start=self.start, end=self.end)
+
+
+class ScheduledOccurrence(models.Model):
+    """Model representing an upcoming occurrence of a `PublishEvent`.
+
+    Occurrences are expanded from the events' rules ahead of time by the
+    occurrence index maintenance, so that the dispatcher only has to run a
+    single indexed query to find what is due.
+
+    Attributes:
+        publish_event (:obj:`models.ForeignKey`): the event this occurrence
+            belongs to (foreign key to `PublishEvent` model).
+        fire_at (:obj:`models.DateTimeField`): when the occurrence is due.
+        is_suppressed (:obj:`models.BooleanField`): whether the occurrence is
+            hidden from the dispatcher because of a pause or a blackout window.
+        excluded_social_networks (:obj:`ArrayField`): ids of the event social
+            networks the occurrence must not be published on, because of a
+            pause or a blackout window.
+        claimed_at (:obj:`models.DateTimeField`): when the dispatcher claimed
+            the occurrence, `None` while it is pending.
+        caught_up_at (:obj:`models.DateTimeField`): when the occurrence was
+            found missed and handled by the catch-up engine.
+    """
+    publish_event = models.ForeignKey(
+        PublishEvent,
+        related_name='scheduled_occurrences'
+    )
+    fire_at = models.DateTimeField()
+    is_suppressed = models.BooleanField(default=False)
+    excluded_social_networks = ArrayField(
+        models.IntegerField(),
+        blank=True,
+        default=list
+    )
+    claimed_at = models.DateTimeField(blank=True, null=True)
+    caught_up_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        """Meta data for `ScheduledOccurrence` class.
+        """
+        unique_together = ('publish_event', 'fire_at')
+        index_together = [('claimed_at', 'is_suppressed', 'fire_at')]
+
+    def __str__(self):
+        return '{event} ({fire_at})'.format(
+            event=self.publish_event,
+            fire_at=self.fire_at
+        )
+
+
+def get_blob_path(instance, filename):
+    """Returns the content-addressed storage path of a `MediaBlob` file.
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    return 'blobs/{prefix}/{sha256}{extension}'.format(
+        prefix=instance.sha256[:2],
+        sha256=instance.sha256,
+        extension=extension,
+    )
+
+
+def get_thumbnail_path(instance, filename):
+    """Returns the storage path of a `MediaBlob` thumbnail.
+    """
+    return 'blobs/{prefix}/{sha256}.thumbnail.jpg'.format(
+        prefix=instance.sha256[:2],
+        sha256=instance.sha256,
+    )
+
+
+class MediaBlob(models.Model):
+    """Model representing an image or video file, stored once per content.
+
+    Blobs are addressed by the SHA-256 digest of their content, so a file
+    attached to many publications is stored a single time.
+
+    Attributes:
+        sha256 (:obj:`models.CharField`): hex digest of the file content.
+        file (:obj:`models.FileField`): the stored file.
+        content_type (:obj:`models.CharField`): MIME type of the file.
+        size (:obj:`models.BigIntegerField`): size of the file, in bytes.
+        thumbnail (:obj:`models.ImageField`): thumbnail of the file, generated
+            asynchronously for images.
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    file = models.FileField(upload_to=get_blob_path, max_length=255)
+    content_type = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    thumbnail = models.ImageField(
+        upload_to=get_thumbnail_path,
+        max_length=255,
+        blank=True
+    )
+
+    def __str__(self):
+        return self.sha256
+
+    @property
+    def is_image(self):
+        return self.content_type.startswith('image/')
+
+
+class Attachment(models.Model):
+    """Model representing a media file attached to a publication.
+
+    Attributes:
+        publication (:obj:`models.ForeignKey`): the publication the file is
+            attached to (foreign key to `Publication` model).
+        blob (:obj:`models.ForeignKey`): the attached file (foreign key to
+            `MediaBlob` model).
+        position (:obj:`models.PositiveSmallIntegerField`): rank of the file
+            among the publication attachments.
+    """
+    publication = models.ForeignKey(Publication, related_name='attachments')
+    blob = models.ForeignKey(MediaBlob, related_name='attachments')
+    position = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        """Meta data for `Attachment` class.
+        """
+        ordering = ['position']
+
+    def __str__(self):
+        return str(self.blob)
+
+
+class PublishedPost(models.Model):
+    """Model representing a post published on a social network.
+
+    Rows are appended by publish jobs, and form the publish log. Engagement
+    totals are the latest values pulled from the network.
+
+    Attributes:
+        occurrence (:obj:`models.ForeignKey`): the occurrence which produced
+            the post (foreign key to `ScheduledOccurrence` model).
+        publication (:obj:`models.ForeignKey`): the published publication
+            (foreign key to `Publication` model).
+        category (:obj:`models.ForeignKey`): category of the event which
+            published the post (foreign key to `Category` model).
+        social_network (:obj:`models.ForeignKey`): the network the post was
+            published on (foreign key to `SocialNetwork` model).
+        social_account (:obj:`models.ForeignKey`): the account the post was
+            published with, if any (foreign key to allauth `SocialAccount`
+            model).
+        network_post_id (:obj:`models.CharField`): network-side id of the post,
+            empty if the network did not return any.
+        published_at (:obj:`models.DateTimeField`): when the post was
+            published.
+        likes (:obj:`models.PositiveIntegerField`): latest likes count.
+        shares (:obj:`models.PositiveIntegerField`): latest shares count.
+        clicks (:obj:`models.PositiveIntegerField`): latest clicks count.
+        sampled_at (:obj:`models.DateTimeField`): when engagement was last
+            pulled, `None` if it never was.
+    """
+    occurrence = models.ForeignKey(
+        ScheduledOccurrence,
+        blank=True,
+        null=True,
+        on_delete=models.SET_NULL,
+        related_name='published_posts'
+    )
+    publication = models.ForeignKey(Publication, related_name='published_posts')
+    category = models.ForeignKey(
+        Category,
+        blank=True,
+        null=True,
+        on_delete=models.SET_NULL,
+        related_name='published_posts'
+    )
+    social_network = models.ForeignKey(
+        SocialNetwork,
+        related_name='published_posts'
+    )
+    social_account = models.ForeignKey(
+        'socialaccount.SocialAccount',
+        blank=True,
+        null=True,
+        on_delete=models.SET_NULL,
+        related_name='published_posts'
+    )
+    network_post_id = models.CharField(max_length=255, blank=True)
+    published_at = models.DateTimeField(db_index=True)
+    likes = models.PositiveIntegerField(default=0)
+    shares = models.PositiveIntegerField(default=0)
+    clicks = models.PositiveIntegerField(default=0)
+    sampled_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return '{publication} ({social_network})'.format(
+            publication=self.publication,
+            social_network=self.social_network
+        )
+
+
+class EngagementSample(models.Model):
+    """Model representing engagement counts of a post at a given time.
+
+    Samples are only ever appended.
+
+    Attributes:
+        post (:obj:`models.ForeignKey`): the sampled post (foreign key to
+            `PublishedPost` model).
+        sampled_at (:obj:`models.DateTimeField`): when counts were pulled.
+        likes (:obj:`models.PositiveIntegerField`): likes count.
+        shares (:obj:`models.PositiveIntegerField`): shares count.
+        clicks (:obj:`models.PositiveIntegerField`): clicks count.
+    """
+    post = models.ForeignKey(PublishedPost, related_name='engagement_samples')
+    sampled_at = models.DateTimeField()
+    likes = models.PositiveIntegerField()
+    shares = models.PositiveIntegerField()
+    clicks = models.PositiveIntegerField()
+
+
+class EngagementRollup(models.Model):
+    """Model representing engagement aggregated over a period or a slot.
+
+    Rollups are maintained incrementally when samples are ingested, and
+    attribute engagement to the time the posts were published at.
+
+    Attributes:
+        granularity (:obj:`models.CharField`): `hour`, `day` or `slot`.
+        scope (:obj:`models.CharField`): `publication`, `category` or `user`.
+        scope_id (:obj:`models.IntegerField`): id of the aggregated
+            publication, category or user.
+        social_network (:obj:`models.ForeignKey`): the network of the posts
+            (foreign key to `SocialNetwork` model).
+        bucket (:obj:`models.IntegerField`): hours since epoch for `hour`
+            granularity, date ordinal for `day` granularity, and weekly
+            10-minute slot (from 0 to 1007) for `slot` granularity.
+        posts (:obj:`models.PositiveIntegerField`): number of sampled posts.
+        likes (:obj:`models.IntegerField`): total likes.
+        shares (:obj:`models.IntegerField`): total shares.
+        clicks (:obj:`models.IntegerField`): total clicks.
+    """
+    HOUR = 'hour'
+    DAY = 'day'
+    SLOT = 'slot'
+    GRANULARITY_CHOICES = [(HOUR, 'Hour'), (DAY, 'Day'), (SLOT, 'Weekly slot')]
+
+    PUBLICATION = 'publication'
+    CATEGORY = 'category'
+    USER = 'user'
+    SCOPE_CHOICES = [
+        (PUBLICATION, 'Publication'),
+        (CATEGORY, 'Category'),
+        (USER, 'User'),
+    ]
+
+    granularity = models.CharField(max_length=16, choices=GRANULARITY_CHOICES)
+    scope = models.CharField(max_length=16, choices=SCOPE_CHOICES)
+    scope_id = models.IntegerField()
+    social_network = models.ForeignKey(
+        SocialNetwork,
+        related_name='engagement_rollups'
+    )
+    bucket = models.IntegerField()
+    posts = models.PositiveIntegerField(default=0)
+    likes = models.IntegerField(default=0)
+    shares = models.IntegerField(default=0)
+    clicks = models.IntegerField(default=0)
+
+    class Meta:
+        """Meta data for `EngagementRollup` class.
+        """
+        unique_together = (
+            'granularity', 'scope', 'scope_id', 'social_network', 'bucket'
+        )
+
+
+class DispatchShard(models.Model):
+    """Model recording the lease fencing token of a dispatch shard.
+
+    Attributes:
+        shard (:obj:`models.IntegerField`): number of the shard of publish
+            events, i.e. their creator id modulo the number of shards.
+        fencing_token (:obj:`models.BigIntegerField`): token of the last
+            dispatcher which acquired the lease of the shard. Claims with an
+            older token come from a dispatcher which lost its lease.
+    """
+    shard = models.IntegerField(primary_key=True)
+    fencing_token = models.BigIntegerField(default=0)
@@ -0,0 +1,291 @@
+"""Adaptive concurrency limits and circuit breakers of social networks.
+
+Workers share through Redis the requests in flight to each social network and
+the health of the network. The concurrency limit of a network grows by one
+request per limit's worth of fast responses, and halves on every failed or
+slow one, so that it converges to what the network API sustains. Moving
+averages of the error rate and latency open the circuit breaker of the
+network when they exceed their thresholds: requests are then rejected without
+being sent until the cooldown elapsed, after which a single probe request is
+let through, closing the breaker or opening it again.
+
+Rejected jobs are retried later instead of holding a worker process, so that
+one slow network cannot take every worker from the others. Requests in flight
+are recorded with an expiry, which frees the slots of crashed workers. Without
+`PUBLICATION_SCHEDULER_NETWORK_LIMITS_REDIS_URL`, or while Redis is down,
+requests are sent without limits.
+"""
+import contextlib
+import functools
+import logging
+import random
+import time
+import uuid
+
+import redis
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+STATE_KEY = 'network:{0}:state'
+
+IN_FLIGHT_KEY = 'network:{0}:in_flight'
+
+# Weight of the latest request in the moving averages.
+SMOOTHING = 0.1
+
+# Number of requests recorded before the moving averages can open a breaker.
+MIN_SAMPLES = 10
+
+# Seconds after which the slot of a request never released is freed.
+SLOT_LIFETIME = 60
+
+# Seconds to wait when every slot of a network is taken.
+SATURATED_DELAY = 1
+
+ACQUIRE_SCRIPT = """
+local now = tonumber(ARGV[1])
+redis.call('zremrangebyscore', KEYS[2], '-inf', now)
+local state = redis.call('hmget', KEYS[1], 'limit', 'opened_until')
+local limit = tonumber(state[1]) or tonumber(ARGV[4])
+local opened_until = tonumber(state[2])
+if opened_until then
+    if now < opened_until then
+        return {0, tostring(opened_until - now)}
+    end
+    limit = 1
+end
+if redis.call('zcard', KEYS[2]) >= math.floor(limit) then
+    return {0, '0'}
+end
+redis.call('zadd', KEYS[2], now + tonumber(ARGV[3]), ARGV[2])
+return {1, '0'}
+"""
+
+RELEASE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local latency = tonumber(ARGV[3])
+local failed = tonumber(ARGV[4])
+local max_limit = tonumber(ARGV[5])
+local latency_threshold = tonumber(ARGV[7])
+local error_threshold = tonumber(ARGV[8])
+local cooldown = tonumber(ARGV[9])
+local smoothing = tonumber(ARGV[10])
+redis.call('zrem', KEYS[2], ARGV[2])
+local state = redis.call(
+    'hmget', KEYS[1], 'limit', 'error_rate', 'latency', 'samples', 'opened_until'
+)
+local limit = tonumber(state[1]) or tonumber(ARGV[6])
+local error_rate = tonumber(state[2]) or 0
+local mean_latency = tonumber(state[3]) or 0
+local samples = tonumber(state[4]) or 0
+local opened_until = tonumber(state[5])
+local healthy = failed == 0 and latency <= latency_threshold
+if healthy then
+    limit = math.min(max_limit, limit + 1 / limit)
+else
+    limit = math.max(1, limit / 2)
+end
+if opened_until then
+    if now >= opened_until then
+        if healthy then
+            opened_until = nil
+            error_rate, mean_latency, samples = 0, 0, 0
+        else
+            opened_until = now + cooldown
+        end
+    end
+else
+    error_rate = error_rate + smoothing * (failed - error_rate)
+    mean_latency = mean_latency + smoothing * (latency - mean_latency)
+    samples = samples + 1
+    if samples >= tonumber(ARGV[11]) and (
+            error_rate > error_threshold or mean_latency > latency_threshold) then
+        opened_until = now + cooldown
+    end
+end
+redis.call(
+    'hmset', KEYS[1], 'limit', tostring(limit), 'error_rate', tostring(error_rate),
+    'latency', tostring(mean_latency), 'samples', samples
+)
+if opened_until then
+    redis.call('hset', KEYS[1], 'opened_until', tostring(opened_until))
+    return 1
+end
+redis.call('hdel', KEYS[1], 'opened_until')
+return 0
+"""
+
+
+class NetworkUnavailable(Exception):
+    """Raised when a social network accepts no more requests for now.
+
+    Attributes:
+        retry_after (float): number of seconds to wait before trying again.
+    """
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@functools.lru_cache(maxsize=None)
+def get_redis():
+    url = settings.PUBLICATION_SCHEDULER_NETWORK_LIMITS_REDIS_URL
+    return redis.StrictRedis.from_url(url) if url else None
+
+
+class NetworkLimiter(object):
+    """Concurrency limit and circuit breaker of a social network.
+
+    Attributes:
+        redis (:obj:`redis.StrictRedis`): the Redis client, `None` to send
+            requests without limits.
+        social_network_pk (int): id of the limited social network.
+        max_concurrency (int): highest concurrency limit.
+        latency_threshold (float): number of seconds above which a response
+            is slow.
+        error_threshold (float): error rate above which the breaker opens.
+        cooldown (float): number of seconds the breaker stays open.
+    """
+
+    def __init__(self, client, social_network_pk, max_concurrency=None,
+                 latency_threshold=None, error_threshold=None, cooldown=None):
+        self.redis = client
+        self.social_network_pk = social_network_pk
+        self.max_concurrency = (
+            max_concurrency or
+            settings.PUBLICATION_SCHEDULER_NETWORK_MAX_CONCURRENCY
+        )
+        self.latency_threshold = latency_threshold or (
+            settings.PUBLICATION_SCHEDULER_NETWORK_LATENCY_THRESHOLD / 1000
+        )
+        self.error_threshold = error_threshold or (
+            settings.PUBLICATION_SCHEDULER_NETWORK_ERROR_THRESHOLD / 100
+        )
+        self.cooldown = (
+            cooldown or settings.PUBLICATION_SCHEDULER_NETWORK_BREAKER_COOLDOWN
+        )
+        if client is not None:
+            self.acquire_script = client.register_script(ACQUIRE_SCRIPT)
+            self.release_script = client.register_script(RELEASE_SCRIPT)
+
+    def get_keys(self):
+        return [
+            STATE_KEY.format(self.social_network_pk),
+            IN_FLIGHT_KEY.format(self.social_network_pk),
+        ]
+
+    def get_initial_limit(self):
+        return max(self.max_concurrency // 2, 1)
+
+    def acquire(self, now=None):
+        """Takes a request slot.
+
+        Returns:
+            str: id of the slot to release, `None` if requests are not
+                limited.
+
+        Raises:
+            NetworkUnavailable: if the breaker is open or every slot is taken.
+        """
+        if self.redis is None:
+            return None
+        now = now if now is not None else time.time()
+        slot = uuid.uuid4().hex
+        try:
+            acquired, retry_after = self.acquire_script(
+                keys=self.get_keys(),
+                args=[now, slot, SLOT_LIFETIME, self.get_initial_limit()]
+            )
+        except redis.RedisError:
+            logger.exception('Could not limit requests to social network %s',
+                             self.social_network_pk)
+            return None
+        if acquired:
+            return slot
+        retry_after = float(retry_after)
+        if retry_after:
+            message = 'Circuit breaker of social network {0} is open'
+        else:
+            message = 'Social network {0} is saturated'
+            retry_after = SATURATED_DELAY
+        raise NetworkUnavailable(
+            message.format(self.social_network_pk),
+            # Spread the retries of the rejected jobs.
+            retry_after * random.uniform(1, 1.5)
+        )
+
+    def release(self, slot, latency, failed, now=None):
+        """Frees a slot and records the outcome of its request.
+
+        Args:
+            slot (str): the slot id returned by `acquire`.
+            latency (float): number of seconds the request took.
+            failed (bool): whether the request failed.
+
+        Returns:
+            bool: whether the breaker is open.
+        """
+        now = now if now is not None else time.time()
+        try:
+            return bool(self.release_script(
+                keys=self.get_keys(),
+                args=[now, slot, latency, int(failed), self.max_concurrency,
+                      self.get_initial_limit(), self.latency_threshold,
+                      self.error_threshold, self.cooldown, SMOOTHING,
+                      MIN_SAMPLES]
+            ))
+        except redis.RedisError:
+            logger.exception('Could not record request to social network %s',
+                             self.social_network_pk)
+            return False
+
+    @contextlib.contextmanager
+    def request(self):
+        """Runs the requests of the block in a slot.
+
+        The block fails if it raises an exception.
+
+        Raises:
+            NetworkUnavailable: if no slot could be taken.
+        """
+        slot = self.acquire()
+        started_at = time.perf_counter()
+        failed = True
+        try:
+            yield
+            failed = False
+        finally:
+            if slot is not None:
+                self.release(slot, time.perf_counter() - started_at, failed)
+
+    def get_state(self):
+        """Returns the shared state of the network, for monitoring.
+
+        Returns:
+            dict: the concurrency `limit`, the number of requests
+                `in_flight`, the moving averages of the `error_rate` and
+                `latency`, and the `opened_until` timestamp of the breaker,
+                `None` while closed.
+        """
+        state_key, in_flight_key = self.get_keys()
+        state = {
+            key.decode(): float(value)
+            for key, value in self.redis.hgetall(state_key).items()
+        }
+        return {
+            'limit': state.get('limit', self.get_initial_limit()),
+            'in_flight': self.redis.zcount(in_flight_key, time.time(), '+inf'),
+            'error_rate': state.get('error_rate', 0),
+            'latency': state.get('latency', 0),
+            'opened_until': state.get('opened_until'),
+        }
+
+
+@functools.lru_cache(maxsize=None)
+def get_limiter(social_network_pk):
+    """Returns the limiter of a social network, cached for the lifetime of
+    the process.
+    """
+    return NetworkLimiter(get_redis(), social_network_pk)
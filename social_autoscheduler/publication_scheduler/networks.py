@@ -0,0 +1,204 @@
+"""Clients publishing content on social networks.
+
+The client used for a `SocialNetwork` is looked up by name in the
+`PUBLICATION_SCHEDULER_NETWORK_CLIENTS` setting, falling back to
+`PUBLICATION_SCHEDULER_DEFAULT_NETWORK_CLIENT`.
+"""
+import logging
+import threading
+
+import requests
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+class NetworkClient(object):
+    """Base class of clients publishing content on a social network.
+
+    Subclasses must implement the `publish`, `upload_media` and
+    `get_engagement` methods.
+
+    Attributes:
+        social_network (:obj:`SocialNetwork`): the network the client
+            publishes on.
+        account_key (str): identifier of the network account the client
+            publishes with.
+        access_token (str): OAuth access token of the account, empty to send
+            unauthenticated requests.
+        media_id_lifetime (int): number of seconds a media id returned by
+            `upload_media` can be used in posts.
+    """
+
+    media_id_lifetime = 24 * 60 * 60
+
+    def __init__(self, social_network, account_key='', access_token=''):
+        self.social_network = social_network
+        self.account_key = account_key
+        self.access_token = access_token
+
+    def upload_media(self, blob, chunks):
+        """Uploads a media file on the social network.
+
+        Args:
+            blob (:obj:`MediaBlob`): the uploaded blob.
+            chunks (iterable): the blob content, as consecutive `bytes`
+                chunks, so that it never has to be fully loaded in memory.
+
+        Returns:
+            str: the network-side id of the uploaded media.
+        """
+        raise NotImplementedError
+
+    def publish(self, text, media_ids=()):
+        """Publishes a post on the social network.
+
+        Args:
+            text (str): the text content of the post.
+            media_ids (list): network-side ids of the uploaded media to attach
+                to the post.
+
+        Returns:
+            str: the network-side id of the created post.
+        """
+        raise NotImplementedError
+
+    def get_engagement(self, post_ids):
+        """Pulls the engagement counts of several posts.
+
+        Args:
+            post_ids (list): network-side ids of the posts.
+
+        Returns:
+            dict: `{'likes': int, 'shares': int, 'clicks': int}` dicts, by
+                post id. Unknown posts are missing.
+        """
+        raise NotImplementedError
+
+
+class LoggingClient(NetworkClient):
+    """Client only logging posts, used for networks without a configured
+    client.
+    """
+
+    def upload_media(self, blob, chunks):
+        """Reads the media file and logs its size instead of uploading it.
+
+        Returns:
+            str: the blob digest, standing for a media id.
+        """
+        size = sum(len(chunk) for chunk in chunks)
+        logger.info('Uploading on %s: %s (%s bytes)',
+                    self.social_network, blob, size)
+        return blob.sha256
+
+    def publish(self, text, media_ids=()):
+        """Logs the post instead of publishing it.
+
+        Returns:
+            None: no post is created.
+        """
+        logger.info('Publishing on %s: %s %s',
+                    self.social_network, text, list(media_ids))
+        return None
+
+    def get_engagement(self, post_ids):
+        """Returns no engagement, posts are never published.
+        """
+        return {}
+
+
+sessions = threading.local()
+
+
+def get_session():
+    """Returns the HTTP session of the current thread.
+
+    Sessions keep connections to network APIs open between requests.
+    """
+    if not hasattr(sessions, 'session'):
+        sessions.session = requests.Session()
+    return sessions.session
+
+
+class JSONAPIClient(NetworkClient):
+    """Client of a JSON HTTP API, whose base URL is configured by network
+    name in the `PUBLICATION_SCHEDULER_NETWORK_API_URLS` setting.
+
+    The API exposes the following endpoints:
+        - `POST /media`: uploads the request body, returns `{"id": ...}`.
+        - `POST /posts`: publishes `{"text": ..., "media_ids": [...]}`,
+          returns `{"id": ...}`.
+        - `GET /engagement?ids=...`: returns engagement counts by post id.
+    """
+
+    timeout = 10
+
+    def request(self, method, path, headers=None, **kwargs):
+        """Sends a request to the API and decodes its JSON response.
+
+        Requests are authenticated with the access token of the client, if
+        any.
+        """
+        headers = dict(headers or {})
+        if self.access_token:
+            headers['Authorization'] = 'Bearer ' + self.access_token
+        response = get_session().request(
+            method,
+            settings.PUBLICATION_SCHEDULER_NETWORK_API_URLS[
+                self.social_network.name
+            ] + path,
+            headers=headers,
+            timeout=self.timeout,
+            **kwargs
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def upload_media(self, blob, chunks):
+        """Uploads the media with a chunked request body.
+        """
+        return self.request(
+            'POST',
+            '/media',
+            data=chunks,
+            headers={'Content-Type': blob.content_type}
+        )['id']
+
+    def publish(self, text, media_ids=()):
+        return self.request(
+            'POST',
+            '/posts',
+            json={'text': text, 'media_ids': list(media_ids)}
+        )['id']
+
+    def get_engagement(self, post_ids):
+        return self.request(
+            'GET',
+            '/engagement',
+            params={'ids': ','.join(post_ids)}
+        )
+
+
+def get_client(social_network, account_key='', access_token=''):
+    """Instantiates the client configured for a social network.
+
+    Args:
+        social_network (:obj:`SocialNetwork`): the network to publish on.
+        account_key (str): identifier of the network account to publish
+            with.
+        access_token (str): OAuth access token of the account.
+
+    Returns:
+        :obj:`NetworkClient`: the client instance.
+    """
+    client_path = settings.PUBLICATION_SCHEDULER_NETWORK_CLIENTS.get(
+        social_network.name,
+        settings.PUBLICATION_SCHEDULER_DEFAULT_NETWORK_CLIENT
+    )
+    return import_string(client_path)(
+        social_network,
+        account_key,
+        access_token
+    )
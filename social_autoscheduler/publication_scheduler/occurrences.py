@@ -0,0 +1,453 @@
+"""Maintenance of the scheduled occurrences index.
+
+Upcoming `PublishEvent` occurrences are expanded ahead of time into
+`ScheduledOccurrence` rows. Pauses and blackout windows are folded into the
+index as an `is_suppressed` flag and a list of excluded social networks, so the
+dispatcher only ever runs one indexed query and never has to check them while
+publishing.
+
+Events recurring at a weekly slot of their creator's local time are expanded
+from precomputed slot tables, other events by their django-scheduler rule.
+"""
+import bisect
+import datetime
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from social_autoscheduler.publication_scheduler.models import (
+    BlackoutWindow,
+    Category,
+    PublishEvent,
+    ScheduledOccurrence,
+)
+from social_autoscheduler.publication_scheduler.slot_tables import (
+    get_rule_slot,
+    get_slot_table,
+)
+
+BULK_BATCH_SIZE = 500
+
+
+def get_index_horizon():
+    """Returns how far ahead occurrences are expanded in the index.
+
+    Returns:
+        :obj:`datetime.timedelta`: the index horizon.
+    """
+    return datetime.timedelta(days=settings.PUBLICATION_SCHEDULER_INDEX_HORIZON)
+
+
+def chunks(items, size=BULK_BATCH_SIZE):
+    """Splits a list into consecutive slices of at most `size` items.
+
+    Args:
+        items (list): the list to split.
+        size (int): maximum length of a slice.
+
+    Yields:
+        list: the consecutive slices.
+    """
+    for index in range(0, len(items), size):
+        yield items[index:index + size]
+
+
+class IntervalSet(object):
+    """Set of half-open `[start, end)` intervals supporting fast lookups.
+
+    Overlapping intervals are merged on creation, and membership is then tested
+    with a binary search over the sorted interval starts.
+    """
+
+    def __init__(self, intervals=()):
+        """Sorts and merges the given intervals.
+
+        Args:
+            intervals (iterable): `(start, end)` tuples, empty intervals are
+                ignored.
+        """
+        merged = []
+        for start, end in sorted(intervals):
+            if start >= end:
+                continue
+            if merged and start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        self.starts = [start for start, _ in merged]
+        self.ends = [end for _, end in merged]
+
+    def __contains__(self, moment):
+        index = bisect.bisect_right(self.starts, moment) - 1
+        return index >= 0 and moment < self.ends[index]
+
+    def __len__(self):
+        return len(self.starts)
+
+
+class SuppressionRules(object):
+    """Decides which occurrences must be hidden from the dispatcher.
+
+    Blackout windows are grouped by scope, i.e. `(user, category,
+    social_network)`, and merged into one `IntervalSet` per scope the first time
+    it is needed. An occurrence is suppressed as a whole when its category is
+    paused or when every one of its social networks is excluded.
+    """
+
+    def __init__(self, windows):
+        """Groups the given blackout windows by user.
+
+        Args:
+            windows (iterable): `(created_by, category, social_network, start,
+                end)` tuples, as returned by `BlackoutWindow` `values_list`.
+        """
+        self.windows_by_user = defaultdict(list)
+        for window in windows:
+            self.windows_by_user[window[0]].append(window[1:])
+        self.interval_sets = {}
+
+    @classmethod
+    def for_range(cls, start, end):
+        """Loads every blackout window overlapping the given range.
+
+        Args:
+            start (:obj:`datetime.datetime`): beginning of the range.
+            end (:obj:`datetime.datetime`): end of the range.
+
+        Returns:
+            :obj:`SuppressionRules`: the loaded rules.
+        """
+        windows = BlackoutWindow.objects.filter(
+            start__lt=end,
+            end__gt=start,
+        ).values_list('created_by', 'category', 'social_network', 'start', 'end')
+        return cls(windows)
+
+    def get_interval_set(self, user_id, category_id, social_network_id):
+        """Returns the merged blackout intervals applying to a scope.
+
+        Returns:
+            :obj:`IntervalSet`: the blackout intervals.
+        """
+        key = (user_id, category_id, social_network_id)
+        if key not in self.interval_sets:
+            self.interval_sets[key] = IntervalSet(
+                (start, end)
+                for window_category_id, window_network_id, start, end
+                in self.windows_by_user[user_id]
+                if window_category_id in (None, category_id) and
+                window_network_id in (None, social_network_id)
+            )
+        return self.interval_sets[key]
+
+    def evaluate(self, fire_at, user_id, category_id, category_paused,
+                 social_networks):
+        """Tells whether an occurrence must be hidden from the dispatcher.
+
+        Args:
+            fire_at (:obj:`datetime.datetime`): when the occurrence is due.
+            user_id (int): id of the event creator.
+            category_id (int): id of the event category.
+            category_paused (bool): whether the event category is paused.
+            social_networks (iterable): `(social_network_id, is_paused)` tuples
+                of the event social networks.
+
+        Returns:
+            (bool, list): whether the whole occurrence is suppressed, and the
+                sorted ids of the social networks it must not be published on.
+        """
+        if category_paused:
+            return True, []
+        excluded = sorted(
+            social_network_id
+            for social_network_id, is_paused in social_networks
+            if is_paused or fire_at in self.get_interval_set(
+                user_id,
+                category_id,
+                social_network_id
+            )
+        )
+        if len(excluded) == len(social_networks):
+            return True, []
+        return False, excluded
+
+
+def get_fire_times(event, start, end):
+    """Returns the fire times of a `PublishEvent` in a time range.
+
+    Args:
+        event (:obj:`PublishEvent`): the event, with its rule and creator
+            selected.
+        start (:obj:`datetime.datetime`): beginning of the range.
+        end (:obj:`datetime.datetime`): end of the range, excluded.
+
+    Returns:
+        list: the aware fire times.
+    """
+    slot = None
+    if event.rule is not None:
+        slot = get_rule_slot(event.rule.frequency, event.rule.params)
+    if slot is None:
+        return [
+            occurrence.start
+            for occurrence in event.get_occurrences(start, end)
+            if start <= occurrence.start < end
+        ]
+    return get_slot_table(event.creator.time_zone, start, end).get_fire_times(
+        slot,
+        max(start, event.start),
+        min(end, event.end_recurring_period or end),
+    )
+
+
+def get_expected_occurrences(start, end):
+    """Expands the occurrences of every `PublishEvent` in a time range.
+
+    Args:
+        start (:obj:`datetime.datetime`): beginning of the range.
+        end (:obj:`datetime.datetime`): end of the range, excluded.
+
+    Returns:
+        dict: `(is_suppressed, excluded_social_networks)` tuples, by
+            `(publish_event_pk, fire_at)` key.
+    """
+    rules = SuppressionRules.for_range(start, end)
+    events = PublishEvent.objects.select_related(
+        'rule',
+        'category',
+        'creator',
+    ).prefetch_related('social_networks')
+
+    expected = {}
+    for event in events:
+        social_networks = [
+            (social_network.pk, social_network.is_paused)
+            for social_network in event.social_networks.all()
+        ]
+        for fire_at in get_fire_times(event, start, end):
+            expected[(event.pk, fire_at)] = rules.evaluate(
+                fire_at,
+                event.creator_id,
+                event.category_id,
+                event.category.is_paused,
+                social_networks,
+            )
+    return expected
+
+
+def refresh_occurrence_index(now=None, horizon=None):
+    """Expands upcoming `PublishEvent` occurrences into the index.
+
+    Missing occurrences are created with their suppression state already
+    computed, and pending occurrences which no longer match any event rule are
+    removed. Suppression state of existing rows is left untouched: it is kept
+    up to date incrementally by `update_suppression`.
+
+    Args:
+        now (:obj:`datetime.datetime`): beginning of the indexed range,
+            defaults to current time.
+        horizon (:obj:`datetime.timedelta`): length of the indexed range,
+            defaults to `get_index_horizon()`.
+
+    Returns:
+        (int, int): the number of created and deleted occurrences.
+    """
+    now = now or timezone.now()
+    end = now + (horizon or get_index_horizon())
+    expected = get_expected_occurrences(now, end)
+
+    indexed = ScheduledOccurrence.objects.filter(fire_at__gte=now, fire_at__lt=end)
+    existing = {}
+    for pk, event_pk, fire_at, claimed_at in indexed.values_list(
+            'pk', 'publish_event', 'fire_at', 'claimed_at'):
+        existing[(event_pk, fire_at)] = (pk, claimed_at)
+
+    stale_pks = [
+        pk for key, (pk, claimed_at) in existing.items()
+        if key not in expected and claimed_at is None
+    ]
+    new_occurrences = [
+        ScheduledOccurrence(
+            publish_event_id=event_pk,
+            fire_at=fire_at,
+            is_suppressed=is_suppressed,
+            excluded_social_networks=excluded,
+        )
+        for (event_pk, fire_at), (is_suppressed, excluded) in expected.items()
+        if (event_pk, fire_at) not in existing
+    ]
+
+    with transaction.atomic():
+        for pks in chunks(stale_pks):
+            ScheduledOccurrence.objects.filter(pk__in=pks).delete()
+        ScheduledOccurrence.objects.bulk_create(
+            new_occurrences,
+            batch_size=BULK_BATCH_SIZE
+        )
+    return len(new_occurrences), len(stale_pks)
+
+
+def get_event_social_networks(event_pks):
+    """Loads the social networks of several events with a single query.
+
+    Args:
+        event_pks (iterable): primary keys of `PublishEvent` instances.
+
+    Returns:
+        dict: lists of `(social_network_id, is_paused)` tuples, by event
+            primary key.
+    """
+    social_networks = defaultdict(list)
+    through = PublishEvent.social_networks.through
+    for event_pk, social_network_pk, is_paused in through.objects.filter(
+            publishevent__in=event_pks).values_list(
+                'publishevent', 'socialnetwork', 'socialnetwork__is_paused'):
+        social_networks[event_pk].append((social_network_pk, is_paused))
+    return social_networks
+
+
+def update_suppression(now=None, **lookups):
+    """Recomputes suppression state of pending occurrences in bulk.
+
+    Only occurrences whose state actually changes are updated, using one
+    `UPDATE` query per batch of occurrences sharing the same new state.
+
+    Args:
+        now (:obj:`datetime.datetime`): only occurrences due after this time
+            are updated, defaults to current time.
+        **lookups: `ScheduledOccurrence` filters restricting the occurrences
+            to update, e.g. `publish_event__category=category`.
+
+    Returns:
+        int: the number of updated occurrences.
+    """
+    now = now or timezone.now()
+    rows = list(ScheduledOccurrence.objects.filter(
+        claimed_at__isnull=True,
+        fire_at__gte=now,
+        **lookups
+    ).values_list(
+        'pk',
+        'fire_at',
+        'is_suppressed',
+        'excluded_social_networks',
+        'publish_event',
+        'publish_event__creator',
+        'publish_event__category',
+        'publish_event__category__is_paused',
+    ))
+    if not rows:
+        return 0
+
+    # The range end is excluded, while the last occurrence must be covered.
+    rules = SuppressionRules.for_range(
+        now,
+        max(row[1] for row in rows) + datetime.timedelta(microseconds=1)
+    )
+    event_social_networks = get_event_social_networks(
+        set(row[4] for row in rows)
+    )
+    changes = defaultdict(list)
+    for (pk, fire_at, was_suppressed, was_excluded, event_pk, user_id,
+         category_id, category_paused) in rows:
+        is_suppressed, excluded = rules.evaluate(
+            fire_at,
+            user_id,
+            category_id,
+            category_paused,
+            event_social_networks[event_pk],
+        )
+        if (is_suppressed, excluded) != (was_suppressed, sorted(was_excluded)):
+            changes[(is_suppressed, tuple(excluded))].append(pk)
+
+    with transaction.atomic():
+        for (is_suppressed, excluded), changed_pks in changes.items():
+            for pks in chunks(changed_pks):
+                ScheduledOccurrence.objects.filter(pk__in=pks).update(
+                    is_suppressed=is_suppressed,
+                    excluded_social_networks=list(excluded),
+                )
+    return sum(len(changed_pks) for changed_pks in changes.values())
+
+
+def set_paused(instance, is_paused):
+    """Pauses or resumes a `Category` or a `SocialNetwork`.
+
+    The pending occurrences of the related events are updated in bulk, without
+    rebuilding the index.
+
+    Args:
+        instance (:obj:`Category` or :obj:`SocialNetwork`): the instance to
+            pause or resume.
+        is_paused (bool): `True` to pause, `False` to resume.
+
+    Returns:
+        int: the number of updated occurrences.
+    """
+    type(instance).objects.filter(pk=instance.pk).update(is_paused=is_paused)
+    instance.is_paused = is_paused
+    if isinstance(instance, Category):
+        return update_suppression(publish_event__category=instance)
+    return update_suppression(publish_event__social_networks=instance)
+
+
+def claim_due_occurrences(now=None, limit=None, since=None):
+    """Claims pending occurrences which are due for publication.
+
+    Suppressed occurrences are never returned. Rows locked by a concurrent
+    dispatcher are skipped, so several dispatchers can run at once.
+
+    Args:
+        now (:obj:`datetime.datetime`): claim occurrences due before this
+            time, defaults to current time.
+        limit (int): maximum number of occurrences to claim, defaults to
+            `PUBLICATION_SCHEDULER_DISPATCH_BATCH_SIZE` setting.
+        since (:obj:`datetime.datetime`): if given, occurrences due before
+            this time are left to the catch-up engine.
+
+    Returns:
+        list: the primary keys of the claimed occurrences.
+    """
+    now = now or timezone.now()
+    limit = limit or settings.PUBLICATION_SCHEDULER_DISPATCH_BATCH_SIZE
+    due = ScheduledOccurrence.objects.filter(
+        claimed_at__isnull=True,
+        is_suppressed=False,
+        fire_at__lte=now,
+    )
+    if since is not None:
+        due = due.filter(fire_at__gte=since)
+    with transaction.atomic():
+        pks = list(due.select_for_update(
+            skip_locked=True
+        ).order_by('fire_at').values_list('pk', flat=True)[:limit])
+        ScheduledOccurrence.objects.filter(pk__in=pks).update(claimed_at=now)
+    return pks
+
+
+def claim_occurrences(occurrence_pks, now=None):
+    """Claims given pending occurrences, e.g. fired by the timing wheel.
+
+    Occurrences claimed, suppressed or deleted since they were loaded are
+    skipped, as well as rows locked by a concurrent dispatcher.
+
+    Args:
+        occurrence_pks (list): primary keys of the occurrences to claim.
+        now (:obj:`datetime.datetime`): defaults to current time.
+
+    Returns:
+        list: the primary keys of the claimed occurrences.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        pks = list(ScheduledOccurrence.objects.select_for_update(
+            skip_locked=True
+        ).filter(
+            pk__in=occurrence_pks,
+            claimed_at__isnull=True,
+            is_suppressed=False,
+        ).values_list('pk', flat=True))
+        ScheduledOccurrence.objects.filter(pk__in=pks).update(claimed_at=now)
+    return pks
@@ -0,0 +1,390 @@
+"""Publication of claimed `ScheduledOccurrence` instances.
+
+Each claimed occurrence fans out into one `PublishJob` per targeted social
+network and social account, see `get_targets`.
+
+The publication content is loaded once per occurrence and carried by the jobs
+along with the ids of its attached media and of the social account to publish
+with, so that publishing on a network does not read the publication again.
+"""
+import collections
+import datetime
+import logging
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from social_autoscheduler.publication_scheduler.caching import LRUCache
+from social_autoscheduler.publication_scheduler.media import media_id_cache
+from social_autoscheduler.publication_scheduler.models import (
+    Category,
+    MediaBlob,
+    PublishedPost,
+    PublishEvent,
+    ScheduledOccurrence,
+    SocialNetwork,
+)
+from social_autoscheduler.publication_scheduler.network_limits import (
+    NetworkUnavailable,
+    get_limiter,
+)
+from social_autoscheduler.publication_scheduler.networks import get_client
+from social_autoscheduler.publication_scheduler.rendering import (
+    RenderPipeline,
+    pipelines,
+    render,
+)
+from social_autoscheduler.publication_scheduler.rotation import (
+    pick_weighted_publication,
+)
+from social_autoscheduler.publication_scheduler.social_tokens import (
+    get_account_pks,
+    get_provider,
+    token_cache,
+)
+
+logger = logging.getLogger(__name__)
+
+# Number of seconds social networks are kept in the memory of workers.
+SOCIAL_NETWORK_TTL = 60
+
+# `(social_network, cached_until)` tuples, by primary key.
+social_networks = LRUCache(maxsize=256)
+
+PublishJob = collections.namedtuple(
+    'PublishJob',
+    ['occurrence_pk', 'publication_pk', 'category_pk', 'social_network_pk',
+     'content', 'blob_pks', 'account_pk']
+)
+# Jobs enqueued before social accounts were linked have no account.
+PublishJob.__new__.__defaults__ = (None,)
+
+
+def pick_publication(publish_event):
+    """Picks the next publication to post for an event.
+
+    Publications of the event category are rotated in creation order, or
+    picked weighted by their engagement if the category uses the weighted
+    rotation, among the ones which can be posted on at least one of the event
+    social networks.
+
+    The rotation position is incremented and read back in a transaction, so
+    that the row lock makes concurrent picks for the same event see distinct
+    positions.
+
+    Args:
+        publish_event (:obj:`PublishEvent`): the event being published.
+
+    Returns:
+        :obj:`Publication`: the picked publication, or `None` if the category
+            has no matching publication.
+    """
+    publications = publish_event.category.publications.filter(
+        social_networks__publish_events=publish_event
+    ).distinct().order_by('pk').prefetch_related('social_networks', 'attachments')
+    if publish_event.category.rotation == Category.WEIGHTED:
+        return pick_weighted_publication(publish_event.category_id, publications)
+    count = publications.count()
+    if not count:
+        return None
+    with transaction.atomic():
+        PublishEvent.objects.filter(pk=publish_event.pk).update(
+            rotation_position=F('rotation_position') + 1
+        )
+        publish_event.refresh_from_db(fields=['rotation_position'])
+    return publications[(publish_event.rotation_position - 1) % count]
+
+
+def get_targets(publish_event, account_pks=None):
+    """Returns the social networks and accounts an event publishes with.
+
+    Each social network is published on with every event account of its
+    provider, or else with the account of the event creator.
+
+    Args:
+        publish_event (:obj:`PublishEvent`): the event, with its social
+            networks and accounts prefetched.
+        account_pks (dict): social account primary keys of the event
+            creators, by `(user_pk, provider)`, see `get_account_pks`.
+
+    Returns:
+        list: `(social_network, account_pk)` tuples, `account_pk` being
+            `None` if posts on the network are not linked to an account.
+    """
+    event_accounts = collections.defaultdict(list)
+    for social_account in publish_event.social_accounts.all():
+        event_accounts[social_account.provider].append(social_account.pk)
+    targets = []
+    for social_network in publish_event.social_networks.all():
+        provider = get_provider(social_network)
+        for account_pk in event_accounts.get(provider) or [
+                (account_pks or {}).get((publish_event.creator_id, provider))]:
+            targets.append((social_network, account_pk))
+    return targets
+
+
+def get_jobs(occurrence, account_pks=None):
+    """Fans a claimed occurrence out into one job per social network and
+    account, see `get_targets`.
+
+    Args:
+        occurrence (:obj:`ScheduledOccurrence`): the claimed occurrence, with
+            its event social networks and accounts prefetched.
+        account_pks (dict): social account primary keys of the event
+            creators, by `(user_pk, provider)`, see `get_account_pks`.
+
+    Returns:
+        list: the `PublishJob` instances to run.
+    """
+    publish_event = occurrence.publish_event
+    publication = pick_publication(publish_event)
+    if publication is None:
+        return []
+    excluded = set(occurrence.excluded_social_networks)
+    publication_networks = set(
+        social_network.pk
+        for social_network in publication.social_networks.all()
+    )
+    blob_pks = [
+        attachment.blob_id for attachment in publication.attachments.all()
+    ]
+    return [
+        PublishJob(
+            occurrence.pk,
+            publication.pk,
+            publish_event.category_id,
+            social_network.pk,
+            publication.content,
+            blob_pks,
+            account_pk,
+        )
+        for social_network, account_pk in get_targets(publish_event, account_pks)
+        if social_network.pk in publication_networks and
+        social_network.pk not in excluded
+    ]
+
+
+def get_creator_account_pks(publish_events):
+    """Looks up the social accounts of event creators on the providers of
+    the event social networks.
+
+    Args:
+        publish_events (list): the `PublishEvent` instances, with their social
+            networks prefetched.
+
+    Returns:
+        dict: social account primary keys, by `(user_pk, provider)`.
+    """
+    providers = set(
+        get_provider(social_network)
+        for publish_event in publish_events
+        for social_network in publish_event.social_networks.all()
+    )
+    providers.discard(None)
+    return get_account_pks(
+        set(publish_event.creator_id for publish_event in publish_events),
+        providers
+    )
+
+
+def get_claimed_jobs(occurrence_pks):
+    """Builds the jobs of several claimed occurrences.
+
+    Args:
+        occurrence_pks (list): primary keys of claimed `ScheduledOccurrence`
+            instances.
+
+    Returns:
+        list: the `PublishJob` instances to run.
+    """
+    occurrences = ScheduledOccurrence.objects.filter(
+        pk__in=occurrence_pks
+    ).select_related(
+        'publish_event__category',
+    ).prefetch_related(
+        'publish_event__social_networks',
+        'publish_event__social_accounts',
+    ).order_by('fire_at')
+    account_pks = get_creator_account_pks(
+        [occurrence.publish_event for occurrence in occurrences]
+    )
+    jobs = []
+    for occurrence in occurrences:
+        jobs.extend(get_jobs(occurrence, account_pks))
+    return jobs
+
+
+def get_social_network(social_network_pk, now=None):
+    """Returns a `SocialNetwork`, cached in process memory for
+    `SOCIAL_NETWORK_TTL` seconds, so that changes are seen shortly.
+
+    Args:
+        social_network_pk (int): primary key of the social network.
+        now (float): current timestamp, defaults to `time.time()`.
+
+    Returns:
+        :obj:`SocialNetwork`: the social network.
+    """
+    now = now or time.time()
+    entry = social_networks.get(social_network_pk)
+    if entry is not None and entry[1] > now:
+        return entry[0]
+    social_network = SocialNetwork.objects.get(pk=social_network_pk)
+    social_networks.set(social_network_pk,
+                        (social_network, now + SOCIAL_NETWORK_TTL))
+    return social_network
+
+
+def get_account_client(social_network, account_pk):
+    """Instantiates the client of a social network, with the cached access
+    token of a social account.
+
+    Args:
+        social_network (:obj:`SocialNetwork`): the network to publish on.
+        account_pk (int): primary key of the `SocialAccount` to publish with,
+            `None` if posts are not linked to an account.
+
+    Returns:
+        :obj:`NetworkClient`: the client instance.
+    """
+    account_key = access_token = ''
+    if account_pk is not None:
+        account_key = str(account_pk)
+        access_token = token_cache.get_token(account_pk)
+    return get_client(social_network, account_key, access_token)
+
+
+def run_job(job):
+    """Renders the content of a job and publishes it on its social network.
+
+    Attached media are streamed from the storage to the network, unless a
+    valid network-side id is cached for them. Requests to the network run
+    within its concurrency limit, with the cached access token of the job
+    social account.
+
+    Args:
+        job (:obj:`PublishJob`): the job to run.
+
+    Returns:
+        :obj:`PublishedPost`: the publish log entry of the created post.
+
+    Raises:
+        NetworkUnavailable: if the network accepts no more requests for now.
+    """
+    social_network = get_social_network(job.social_network_pk)
+    text = render(job.publication_pk, job.content, social_network)
+    client = get_account_client(social_network, job.account_pk)
+    blobs = MediaBlob.objects.in_bulk(job.blob_pks)
+    with get_limiter(social_network.pk).request():
+        media_ids = [
+            media_id_cache.get_media_id(client, blobs[blob_pk])
+            for blob_pk in job.blob_pks
+            if blob_pk in blobs
+        ]
+        network_post_id = client.publish(text, media_ids)
+    return PublishedPost.objects.create(
+        occurrence_id=job.occurrence_pk,
+        publication_id=job.publication_pk,
+        category_id=job.category_pk,
+        social_network=social_network,
+        social_account_id=job.account_pk,
+        network_post_id=network_post_id or '',
+        published_at=timezone.now(),
+    )
+
+
+def refresh_media_ids(now=None, horizon=None):
+    """Uploads again the media of upcoming posts whose network-side ids
+    would need a refresh when published.
+
+    Every publication the upcoming occurrences may pick is considered, on
+    each social network and account of their events. Media of a network
+    accepting no more requests are left to be refreshed when used.
+
+    Args:
+        now (:obj:`datetime.datetime`): defaults to current time.
+        horizon (:obj:`datetime.timedelta`): time ahead of `now`, defaults to
+            `PUBLICATION_SCHEDULER_TOKEN_REFRESH_HORIZON` minutes, so that
+            media are uploaded with refreshed tokens.
+
+    Returns:
+        int: the number of uploaded media.
+    """
+    now = now or timezone.now()
+    horizon = horizon or datetime.timedelta(
+        minutes=settings.PUBLICATION_SCHEDULER_TOKEN_REFRESH_HORIZON
+    )
+    occurrences = list(ScheduledOccurrence.objects.filter(
+        claimed_at__isnull=True,
+        is_suppressed=False,
+        fire_at__gte=now,
+        fire_at__lt=now + horizon,
+    ).select_related(
+        'publish_event',
+    ).prefetch_related(
+        'publish_event__social_networks',
+        'publish_event__social_accounts',
+        'publish_event__category__publications__social_networks',
+        'publish_event__category__publications__attachments__blob',
+    ))
+    account_pks = get_creator_account_pks(
+        [occurrence.publish_event for occurrence in occurrences]
+    )
+    # Latest due time, by social network, account and blob.
+    due = {}
+    for occurrence in occurrences:
+        publish_event = occurrence.publish_event
+        excluded = set(occurrence.excluded_social_networks)
+        publications = publish_event.category.publications.all()
+        for social_network, account_pk in get_targets(publish_event,
+                                                      account_pks):
+            if social_network.pk in excluded:
+                continue
+            for publication in publications:
+                if social_network not in publication.social_networks.all():
+                    continue
+                for attachment in publication.attachments.all():
+                    key = (social_network, account_pk, attachment.blob)
+                    due[key] = max(due.get(key, occurrence.fire_at),
+                                   occurrence.fire_at)
+    uploaded = 0
+    unavailable = set()
+    for (social_network, account_pk, blob), due_at in due.items():
+        if social_network.pk in unavailable:
+            continue
+        client = get_account_client(social_network, account_pk)
+        try:
+            with get_limiter(social_network.pk).request():
+                uploaded += media_id_cache.refresh_media_id(
+                    client,
+                    blob,
+                    due_at.timestamp(),
+                    now=now.timestamp()
+                )
+        except NetworkUnavailable as error:
+            logger.warning('Skipped media refresh: %s', error)
+            unavailable.add(social_network.pk)
+        except Exception:
+            logger.exception('Could not refresh media %s on %s',
+                             blob.pk, social_network)
+    return uploaded
+
+
+def preload():
+    """Builds what publishing needs ahead of the first job.
+
+    Network client classes and render pipelines are loaded from settings,
+    without touching the database, so that a worker can preload them before
+    forking its processes and share them.
+    """
+    client_paths = set(settings.PUBLICATION_SCHEDULER_NETWORK_CLIENTS.values())
+    client_paths.add(settings.PUBLICATION_SCHEDULER_DEFAULT_NETWORK_CLIENT)
+    for client_path in client_paths:
+        import_string(client_path)
+    for name, steps in settings.PUBLICATION_SCHEDULER_RENDER_PIPELINES.items():
+        if name not in pipelines:
+            pipelines[name] = RenderPipeline(steps)
@@ -0,0 +1,184 @@
+"""Recommendation of weekly time slots to publish at.
+
+Engagement of the weekly slot rollups is loaded into a grid of 7 * 144 slots,
+matching the 10-minute steps of `SelectTimeWidget`. Grids are cached, and
+updated in place when new engagement is ingested, so that scoring a grid never
+reads the database.
+
+Each slot is scored with the mean engagement per post of the slots around it,
+weighted towards the slot itself, and shrunk towards the overall mean so that
+slots with few posts are not over-rated. Slots with no post around them score
+zero, behind every slot with data.
+"""
+import datetime
+import heapq
+
+from django.core.cache import cache
+
+from social_autoscheduler.publication_scheduler.models import EngagementRollup
+
+SLOTS_PER_DAY = 24 * 6
+
+SLOTS = 7 * SLOTS_PER_DAY
+
+# Weights of likes, shares and clicks in the engagement of a post.
+ENGAGEMENT_WEIGHTS = (1, 2, 1)
+
+# Number of neighbour slots, on each side, pooled with a slot. Neighbours
+# weigh less the farther they are, so that a slot outweighs its neighbours.
+SMOOTHING_RADIUS = 2
+
+# Number of average posts a slot score is shrunk with.
+PRIOR_POSTS = 3
+
+GRID_TIMEOUT = 60 * 60
+
+
+def get_engagement(likes, shares, clicks):
+    """Returns the weighted engagement of counts.
+    """
+    return sum(
+        weight * count
+        for weight, count in zip(ENGAGEMENT_WEIGHTS, (likes, shares, clicks))
+    )
+
+
+def get_grid_key(scope, scope_id, social_network_id):
+    return 'slot_grid:{0}:{1}:{2}'.format(scope, scope_id, social_network_id)
+
+
+def load_grid(scope, scope_id, social_network_id):
+    """Loads a slot grid from the rollups.
+
+    Returns:
+        (list, list): number of posts and engagement, by slot.
+    """
+    posts, engagement = [0] * SLOTS, [0] * SLOTS
+    for slot, slot_posts, likes, shares, clicks in EngagementRollup.objects.filter(
+            granularity=EngagementRollup.SLOT,
+            scope=scope,
+            scope_id=scope_id,
+            social_network=social_network_id,
+    ).values_list('bucket', 'posts', 'likes', 'shares', 'clicks'):
+        posts[slot] = slot_posts
+        engagement[slot] = get_engagement(likes, shares, clicks)
+    return posts, engagement
+
+
+def get_grid(scope, scope_id, social_network_id):
+    """Returns a slot grid, from the cache if possible.
+
+    Returns:
+        (list, list): number of posts and engagement, by slot.
+    """
+    key = get_grid_key(scope, scope_id, social_network_id)
+    grid = cache.get(key)
+    if grid is None:
+        grid = load_grid(scope, scope_id, social_network_id)
+        cache.set(key, grid, GRID_TIMEOUT)
+    return grid
+
+
+def apply_rollup_deltas(deltas):
+    """Updates cached slot grids with new engagement.
+
+    Grids which are not cached are left alone, they are loaded from the
+    rollups the next time they are needed.
+
+    Args:
+        deltas (dict): `[posts, likes, shares, clicks]` lists, by
+            `(granularity, scope, scope_id, social_network_id, bucket)` key,
+            as added to rollups.
+    """
+    changes = {}
+    for (granularity, scope, scope_id, social_network_id, slot), values in (
+            deltas.items()):
+        if granularity != EngagementRollup.SLOT:
+            continue
+        changes.setdefault(
+            get_grid_key(scope, scope_id, social_network_id), []
+        ).append((slot, values))
+    grids = cache.get_many(list(changes))
+    for key, grid in grids.items():
+        posts, engagement = grid
+        for slot, (new_posts, likes, shares, clicks) in changes[key]:
+            posts[slot] += new_posts
+            engagement[slot] += get_engagement(likes, shares, clicks)
+    if grids:
+        cache.set_many(grids, GRID_TIMEOUT)
+
+
+def get_window_sums(values, radius=SMOOTHING_RADIUS):
+    """Sums every value with its neighbours, wrapping around the week.
+
+    Values at distance `d` of a slot weigh `radius + 1 - d`.
+
+    Returns:
+        list: the weighted sums, computed in linear time.
+    """
+    count = len(values)
+    sums = [0] * count
+    for offset in range(-radius, radius + 1):
+        weight = radius + 1 - abs(offset)
+        for index in range(count):
+            sums[index] += weight * values[(index + offset) % count]
+    return sums
+
+
+def score_grid(grid):
+    """Scores every slot of a grid.
+
+    Returns:
+        list: the scores, by slot, zero for slots with no post around them.
+    """
+    posts, engagement = grid
+    total_posts = sum(posts)
+    prior = sum(engagement) / total_posts if total_posts else 0
+    return [
+        (slot_engagement + prior * PRIOR_POSTS) / (slot_posts + PRIOR_POSTS)
+        if slot_posts else 0
+        for slot_posts, slot_engagement
+        in zip(get_window_sums(posts), get_window_sums(engagement))
+    ]
+
+
+def get_slot_time(slot):
+    """Returns the weekday and time of a slot.
+
+    Returns:
+        (int, :obj:`datetime.time`): the weekday, from 0 (Monday), and time.
+    """
+    weekday, minutes = divmod(slot, SLOTS_PER_DAY)
+    return weekday, datetime.time(hour=minutes // 6, minute=minutes % 6 * 10)
+
+
+def recommend_slots(scope, scope_id, social_network_id, count=10):
+    """Returns the best slots to publish at.
+
+    Args:
+        scope (str): `EngagementRollup` scope, `user` or `category`.
+        scope_id (int): id of the user or category.
+        social_network_id (int): id of the social network.
+        count (int): number of slots to return.
+
+    Slots of equal score are ranked by the mean engagement per post of the
+    slot alone.
+
+    Returns:
+        list: `(slot, score)` tuples, best first. Empty if no engagement was
+            ever sampled.
+    """
+    grid = get_grid(scope, scope_id, social_network_id)
+    posts, engagement = grid
+    if not any(posts):
+        return []
+    scores = score_grid(grid)
+    means = [
+        slot_engagement / slot_posts if slot_posts else 0
+        for slot_posts, slot_engagement in zip(posts, engagement)
+    ]
+    return heapq.nlargest(
+        count,
+        enumerate(scores),
+        key=lambda item: (item[1], means[item[0]])
+    )
@@ -0,0 +1,142 @@
+"""Per social network adaptation of publication contents.
+
+Each `SocialNetwork` gets a render pipeline, i.e. a list of steps configured by
+network name in the `PUBLICATION_SCHEDULER_RENDER_PIPELINES` setting. A step is
+the dotted path of a function taking the text as first argument, and the
+keyword arguments it is called with::
+
+    PUBLICATION_SCHEDULER_RENDER_PIPELINES = {
+        'Twitter': [
+            ('social_autoscheduler.publication_scheduler.rendering.truncate',
+             {'length': 280}),
+        ],
+    }
+
+Rendered texts are memoized by publication, content hash, social network and
+pipeline version, so a publication posted again by a rotation is rendered only
+once.
+"""
+import hashlib
+import re
+
+from django.conf import settings
+from django.utils.html import escape as escape_html
+from django.utils.module_loading import import_string
+from django.utils.text import Truncator
+
+from social_autoscheduler.publication_scheduler.caching import TieredCache
+
+# Increment when the behavior of a step changes, to invalidate cached renders.
+PIPELINE_VERSION = 1
+
+URL_RE = re.compile(r'https?://\S+')
+
+render_cache = TieredCache('render', timeout=60 * 60 * 24 * 7)
+
+
+def truncate(text, length):
+    """Truncates a text to `length` characters, ending it with an ellipsis.
+    """
+    return Truncator(text).chars(length)
+
+
+def shorten_links(text, shortener):
+    """Replaces every link of a text by its shortened version.
+
+    Args:
+        text (str): the text to process.
+        shortener (str): dotted path of a callable taking a URL and returning
+            its short version.
+    """
+    shorten = import_string(shortener)
+    return URL_RE.sub(lambda match: shorten(match.group(0)), text)
+
+
+def append_hashtags(text, hashtags):
+    """Appends the given hashtags to a text, skipping the ones it contains.
+
+    Args:
+        text (str): the text to process.
+        hashtags (list): the hashtags to append, without leading `#`.
+    """
+    missing = [
+        '#' + hashtag for hashtag in hashtags
+        if '#' + hashtag.lower() not in text.lower()
+    ]
+    return ' '.join([text] + missing)
+
+
+def escape(text):
+    """Escapes HTML special characters of a text.
+    """
+    return escape_html(text)
+
+
+class RenderPipeline(object):
+    """Ordered list of render steps.
+
+    Attributes:
+        steps (list): `(function, kwargs)` tuples.
+        version (str): identifier changing whenever the steps configuration or
+            `PIPELINE_VERSION` changes.
+    """
+
+    def __init__(self, steps):
+        """Imports the configured step functions.
+
+        Args:
+            steps (list): `(dotted_path, kwargs)` tuples.
+        """
+        self.steps = [(import_string(path), kwargs) for path, kwargs in steps]
+        configuration = repr([PIPELINE_VERSION] + list(steps))
+        self.version = hashlib.sha1(configuration.encode()).hexdigest()[:12]
+
+    def render(self, text):
+        """Runs every step on a text.
+
+        Returns:
+            str: the rendered text.
+        """
+        for step, kwargs in self.steps:
+            text = step(text, **kwargs)
+        return text
+
+
+pipelines = {}
+
+
+def get_pipeline(social_network):
+    """Returns the render pipeline of a social network.
+
+    Pipelines are built once per process and network name.
+
+    Returns:
+        :obj:`RenderPipeline`: the pipeline.
+    """
+    if social_network.name not in pipelines:
+        pipelines[social_network.name] = RenderPipeline(
+            settings.PUBLICATION_SCHEDULER_RENDER_PIPELINES.get(
+                social_network.name,
+                []
+            )
+        )
+    return pipelines[social_network.name]
+
+
+def render(publication_pk, content, social_network):
+    """Renders a publication content for a social network.
+
+    Args:
+        publication_pk (int): primary key of the rendered `Publication`.
+        content (str): the publication content.
+        social_network (:obj:`SocialNetwork`): the network to render for.
+
+    Returns:
+        str: the rendered text.
+    """
+    pipeline = get_pipeline(social_network)
+    content_hash = hashlib.sha1(content.encode()).hexdigest()
+    return render_cache.get_or_set(
+        (publication_pk, content_hash, social_network.pk, pipeline.version),
+        lambda: pipeline.render(content)
+    )
@@ -0,0 +1,304 @@
+"""Engagement weighted rotation of category publications.
+
+Publications of a `Category` with the weighted rotation are picked at random,
+proportionally to their expected engagement per post: the mean engagement of
+their posts, shrunk towards the category mean so that publications never or
+rarely posted still get picked.
+
+Weights are kept in a Fenwick tree per category, cached in process memory:
+picking a publication and updating the weight of a publication after new
+engagement is ingested both take O(log n) time, whatever the category size.
+
+Each cached sampler is tagged with the version of its category read from the
+shared cache. Saving a publication or ingesting engagement sets a new version,
+so that other processes rebuild their sampler from the rollups on next pick.
+"""
+import random
+import threading
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Sum
+
+from social_autoscheduler.publication_scheduler.caching import LRUCache
+from social_autoscheduler.publication_scheduler.models import (
+    EngagementRollup,
+    Publication,
+)
+from social_autoscheduler.publication_scheduler.recommendations import (
+    get_engagement,
+)
+
+# Number of average posts the engagement of a publication is shrunk with.
+PRIOR_POSTS = 2
+
+# `(version, sampler)` tuples, by category primary key.
+samplers = LRUCache(maxsize=1024)
+
+
+class FenwickTree(object):
+    """Binary indexed tree of non-negative weights.
+
+    Attributes:
+        weights (list): the weights, by index.
+        total (float): sum of the weights.
+    """
+
+    def __init__(self, weights):
+        """Builds the tree in linear time.
+
+        Args:
+            weights (list): the initial weights.
+        """
+        self.weights = list(weights)
+        self.total = sum(self.weights)
+        self.tree = [0] + self.weights
+        for position in range(1, len(self.tree)):
+            parent = position + (position & -position)
+            if parent < len(self.tree):
+                self.tree[parent] += self.tree[position]
+
+    def __len__(self):
+        return len(self.weights)
+
+    def update(self, index, weight):
+        """Sets the weight at an index.
+        """
+        change = weight - self.weights[index]
+        self.weights[index] = weight
+        self.total += change
+        position = index + 1
+        while position < len(self.tree):
+            self.tree[position] += change
+            position += position & -position
+
+    def find(self, value):
+        """Returns the index whose cumulative weight range contains a value.
+
+        Args:
+            value (float): a value between 0 and `total`.
+
+        Returns:
+            int: the first index at which the cumulative weight exceeds
+                `value`. Indexes of zero weights are never returned.
+        """
+        position = 0
+        step = 1 << len(self).bit_length()
+        while step:
+            next_position = position + step
+            if (next_position < len(self.tree) and
+                    self.tree[next_position] <= value):
+                position = next_position
+                value -= self.tree[next_position]
+            step >>= 1
+        return min(position, len(self) - 1)
+
+    def sample(self, rng=random):
+        """Returns a random index, with a probability proportional to its
+        weight.
+        """
+        return self.find(rng.random() * self.total)
+
+
+class PublicationSampler(object):
+    """Weighted sampler of the publications of a category.
+
+    Attributes:
+        publication_pks (list): primary keys of the publications.
+        posts (list): number of sampled posts, by publication.
+        engagement (list): weighted engagement, by publication.
+        prior (float): mean engagement per post of the category when the
+            sampler was built.
+        tree (:obj:`FenwickTree`): the publication weights.
+        lock (:obj:`threading.Lock`): held while the weights are changed or
+            sampled.
+    """
+
+    def __init__(self, publication_pks, posts, engagement):
+        self.lock = threading.Lock()
+        self.publication_pks = list(publication_pks)
+        self.positions = {
+            publication_pk: position
+            for position, publication_pk in enumerate(self.publication_pks)
+        }
+        self.posts = list(posts)
+        self.engagement = list(engagement)
+        total_posts, total_engagement = sum(self.posts), sum(self.engagement)
+        self.prior = (
+            total_engagement / total_posts
+            if total_posts and total_engagement > 0 else 1
+        )
+        self.tree = FenwickTree([
+            self.get_weight(position)
+            for position in range(len(self.publication_pks))
+        ])
+
+    def get_weight(self, position):
+        """Returns the expected engagement per post of a publication.
+        """
+        weight = (
+            (self.engagement[position] + self.prior * PRIOR_POSTS) /
+            (self.posts[position] + PRIOR_POSTS)
+        )
+        return max(weight, 0)
+
+    def add_engagement(self, publication_pk, posts, engagement):
+        """Adds new posts and engagement to a publication, updating its weight.
+        """
+        position = self.positions.get(publication_pk)
+        if position is None:
+            return
+        self.posts[position] += posts
+        self.engagement[position] += engagement
+        self.tree.update(position, self.get_weight(position))
+
+
+def get_version_key(category_pk):
+    return 'rotation_sampler_version:{0}'.format(category_pk)
+
+
+def set_version(category_pk):
+    """Sets a new shared version for the samplers of a category.
+
+    Returns:
+        str: the new version.
+    """
+    version = uuid.uuid4().hex
+    cache.set(get_version_key(category_pk), version, None)
+    return version
+
+
+def load_sampler(category_pk):
+    """Builds the sampler of a category from the daily publication rollups.
+
+    Returns:
+        :obj:`PublicationSampler`: the sampler.
+    """
+    publication_pks = list(Publication.objects.filter(
+        category=category_pk
+    ).order_by('pk').values_list('pk', flat=True))
+    totals = {
+        rollup['scope_id']: rollup
+        for rollup in EngagementRollup.objects.filter(
+            granularity=EngagementRollup.DAY,
+            scope=EngagementRollup.PUBLICATION,
+            scope_id__in=publication_pks,
+        ).values('scope_id').annotate(
+            total_posts=Sum('posts'),
+            total_likes=Sum('likes'),
+            total_shares=Sum('shares'),
+            total_clicks=Sum('clicks'),
+        )
+    }
+    empty = {
+        'total_posts': 0, 'total_likes': 0, 'total_shares': 0,
+        'total_clicks': 0,
+    }
+    rollups = [totals.get(pk, empty) for pk in publication_pks]
+    return PublicationSampler(
+        publication_pks,
+        [rollup['total_posts'] for rollup in rollups],
+        [
+            get_engagement(
+                rollup['total_likes'],
+                rollup['total_shares'],
+                rollup['total_clicks']
+            )
+            for rollup in rollups
+        ]
+    )
+
+
+def get_sampler(category_pk):
+    """Returns the sampler of a category, from process memory if its
+    version is current.
+
+    Returns:
+        :obj:`PublicationSampler`: the sampler.
+    """
+    version = cache.get(get_version_key(category_pk))
+    entry = samplers.get(category_pk)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+    sampler = load_sampler(category_pk)
+    samplers.set(category_pk, (version, sampler))
+    return sampler
+
+
+def invalidate_sampler(sender, instance, **kwargs):
+    """Sets a new version for the samplers of the category of a saved or
+    deleted publication, once the change is committed.
+
+    Connected to `Publication` `post_save` and `post_delete` signals.
+    """
+    category_pk = instance.category_id
+    if category_pk is not None:
+        transaction.on_commit(lambda: set_version(category_pk))
+
+
+def apply_publication_engagement(changes):
+    """Updates samplers with new engagement.
+
+    Samplers of the current process are updated in place and kept current,
+    other processes rebuild theirs from the rollups, which must already
+    include the changes.
+
+    Args:
+        changes (dict): `[posts, engagement]` lists, by
+            `(category_pk, publication_pk)` key.
+    """
+    by_category = {}
+    for (category_pk, publication_pk), values in changes.items():
+        by_category.setdefault(category_pk, []).append(
+            (publication_pk, values)
+        )
+    for category_pk, publication_changes in by_category.items():
+        version = set_version(category_pk)
+        entry = samplers.get(category_pk)
+        if entry is None:
+            continue
+        sampler = entry[1]
+        with sampler.lock:
+            for publication_pk, (posts, engagement) in publication_changes:
+                sampler.add_engagement(publication_pk, posts, engagement)
+        samplers.set(category_pk, (version, sampler))
+
+
+def pick_weighted_publication(category_pk, publications, rng=random):
+    """Picks a publication of a category, weighted by engagement.
+
+    Only the drawn publication is fetched. Publications missing from
+    `publications` are zeroed in the tree while drawing again, and their
+    weights restored afterwards.
+
+    Args:
+        category_pk (int): primary key of the category.
+        publications (:obj:`QuerySet`): the publications which can be picked,
+            a publication of the category missing from it is drawn again.
+        rng (:obj:`random.Random`): source of randomness.
+
+    Returns:
+        :obj:`Publication`: the picked publication, or `None` if none can be
+            picked.
+    """
+    sampler = get_sampler(category_pk)
+    tree = sampler.tree
+    skipped = {}
+    with sampler.lock:
+        try:
+            for _ in range(len(tree)):
+                if tree.total <= 0:
+                    break
+                position = tree.sample(rng)
+                publication = publications.filter(
+                    pk=sampler.publication_pks[position]
+                ).first()
+                if publication is not None:
+                    return publication
+                skipped[position] = tree.weights[position]
+                tree.update(position, 0)
+        finally:
+            for position, weight in skipped.items():
+                tree.update(position, weight)
+    return None
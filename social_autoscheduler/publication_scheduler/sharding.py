@@ -0,0 +1,199 @@
+"""Sharding of publish events between dispatcher instances.
+
+Publish events are split in `PUBLICATION_SCHEDULER_DISPATCH_SHARDS` shards by
+creator id, so that the posts of an account, and its rate budget, are all
+handled by the same instance. Each dispatcher instance registers itself in
+Redis, and shards are assigned to live instances by rendezvous hashing, so
+that only the shards of an instance joining or leaving move. An instance
+dispatches a shard only while it holds its Redis lease, which expires if the
+instance dies.
+
+Every lease acquisition increments the fencing token of the shard, kept in
+the database. Claims are made with the token, checked against the current one
+inside the claim transaction: a paused instance whose lease expired and was
+taken over can no longer claim occurrences of the shard.
+"""
+import hashlib
+import logging
+import uuid
+
+import redis
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from social_autoscheduler.publication_scheduler.models import DispatchShard
+
+logger = logging.getLogger(__name__)
+
+MEMBERS_KEY = 'dispatch:members'
+
+LEASE_KEY = 'dispatch:lease:{0}'
+
+RENEW_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class StaleLeaseError(Exception):
+    """Raised when claiming with the fencing token of a lost lease.
+    """
+
+
+def get_shard_count():
+    return settings.PUBLICATION_SCHEDULER_DISPATCH_SHARDS
+
+
+def get_redis():
+    return redis.StrictRedis.from_url(
+        settings.PUBLICATION_SCHEDULER_DISPATCH_REDIS_URL
+    )
+
+
+def get_weight(member, shard):
+    key = '{0}:{1}'.format(member, shard).encode()
+    return hashlib.md5(key).hexdigest()
+
+
+def assign_shards(members, shards):
+    """Assigns shards to members by rendezvous hashing.
+
+    Args:
+        members (list): identifiers of the live members.
+        shards (int): number of shards.
+
+    Returns:
+        dict: the set of assigned shards, by member.
+    """
+    assignment = {member: set() for member in members}
+    if not members:
+        return assignment
+    for shard in range(shards):
+        owner = max(members, key=lambda member: get_weight(member, shard))
+        assignment[owner].add(shard)
+    return assignment
+
+
+def acquire_fencing_token(shard):
+    """Increments the fencing token of a shard whose lease was acquired.
+
+    Returns:
+        int: the new fencing token.
+    """
+    with transaction.atomic():
+        DispatchShard.objects.get_or_create(shard=shard)
+        DispatchShard.objects.filter(shard=shard).update(
+            fencing_token=F('fencing_token') + 1
+        )
+        return DispatchShard.objects.get(shard=shard).fencing_token
+
+
+def check_fencing_token(shard, token):
+    """Checks that the fencing token of a claim is the current one.
+
+    Must be called inside the claim transaction: the shard row stays locked
+    until the transaction ends, so a lease cannot be taken over while an
+    occurrence of the shard is being claimed.
+
+    Raises:
+        StaleLeaseError: if the lease of the shard was acquired again since
+            the token was issued.
+    """
+    current = DispatchShard.objects.select_for_update().filter(
+        shard=shard,
+        fencing_token=token,
+    )
+    if not list(current):
+        raise StaleLeaseError(
+            'Lease of shard {0} was taken over'.format(shard)
+        )
+
+
+class ShardLeases(object):
+    """Leases of the shards owned by a dispatcher instance.
+
+    Attributes:
+        redis (:obj:`redis.StrictRedis`): the Redis client.
+        instance_id (str): identifier of the instance.
+        shards (int): number of shards.
+        ttl (float): lifetime of leases and membership, in seconds. Leases
+            must be renewed more often than that.
+        tokens (dict): fencing tokens of the owned shards, by shard.
+    """
+
+    def __init__(self, client, instance_id=None, shards=None, ttl=10):
+        self.redis = client
+        self.instance_id = instance_id or uuid.uuid4().hex
+        self.shards = shards or get_shard_count()
+        self.ttl = ttl
+        self.tokens = {}
+        self.renew_script = client.register_script(RENEW_SCRIPT)
+        self.release_script = client.register_script(RELEASE_SCRIPT)
+
+    def get_members(self, now):
+        """Registers the instance and returns the live members.
+
+        Returns:
+            list: identifiers of the instances alive at `now`.
+        """
+        self.redis.hset(MEMBERS_KEY, self.instance_id, now + self.ttl)
+        members, expired = [], []
+        for member, expires_at in self.redis.hgetall(MEMBERS_KEY).items():
+            member = member.decode()
+            if float(expires_at) > now:
+                members.append(member)
+            else:
+                expired.append(member)
+        if expired:
+            self.redis.hdel(MEMBERS_KEY, *expired)
+        return members
+
+    def update(self, now):
+        """Rebalances and renews the leases of the instance.
+
+        Shards assigned to other members are released, leases of the
+        assigned shards are renewed, and the free ones are acquired. Shards
+        still leased by a dead member are acquired once its lease expires.
+
+        Returns:
+            dict: fencing tokens of the owned shards, by shard.
+        """
+        targets = assign_shards(
+            self.get_members(now),
+            self.shards
+        ).get(self.instance_id, set())
+        ttl_ms = int(self.ttl * 1000)
+        for shard in list(self.tokens):
+            key = LEASE_KEY.format(shard)
+            if shard not in targets:
+                self.release_script(keys=[key], args=[self.instance_id])
+                del self.tokens[shard]
+            elif not self.renew_script(keys=[key], args=[self.instance_id, ttl_ms]):
+                logger.warning('Lost the lease of shard %s', shard)
+                del self.tokens[shard]
+        for shard in targets.difference(self.tokens):
+            if self.redis.set(LEASE_KEY.format(shard), self.instance_id,
+                              px=ttl_ms, nx=True):
+                self.tokens[shard] = acquire_fencing_token(shard)
+        return dict(self.tokens)
+
+    def release(self):
+        """Releases every lease and leaves the members.
+        """
+        for shard in self.tokens:
+            self.release_script(
+                keys=[LEASE_KEY.format(shard)],
+                args=[self.instance_id]
+            )
+        self.tokens = {}
+        self.redis.hdel(MEMBERS_KEY, self.instance_id)
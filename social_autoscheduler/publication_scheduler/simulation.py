@@ -0,0 +1,170 @@
+"""Dry-run simulation of the dispatch of publications, for capacity planning.
+
+Occurrences are indexed, then fired and claimed by the dispatcher daemon,
+stepped one tick of virtual time at a time, which throttles their jobs per
+account earliest deadline first. Enqueued jobs then go through a simulated
+pool of workers, against a fake network answering in a fixed time. Callers
+run simulations in a transaction rolled back at the end, so nothing is
+published nor persisted.
+"""
+import collections
+import datetime
+import random
+
+from django.contrib.auth import get_user_model
+from django.utils import dates, timezone
+
+from schedule.models import Rule
+
+from social_autoscheduler.publication_scheduler.dispatcher import Dispatcher
+from social_autoscheduler.publication_scheduler.models import (
+    Category,
+    Publication,
+    PublishEvent,
+    SocialNetwork,
+)
+from social_autoscheduler.publication_scheduler.recommendations import (
+    SLOTS,
+    get_slot_time,
+)
+
+# At the end of each minute, `deferred` jobs wait in the dispatcher for the
+# rate of their account and `queue_depth` jobs wait for a worker.
+MinuteStats = collections.namedtuple(
+    'MinuteStats',
+    ['minute', 'claimed', 'published', 'deferred', 'dropped', 'queue_depth',
+     'utilization']
+)
+
+
+def create_synthetic_schedule(rules, social_networks=1, now=None, seed=0):
+    """Creates publish events at random weekly slots, like the event form does.
+
+    Args:
+        rules (int): number of publish events to create.
+        social_networks (int): number of social networks events are spread
+            over.
+        now (:obj:`datetime.datetime`): events start at this time,
+            defaults to current time.
+        seed (int): seed of the random slots.
+
+    Returns:
+        list: the created `SocialNetwork` instances.
+    """
+    now = now or timezone.now()
+    rng = random.Random(seed)
+    user, _ = get_user_model().objects.get_or_create(
+        username='schedule-simulation'
+    )
+    networks = [
+        SocialNetwork.objects.create(name='Simulated network {0}'.format(index))
+        for index in range(social_networks)
+    ]
+    category = Category.objects.create(name='Simulation', created_by=user)
+    publication = Publication.objects.create(
+        author=user,
+        content='Simulated publication',
+        category=category,
+    )
+    publication.social_networks.set(networks)
+
+    weekly_rules = {}
+    for index in range(rules):
+        slot = rng.randrange(SLOTS)
+        weekday, time = get_slot_time(slot)
+        if slot not in weekly_rules:
+            time_description = ' every {weekday} at {time}'.format(
+                weekday=dates.WEEKDAYS[weekday],
+                time=time
+            )
+            weekly_rules[slot] = Rule.objects.create(
+                name=time_description.strip().capitalize(),
+                description='Event occurring' + time_description,
+                frequency='WEEKLY',
+                params=';'.join([
+                    'byweekday:%s' % weekday,
+                    'byhour:%s' % time.hour,
+                    'byminute:%s' % time.minute,
+                ])
+            )
+        publish_event = PublishEvent.objects.create(
+            rule=weekly_rules[slot],
+            creator=user,
+            start=now,
+            end=now + datetime.timedelta(minutes=1),
+            title='Simulated event {0}'.format(index),
+            category=category,
+        )
+        publish_event.social_networks.set([rng.choice(networks)])
+    return networks
+
+
+class Simulation(object):
+    """Simulated pool of workers publishing the jobs of the dispatcher.
+
+    Attributes:
+        workers (int): number of concurrent workers.
+        job_duration (float): number of seconds the fake network takes to
+            answer a post.
+        rate (int): maximum number of posts per minute and account, `None`
+            for no limit.
+        rates (dict): maximum number of posts per minute and account, by
+            social network primary key, overriding `rate`.
+        batch_size (int): maximum number of jobs the dispatcher enqueues per
+            tick, `None` for no limit.
+        tick (float): dispatch precision, in seconds.
+    """
+
+    def __init__(self, workers, job_duration, rate=None, rates=None,
+                 batch_size=None, tick=1):
+        self.workers = workers
+        self.job_duration = job_duration
+        self.rate = rate
+        self.rates = rates
+        self.batch_size = batch_size
+        self.tick = tick
+
+    def run(self, start, minutes):
+        """Replays the dispatch of occurrences, one dispatcher tick at a time.
+
+        Args:
+            start (:obj:`datetime.datetime`): beginning of the virtual time,
+                occurrences due from it must be indexed.
+            minutes (int): number of minutes to simulate.
+
+        Yields:
+            :obj:`MinuteStats`: statistics of each simulated minute.
+        """
+        capacity = int(self.workers * 60 / self.job_duration)
+        backlog = collections.deque()
+        timestamp = start.timestamp()
+        # Nothing edits the schedule during a simulation, so reconciling
+        # seldom is enough.
+        dispatcher = Dispatcher(
+            refill_interval=60,
+            reconcile_interval=60 * 60,
+            tick=self.tick,
+            enqueue=backlog.append,
+            rate=self.rate,
+            rates=self.rates,
+            batch_size=self.batch_size,
+            now=timestamp,
+        )
+        ticks = int(round(60 / self.tick))
+        for minute in range(minutes):
+            stats = dispatcher.stats.copy()
+            for index in range(ticks):
+                dispatcher.step(timestamp + (minute * ticks + index) * self.tick)
+            stats = dispatcher.stats - stats
+            published = min(len(backlog), capacity)
+            for _ in range(published):
+                backlog.popleft()
+            yield MinuteStats(
+                minute,
+                stats['claimed'],
+                published,
+                sum(len(queue) for queue in dispatcher.queues.values()),
+                stats['dropped'],
+                len(backlog),
+                published / capacity if capacity else 0,
+            )
@@ -0,0 +1,145 @@
+"""Precomputed UTC fire times of weekly slots, per time zone.
+
+Publish events created from the event form recur at a weekly 10-minute slot of
+their creator's local time. Instead of converting each occurrence, the
+occurrence index looks their fire times up in a table holding the UTC fire
+times of every slot of a time zone over a range of days, DST transitions
+included. Building a table only converts the local midnight of each day, and
+every slot of the few days with a transition.
+"""
+import bisect
+import datetime
+import functools
+import re
+
+import pytz
+
+from social_autoscheduler.publication_scheduler.recommendations import (
+    SLOTS,
+    SLOTS_PER_DAY,
+)
+
+SLOT_DURATION = datetime.timedelta(minutes=10)
+
+SLOT_RULE_PARAMS = re.compile(r'^byweekday:(\d);byhour:(\d+);byminute:(\d+)$')
+
+
+def get_rule_slot(frequency, params):
+    """Returns the weekly slot of a rule created by the event form.
+
+    Args:
+        frequency (str): the rule frequency.
+        params (str): the rule parameters, e.g. `byweekday:0;byhour:9`.
+
+    Returns:
+        int: the slot, `None` if the rule does not recur at a weekly slot.
+    """
+    if frequency != 'WEEKLY':
+        return None
+    match = SLOT_RULE_PARAMS.match((params or '').replace(' ', ''))
+    if match is None:
+        return None
+    weekday, hour, minute = map(int, match.groups())
+    if hour > 23 or minute > 59 or minute % 10 or weekday > 6:
+        return None
+    return weekday * SLOTS_PER_DAY + hour * 6 + minute // 10
+
+
+def localize(zone, moment):
+    """Converts a naive local datetime to UTC.
+
+    Local times skipped by a DST transition are moved forward by the length
+    of the transition, and local times repeated by one are taken the first
+    time they occur.
+
+    Args:
+        zone (:obj:`pytz.tzinfo.BaseTzInfo`): the local time zone.
+        moment (:obj:`datetime.datetime`): the naive local datetime.
+
+    Returns:
+        :obj:`datetime.datetime`: the aware UTC datetime.
+    """
+    try:
+        aware = zone.localize(moment, is_dst=None)
+    except pytz.AmbiguousTimeError:
+        aware = zone.localize(moment, is_dst=True)
+    except pytz.NonExistentTimeError:
+        aware = zone.localize(moment, is_dst=False)
+    return aware.astimezone(pytz.utc)
+
+
+class SlotTable(object):
+    """UTC fire times of every weekly slot of a time zone over some days.
+
+    Attributes:
+        time_zone (str): name of the time zone.
+        fire_times (list): sorted lists of aware UTC datetimes, by slot.
+    """
+
+    def __init__(self, time_zone, first_day, days):
+        """Computes the fire times of every slot of the given local days.
+
+        Args:
+            time_zone (str): name of the time zone.
+            first_day (:obj:`datetime.date`): first local day of the table.
+            days (int): number of days of the table.
+        """
+        zone = pytz.timezone(time_zone)
+        self.time_zone = time_zone
+        self.fire_times = [[] for _ in range(SLOTS)]
+        for offset in range(days):
+            midnight = datetime.datetime.combine(
+                first_day + datetime.timedelta(days=offset),
+                datetime.time()
+            )
+            first_slot = midnight.weekday() * SLOTS_PER_DAY
+            start = localize(zone, midnight)
+            end = localize(zone, midnight + datetime.timedelta(days=1))
+            for index in range(SLOTS_PER_DAY):
+                if end - start == datetime.timedelta(days=1):
+                    fire_at = start + index * SLOT_DURATION
+                else:
+                    fire_at = localize(zone, midnight + index * SLOT_DURATION)
+                self.fire_times[first_slot + index].append(fire_at)
+
+    def get_fire_times(self, slot, start, end):
+        """Returns the fire times of a slot in a time range.
+
+        Args:
+            slot (int): the weekly slot.
+            start (:obj:`datetime.datetime`): beginning of the range.
+            end (:obj:`datetime.datetime`): end of the range, excluded.
+
+        Returns:
+            list: the aware UTC fire times, in chronological order.
+        """
+        fire_times = self.fire_times[slot]
+        return fire_times[
+            bisect.bisect_left(fire_times, start):
+            bisect.bisect_left(fire_times, end)
+        ]
+
+
+@functools.lru_cache(maxsize=128)
+def build_slot_table(time_zone, first_day, days):
+    return SlotTable(time_zone, first_day, days)
+
+
+def get_slot_table(time_zone, start, end):
+    """Returns a slot table of a time zone covering a time range.
+
+    Tables cover whole UTC days around the range, so that successive index
+    refreshes of the same day share a single table.
+
+    Args:
+        time_zone (str): name of the time zone.
+        start (:obj:`datetime.datetime`): beginning of the range.
+        end (:obj:`datetime.datetime`): end of the range.
+
+    Returns:
+        :obj:`SlotTable`: the cached table.
+    """
+    # Local dates are at most one day away from UTC dates.
+    first_day = start.astimezone(pytz.utc).date() - datetime.timedelta(days=1)
+    last_day = end.astimezone(pytz.utc).date() + datetime.timedelta(days=1)
+    return build_slot_table(time_zone, first_day, (last_day - first_day).days + 1)
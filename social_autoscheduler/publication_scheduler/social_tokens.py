@@ -0,0 +1,265 @@
+"""OAuth tokens of the social accounts publications are posted with.
+
+Social networks are linked to the allauth provider of their accounts by the
+`PUBLICATION_SCHEDULER_NETWORK_PROVIDERS` setting, and jobs publish with the
+event social accounts of that provider, or else with the social account of the
+event creator on it.
+
+Refreshing an expired token while publishing would add a round trip to the
+provider token endpoint at the busiest minutes. Instead, the tokens expiring
+within `PUBLICATION_SCHEDULER_TOKEN_REFRESH_HORIZON` minutes of the accounts
+with scheduled posts are refreshed ahead of time by a periodic task, with
+concurrent requests, and publishing only ever reads tokens. Tokens read are
+kept in the memory of each worker process for
+`PUBLICATION_SCHEDULER_TOKEN_CACHE_TTL` seconds, never in the shared cache.
+Refreshing tokens sets a new version of their accounts in the shared cache,
+so that workers drop the tokens a provider may have revoked right away.
+"""
+import concurrent.futures
+import datetime
+import logging
+import time
+import uuid
+
+import requests
+from allauth.socialaccount.models import SocialAccount, SocialToken
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from social_autoscheduler.publication_scheduler.caching import LRUCache
+from social_autoscheduler.publication_scheduler.models import (
+    ScheduledOccurrence,
+)
+from social_autoscheduler.publication_scheduler.networks import get_session
+
+logger = logging.getLogger(__name__)
+
+REFRESH_TIMEOUT = 10
+
+# Number of seconds missing or expired tokens are cached.
+EXPIRED_TOKEN_TTL = 30
+
+
+def get_provider(social_network):
+    """Returns the allauth provider id of the accounts of a social network.
+
+    Returns:
+        str: the provider id, `None` if posts are not linked to accounts.
+    """
+    return settings.PUBLICATION_SCHEDULER_NETWORK_PROVIDERS.get(
+        social_network.name
+    )
+
+
+def get_account_pks(user_pks, providers):
+    """Looks up the social accounts of users on providers.
+
+    Returns:
+        dict: primary keys of the latest linked `SocialAccount`, by
+            `(user_pk, provider)`.
+    """
+    if not user_pks or not providers:
+        return {}
+    accounts = SocialAccount.objects.filter(
+        user__in=user_pks,
+        provider__in=providers,
+    ).order_by('pk').values_list('pk', 'user', 'provider')
+    return {
+        (user_pk, provider): pk for pk, user_pk, provider in accounts
+    }
+
+
+def get_expiring_tokens(now, horizon):
+    """Returns the refreshable tokens expiring within a horizon, of the
+    accounts whose users have posts scheduled within it.
+
+    Expired tokens are left out, so that a token whose refresh keeps failing,
+    e.g. after the user revoked the access, is not retried forever.
+
+    Args:
+        now (:obj:`datetime.datetime`): current time.
+        horizon (:obj:`datetime.timedelta`): time ahead of `now`.
+
+    Returns:
+        :obj:`QuerySet`: the `SocialToken` instances, with their app.
+    """
+    user_pks = ScheduledOccurrence.objects.filter(
+        claimed_at__isnull=True,
+        is_suppressed=False,
+        fire_at__gte=now,
+        fire_at__lt=now + horizon,
+    ).values('publish_event__creator')
+    return SocialToken.objects.filter(
+        account__user__in=user_pks,
+        account__provider__in=list(
+            settings.PUBLICATION_SCHEDULER_TOKEN_REFRESH_URLS
+        ),
+        expires_at__gte=now,
+        expires_at__lt=now + horizon,
+    ).exclude(token_secret='').select_related('app', 'account')
+
+
+def request_refresh(token):
+    """Exchanges the refresh token of a token for a new access token.
+
+    Only sends a request, so that it can run outside of the main thread.
+
+    Returns:
+        dict: the `access_token`, and optionally the `expires_in` number of
+            seconds and a new `refresh_token`.
+    """
+    response = get_session().post(
+        settings.PUBLICATION_SCHEDULER_TOKEN_REFRESH_URLS[
+            token.account.provider
+        ],
+        data={
+            'grant_type': 'refresh_token',
+            'refresh_token': token.token_secret,
+            'client_id': token.app.client_id,
+            'client_secret': token.app.secret,
+        },
+        timeout=REFRESH_TIMEOUT,
+    )
+    response.raise_for_status()
+    data = response.json()
+    if 'access_token' not in data:
+        raise ValueError('No access token in refresh response')
+    return data
+
+
+def get_version_key(account_pk):
+    return 'social_token_version:{0}'.format(account_pk)
+
+
+def set_token_versions(account_pks):
+    """Sets new versions for the tokens of social accounts, so that workers
+    read them again.
+    """
+    cache.set_many({
+        get_version_key(account_pk): uuid.uuid4().hex
+        for account_pk in account_pks
+    }, None)
+
+
+def save_tokens(refreshed, now):
+    """Stores refreshed tokens, and sets new versions for them once
+    committed.
+
+    Args:
+        refreshed (list): `(token, response_data)` tuples.
+        now (:obj:`datetime.datetime`): time the tokens were refreshed.
+    """
+    with transaction.atomic():
+        for token, data in refreshed:
+            expires_at = None
+            if data.get('expires_in'):
+                expires_at = now + datetime.timedelta(
+                    seconds=int(data['expires_in'])
+                )
+            SocialToken.objects.filter(pk=token.pk).update(
+                token=data['access_token'],
+                token_secret=data.get('refresh_token') or token.token_secret,
+                expires_at=expires_at,
+            )
+        account_pks = [token.account_id for token, _ in refreshed]
+        if account_pks:
+            transaction.on_commit(lambda: set_token_versions(account_pks))
+
+
+def refresh_tokens(now=None, horizon=None, concurrency=None, batch_size=100):
+    """Refreshes the tokens expiring before the posts of their accounts.
+
+    Each batch of tokens is refreshed with concurrent requests, then stored
+    in a single transaction. Tokens failing to refresh are retried by the
+    next run, until they expire.
+
+    Args:
+        now (:obj:`datetime.datetime`): defaults to current time.
+        horizon (:obj:`datetime.timedelta`): defaults to
+            `PUBLICATION_SCHEDULER_TOKEN_REFRESH_HORIZON` minutes.
+        concurrency (int): maximum number of concurrent requests, defaults
+            to `PUBLICATION_SCHEDULER_TOKEN_REFRESH_CONCURRENCY` setting.
+        batch_size (int): number of tokens stored per transaction.
+
+    Returns:
+        int: the number of refreshed tokens.
+    """
+    now = now or timezone.now()
+    horizon = horizon or datetime.timedelta(
+        minutes=settings.PUBLICATION_SCHEDULER_TOKEN_REFRESH_HORIZON
+    )
+    concurrency = (
+        concurrency or settings.PUBLICATION_SCHEDULER_TOKEN_REFRESH_CONCURRENCY
+    )
+    tokens = list(get_expiring_tokens(now, horizon))
+    refreshed = 0
+    with concurrent.futures.ThreadPoolExecutor(concurrency) as executor:
+        for start in range(0, len(tokens), batch_size):
+            batch = tokens[start:start + batch_size]
+            futures = [
+                (token, executor.submit(request_refresh, token))
+                for token in batch
+            ]
+            results = []
+            for token, future in futures:
+                try:
+                    results.append((token, future.result()))
+                except (requests.RequestException, ValueError):
+                    logger.exception('Could not refresh token of account %s',
+                                     token.account_id)
+            save_tokens(results, now)
+            refreshed += len(results)
+    return refreshed
+
+
+class TokenCache(object):
+    """In-process cache of the access tokens of social accounts.
+
+    Entries are `(token, cached_until, version)` tuples. Tokens are read
+    again from the database after `ttl` seconds, when the version of their
+    account in the shared cache changes, or once they expire. Missing or
+    expired tokens are read again after `EXPIRED_TOKEN_TTL` seconds.
+
+    Attributes:
+        ttl (int): number of seconds tokens are cached, defaults to
+            `PUBLICATION_SCHEDULER_TOKEN_CACHE_TTL` setting.
+    """
+
+    def __init__(self, ttl=None, maxsize=4096):
+        self.ttl = ttl
+        self.cache = LRUCache(maxsize)
+
+    def get_token(self, account_pk, now=None):
+        """Returns the access token of a social account.
+
+        Args:
+            account_pk (int): primary key of the `SocialAccount`.
+            now (float): current timestamp, defaults to `time.time()`.
+
+        Returns:
+            str: the access token, empty if the account has none.
+        """
+        now = now or time.time()
+        version = cache.get(get_version_key(account_pk))
+        entry = self.cache.get(account_pk)
+        if entry is not None and entry[1] > now and entry[2] == version:
+            return entry[0]
+        token = SocialToken.objects.filter(
+            account=account_pk
+        ).order_by('-pk').values_list('token', 'expires_at').first()
+        value, expires_at = token or ('', None)
+        cached_until = now + (
+            self.ttl or settings.PUBLICATION_SCHEDULER_TOKEN_CACHE_TTL
+        )
+        if token is None or (expires_at is not None and
+                             expires_at.timestamp() <= now):
+            cached_until = now + EXPIRED_TOKEN_TTL
+        elif expires_at is not None:
+            cached_until = min(cached_until, expires_at.timestamp())
+        self.cache.set(account_pk, (value, cached_until, version))
+        return value
+
+
+token_cache = TokenCache()
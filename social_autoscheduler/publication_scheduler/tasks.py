@@ -0,0 +1,132 @@
+"""Celery tasks of the publication scheduler.
+
+Only the publishing path is imported with this module, so that workers load
+it before forking their processes. Modules of the other tasks are imported on
+first use.
+"""
+import requests
+from celery import shared_task
+
+from django.utils import timezone
+
+from social_autoscheduler.publication_scheduler import (
+    delayed_jobs,
+    publishing,
+)
+from social_autoscheduler.publication_scheduler.network_limits import (
+    NetworkUnavailable,
+)
+
+
+@shared_task
+def refresh_occurrence_index():
+    """Expands upcoming publish event occurrences into the index.
+    """
+    from social_autoscheduler.publication_scheduler import occurrences
+
+    return occurrences.refresh_occurrence_index()
+
+
+@shared_task
+def dispatch_due_occurrences():
+    """Claims due occurrences and enqueues one job per social network.
+
+    Occurrences late by more than the catch-up grace period are left to
+    `catch_up_missed_occurrences`.
+    """
+    from social_autoscheduler.publication_scheduler import (
+        catch_up,
+        occurrences,
+    )
+
+    occurrence_pks = occurrences.claim_due_occurrences(
+        since=timezone.now() - catch_up.get_catch_up_grace()
+    )
+    jobs = publishing.get_claimed_jobs(occurrence_pks)
+    for job in jobs:
+        publish_job.delay(job)
+    return len(jobs)
+
+
+@shared_task
+def catch_up_missed_occurrences():
+    """Handles occurrences missed while publishing was down.
+    """
+    from social_autoscheduler.publication_scheduler import catch_up
+
+    return catch_up.catch_up()._asdict()
+
+
+@shared_task
+def publish_job(job, attempt=0):
+    """Publishes a publication content on a social network.
+
+    Jobs failing on a transient error, e.g. while the network accepts no more
+    requests, are retried through the delayed job queue.
+
+    Args:
+        job (list): the `PublishJob` fields.
+        attempt (int): number of previous attempts.
+    """
+    try:
+        return publishing.run_job(publishing.PublishJob(*job)).pk
+    except (NetworkUnavailable, requests.RequestException) as error:
+        if not delayed_jobs.is_transient(error):
+            raise
+        delayed_jobs.schedule_retry(
+            job,
+            attempt + 1,
+            delayed_jobs.get_minimum_delay(error)
+        )
+        return None
+
+
+@shared_task
+def refresh_social_tokens():
+    """Refreshes the OAuth tokens expiring before scheduled posts.
+    """
+    from social_autoscheduler.publication_scheduler import social_tokens
+
+    return social_tokens.refresh_tokens()
+
+
+@shared_task
+def refresh_media_ids():
+    """Uploads again the media whose ids expire before scheduled posts.
+    """
+    return publishing.refresh_media_ids()
+
+
+@shared_task
+def generate_thumbnail(blob_pk):
+    """Generates the thumbnail of an image blob.
+    """
+    from social_autoscheduler.publication_scheduler import media
+    from social_autoscheduler.publication_scheduler.models import MediaBlob
+
+    media.generate_thumbnail(MediaBlob.objects.get(pk=blob_pk))
+
+
+@shared_task
+def poll_engagement():
+    """Pulls engagement of recently published posts.
+    """
+    from social_autoscheduler.publication_scheduler import engagement
+
+    return engagement.poll_engagement()
+
+
+@shared_task
+def export_to_storage(user_pk, kind, export_format, path):
+    """Writes an export of a user account to the default storage.
+
+    Returns:
+        dict: the storage path actually used, number of rows and rows per
+            second.
+    """
+    from django.contrib.auth import get_user_model
+
+    from social_autoscheduler.publication_scheduler import exports
+
+    user = get_user_model().objects.get(pk=user_pk)
+    return exports.export_to_storage(user, kind, export_format, path)
@@ -0,0 +1,74 @@
+import datetime
+
+import factory
+from django.utils import timezone
+
+from social_autoscheduler.users.tests.factories import UserFactory
+
+
+class SocialNetworkFactory(factory.django.DjangoModelFactory):
+    name = factory.Sequence(lambda n: 'network-{0}'.format(n))
+
+    class Meta:
+        model = 'publication_scheduler.SocialNetwork'
+
+
+class CategoryFactory(factory.django.DjangoModelFactory):
+    name = factory.Sequence(lambda n: 'category-{0}'.format(n))
+    created_by = factory.SubFactory(UserFactory)
+
+    class Meta:
+        model = 'publication_scheduler.Category'
+
+
+class PublicationFactory(factory.django.DjangoModelFactory):
+    author = factory.SelfAttribute('category.created_by')
+    content = factory.Sequence(lambda n: 'Publication content {0}'.format(n))
+    category = factory.SubFactory(CategoryFactory)
+
+    class Meta:
+        model = 'publication_scheduler.Publication'
+
+    @factory.post_generation
+    def social_networks(self, create, extracted, **kwargs):
+        if create:
+            self.social_networks.set(extracted or [SocialNetworkFactory()])
+
+
+class RuleFactory(factory.django.DjangoModelFactory):
+    name = factory.Sequence(lambda n: 'rule-{0}'.format(n))
+    description = 'Event occurring every day'
+    frequency = 'DAILY'
+
+    class Meta:
+        model = 'schedule.Rule'
+
+
+class PublishEventFactory(factory.django.DjangoModelFactory):
+    title = factory.Sequence(lambda n: 'event-{0}'.format(n))
+    start = factory.LazyFunction(timezone.now)
+    end = factory.LazyAttribute(
+        lambda event: event.start + datetime.timedelta(minutes=1)
+    )
+    rule = factory.SubFactory(RuleFactory)
+    creator = factory.SelfAttribute('category.created_by')
+    category = factory.SubFactory(CategoryFactory)
+
+    class Meta:
+        model = 'publication_scheduler.PublishEvent'
+
+    @factory.post_generation
+    def social_networks(self, create, extracted, **kwargs):
+        if create:
+            self.social_networks.set(extracted or [SocialNetworkFactory()])
+
+
+class PublishedPostFactory(factory.django.DjangoModelFactory):
+    publication = factory.SubFactory(PublicationFactory)
+    category = factory.SelfAttribute('publication.category')
+    social_network = factory.SubFactory(SocialNetworkFactory)
+    network_post_id = factory.Sequence(lambda n: 'post-{0}'.format(n))
+    published_at = factory.LazyFunction(timezone.now)
+
+    class Meta:
+        model = 'publication_scheduler.PublishedPost'
@@ -0,0 +1,98 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class StubNetworkHandler(BaseHTTPRequestHandler):
+    """Request handler implementing the `JSONAPIClient` API in memory.
+    """
+
+    def log_message(self, *args):
+        pass
+
+    def send_json(self, data, status=200):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_body(self):
+        if 'chunked' in self.headers.get('Transfer-Encoding', ''):
+            body = b''
+            while True:
+                size = int(self.rfile.readline().strip(), 16)
+                if not size:
+                    self.rfile.readline()
+                    return body
+                body += self.rfile.read(size)
+                self.rfile.readline()
+        return self.rfile.read(int(self.headers.get('Content-Length', 0)))
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != '/engagement':
+            return self.send_json({}, status=404)
+        self.server.requests.append(('GET', url.path))
+        post_ids = parse_qs(url.query)['ids'][0].split(',')
+        self.send_json(dict(
+            (post_id, self.server.engagement[post_id])
+            for post_id in post_ids
+            if post_id in self.server.engagement
+        ))
+
+    def do_POST(self):
+        body = self.read_body()
+        self.server.requests.append(('POST', self.path))
+        if self.path == '/media':
+            self.server.media.append(body)
+            return self.send_json({'id': 'media-{0}'.format(len(self.server.media))})
+        if self.path == '/posts':
+            self.server.posts.append(json.loads(body.decode()))
+            self.server.authorizations.append(self.headers.get('Authorization'))
+            return self.send_json({'id': 'post-{0}'.format(len(self.server.posts))})
+        if self.path == '/token':
+            self.server.refreshes.append(parse_qs(body.decode()))
+            count = len(self.server.refreshes)
+            return self.send_json({
+                'access_token': 'access-{0}'.format(count),
+                'refresh_token': 'refresh-{0}'.format(count),
+                'expires_in': 3600,
+            })
+        self.send_json({}, status=404)
+
+
+class StubNetworkServer(HTTPServer):
+    """Local HTTP server standing for a social network API in tests.
+
+    Attributes:
+        engagement (dict): engagement counts served, by post id.
+        media (list): bodies of the uploaded media.
+        posts (list): published posts.
+        authorizations (list): `Authorization` headers of the published posts.
+        refreshes (list): parsed bodies of the token refresh requests.
+        requests (list): `(method, path)` of the received requests.
+    """
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), StubNetworkHandler)
+        self.engagement = {}
+        self.media = []
+        self.posts = []
+        self.authorizations = []
+        self.refreshes = []
+        self.requests = []
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:{0}'.format(self.server_address[1])
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
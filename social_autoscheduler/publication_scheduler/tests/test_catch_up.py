@@ -0,0 +1,137 @@
+import datetime
+from unittest import mock
+
+from django.utils import timezone
+from test_plus.test import TestCase
+
+from social_autoscheduler.publication_scheduler.catch_up import catch_up
+from social_autoscheduler.publication_scheduler.models import (
+    Category,
+    ScheduledOccurrence,
+)
+from social_autoscheduler.publication_scheduler.throttling import TokenBucket
+
+from .factories import (
+    PublicationFactory,
+    PublishedPostFactory,
+    PublishEventFactory,
+    SocialNetworkFactory,
+)
+
+
+class TestTokenBucket(TestCase):
+
+    def test_take_until_empty(self):
+        bucket = TokenBucket(rate=1, capacity=2, now=0)
+        self.assertTrue(bucket.take(now=0))
+        self.assertTrue(bucket.take(now=0))
+        self.assertFalse(bucket.take(now=0.5))
+        self.assertTrue(bucket.take(now=1))
+
+    def test_reserve_in_advance(self):
+        bucket = TokenBucket(rate=2, capacity=1, now=0)
+        self.assertEqual(
+            [bucket.reserve(now=0) for _ in range(4)],
+            [0, 0.5, 1, 1.5]
+        )
+
+
+@mock.patch(
+    'social_autoscheduler.publication_scheduler.tasks.publish_job.delay'
+)
+class TestCatchUp(TestCase):
+
+    def setUp(self):
+        # Occurrences expanded from rules have no microseconds.
+        self.now = timezone.now().replace(microsecond=0)
+        self.social_network = SocialNetworkFactory()
+        self.event = PublishEventFactory(
+            start=self.now - datetime.timedelta(days=4, hours=23),
+            social_networks=[self.social_network],
+        )
+        publication = PublicationFactory(
+            category=self.event.category,
+            social_networks=[self.social_network],
+        )
+        published = ScheduledOccurrence.objects.create(
+            publish_event=self.event,
+            fire_at=self.event.start,
+            claimed_at=self.event.start,
+        )
+        PublishedPostFactory(
+            occurrence=published,
+            publication=publication,
+            social_network=self.social_network,
+        )
+
+    def set_policy(self, policy):
+        Category.objects.filter(pk=self.event.category_id).update(
+            catch_up_policy=policy
+        )
+
+    def catch_up(self):
+        return catch_up(
+            start=self.now - datetime.timedelta(days=6),
+            now=self.now
+        )
+
+    def test_skip(self, delay):
+        self.set_policy(Category.SKIP)
+        self.assertEqual(tuple(self.catch_up()), (4, 4, 0))
+        self.assertEqual(tuple(self.catch_up()), (0, 0, 0))
+        self.assertEqual(
+            ScheduledOccurrence.objects.filter(
+                caught_up_at__isnull=False,
+                claimed_at__isnull=True,
+            ).count(),
+            4
+        )
+        self.assertFalse(delay.called)
+
+    def test_compress(self, delay):
+        self.set_policy(Category.COMPRESS)
+        self.assertEqual(tuple(self.catch_up()), (4, 4, 1))
+        claimed = ScheduledOccurrence.objects.get(
+            caught_up_at__isnull=False,
+            claimed_at__isnull=False,
+        )
+        self.assertEqual(
+            claimed.fire_at,
+            self.event.start + datetime.timedelta(days=4)
+        )
+
+    @mock.patch(
+        'social_autoscheduler.publication_scheduler.catch_up.get_delayed_queue'
+    )
+    def test_claimed_occurrences_are_not_missed(self, get_delayed_queue,
+                                                delay):
+        self.set_policy(Category.POST_LATE)
+        in_flight = ScheduledOccurrence.objects.create(
+            publish_event=self.event,
+            fire_at=self.event.start + datetime.timedelta(days=1),
+            claimed_at=self.event.start + datetime.timedelta(days=1),
+        )
+        self.assertEqual(tuple(self.catch_up()), (3, 3, 3))
+        in_flight.refresh_from_db()
+        self.assertIsNone(in_flight.caught_up_at)
+        self.assertEqual(
+            ScheduledOccurrence.objects.filter(
+                caught_up_at__isnull=False,
+                claimed_at__isnull=False,
+            ).count(),
+            3
+        )
+
+    @mock.patch(
+        'social_autoscheduler.publication_scheduler.catch_up.get_delayed_queue'
+    )
+    def test_post_late_is_rate_limited(self, get_delayed_queue, delay):
+        self.set_policy(Category.POST_LATE)
+        with self.settings(PUBLICATION_SCHEDULER_CATCH_UP_RATE=2):
+            self.assertEqual(tuple(self.catch_up()), (4, 4, 4))
+        self.assertEqual(delay.call_count, 2)
+        delayed = get_delayed_queue.return_value.add_many.call_args[0][0]
+        self.assertEqual(
+            [round(due_at - self.now.timestamp()) for _, due_at in delayed],
+            [30, 60]
+        )
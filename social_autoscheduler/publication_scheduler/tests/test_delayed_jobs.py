@@ -0,0 +1,97 @@
+import json
+from unittest import mock
+
+import requests
+from test_plus.test import TestCase
+
+from social_autoscheduler.publication_scheduler.delayed_jobs import (
+    RETRY_MAX_DELAY,
+    DelayedJobMover,
+    get_retry_delay,
+    is_transient,
+)
+from social_autoscheduler.publication_scheduler.network_limits import (
+    NetworkUnavailable,
+)
+from social_autoscheduler.publication_scheduler.tasks import publish_job
+
+
+class FakeDelayedQueue(object):
+    """Delayed queue kept in a list instead of Redis.
+    """
+
+    def __init__(self):
+        self.members = []
+
+    def add(self, job, due_at, attempt=0):
+        self.members.append(
+            (due_at, json.dumps({'job': job, 'attempt': attempt}))
+        )
+        self.members.sort()
+
+    def pop_due(self, now, count):
+        due = [member for due_at, member in self.members if due_at <= now]
+        due = due[:count]
+        self.members = [
+            entry for entry in self.members if entry[1] not in due
+        ]
+        return due
+
+    def restore(self, members, due_at):
+        self.members.extend((due_at, member) for member in members)
+        self.members.sort()
+
+
+class TestDelayedJobMover(TestCase):
+
+    def setUp(self):
+        self.queue = FakeDelayedQueue()
+        for index in range(5):
+            self.queue.add([index], 100 + index, attempt=1)
+        self.enqueued = []
+        self.mover = DelayedJobMover(
+            self.queue,
+            batch_size=2,
+            enqueue=lambda job, attempt: self.enqueued.append(job),
+        )
+
+    def test_promotes_due_jobs_in_batches(self):
+        self.assertEqual(self.mover.step(102.5), 3)
+        self.assertEqual(self.enqueued, [[0], [1], [2]])
+        self.assertEqual(len(self.queue.members), 2)
+
+    def test_jobs_are_put_back_when_enqueue_fails(self):
+        self.mover.enqueue = mock.Mock(side_effect=[None, ValueError])
+        with self.assertRaises(ValueError):
+            self.mover.step(110)
+        self.assertEqual(len(self.queue.members), 4)
+
+
+class TestRetries(TestCase):
+
+    def test_backoff_doubles_up_to_maximum(self):
+        self.assertTrue(2.5 <= get_retry_delay(1) <= 5)
+        self.assertTrue(20 <= get_retry_delay(4) <= 40)
+        self.assertTrue(get_retry_delay(30) <= RETRY_MAX_DELAY)
+        self.assertEqual(get_retry_delay(1, minimum=60), 60)
+
+    def test_only_unprocessed_requests_are_transient(self):
+        response = requests.Response()
+        response.status_code = 429
+        self.assertTrue(is_transient(requests.HTTPError(response=response)))
+        response.status_code = 500
+        self.assertFalse(is_transient(requests.HTTPError(response=response)))
+        self.assertTrue(is_transient(requests.ConnectionError()))
+        self.assertFalse(is_transient(requests.ReadTimeout()))
+
+    @mock.patch(
+        'social_autoscheduler.publication_scheduler.delayed_jobs.schedule_retry'
+    )
+    @mock.patch(
+        'social_autoscheduler.publication_scheduler.publishing.run_job',
+        side_effect=NetworkUnavailable('Saturated', 12)
+    )
+    def test_unavailable_network_delays_retry(self, run_job, schedule_retry):
+        job = [1, 2, 3, 4, 'content', [], None]
+        self.assertIsNone(publish_job(job, attempt=2))
+        schedule_retry.assert_called_once_with(job, 3, 12)
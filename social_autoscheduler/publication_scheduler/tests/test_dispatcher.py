@@ -0,0 +1,229 @@
+import datetime
+from unittest import mock
+
+from django.utils import timezone
+from test_plus.test import TestCase
+
+from social_autoscheduler.publication_scheduler.dispatcher import (
+    JOURNAL_LEASE,
+    Dispatcher,
+)
+from social_autoscheduler.publication_scheduler.models import (
+    Category,
+    ScheduledOccurrence,
+)
+from social_autoscheduler.publication_scheduler.publishing import PublishJob
+from social_autoscheduler.publication_scheduler.throttling import DeadlineQueue
+
+from .factories import (
+    CategoryFactory,
+    PublicationFactory,
+    PublishEventFactory,
+)
+
+
+@mock.patch(
+    'social_autoscheduler.publication_scheduler.dispatcher.publish_job.delay'
+)
+class TestDispatcher(TestCase):
+
+    def setUp(self):
+        self.now = timezone.now().timestamp()
+        self.event = PublishEventFactory()
+        PublicationFactory(
+            category=self.event.category,
+            social_networks=self.event.social_networks.all(),
+        )
+        self.dispatcher = Dispatcher(horizon=60, now=self.now)
+
+    def add_occurrence(self, delay):
+        return ScheduledOccurrence.objects.create(
+            publish_event=self.event,
+            fire_at=timezone.now() + datetime.timedelta(seconds=delay),
+        )
+
+    def test_fires_on_time(self, delay):
+        occurrence = self.add_occurrence(10.5)
+        fire_at = occurrence.fire_at.timestamp()
+        self.assertEqual(self.dispatcher.step(fire_at - 0.2), 0)
+        self.assertEqual(self.dispatcher.step(fire_at + 0.1), 1)
+        occurrence.refresh_from_db()
+        self.assertIsNotNone(occurrence.claimed_at)
+
+    def test_reconcile_cancels_removed_occurrences(self, delay):
+        occurrence = self.add_occurrence(20)
+        self.dispatcher.step(self.now)
+        self.assertIn(occurrence.pk, self.dispatcher.wheel)
+        occurrence.delete()
+        added = self.add_occurrence(25)
+        self.assertEqual(self.dispatcher.reconcile(self.now + 1), (1, 1))
+        self.assertNotIn(occurrence.pk, self.dispatcher.wheel)
+        self.assertIn(added.pk, self.dispatcher.wheel)
+
+    def test_suppressed_occurrences_are_not_claimed(self, delay):
+        occurrence = self.add_occurrence(5)
+        self.dispatcher.step(self.now)
+        ScheduledOccurrence.objects.filter(pk=occurrence.pk).update(
+            is_suppressed=True
+        )
+        self.assertEqual(self.dispatcher.step(self.now + 6), 0)
+        self.assertFalse(delay.called)
+
+    def test_rate_limited_jobs_are_sent_earliest_deadline_first(self, delay):
+        urgent_event = PublishEventFactory(
+            category=CategoryFactory(
+                created_by=self.event.creator,
+                lateness_tolerance=5,
+            ),
+            social_networks=self.event.social_networks.all(),
+        )
+        urgent_publication = PublicationFactory(
+            category=urgent_event.category,
+            social_networks=self.event.social_networks.all(),
+        )
+        occurrence = self.add_occurrence(5)
+        ScheduledOccurrence.objects.create(
+            publish_event=urgent_event,
+            fire_at=occurrence.fire_at + datetime.timedelta(seconds=0.5),
+        )
+        dispatcher = Dispatcher(horizon=60, rate=1, now=self.now)
+        dispatcher.step(self.now)
+        fire_at = occurrence.fire_at.timestamp()
+        self.assertEqual(dispatcher.step(fire_at + 1), 1)
+        self.assertEqual(
+            delay.call_args[0][0].publication_pk,
+            urgent_publication.pk
+        )
+        self.assertEqual(dispatcher.step(fire_at + 30), 0)
+        self.assertEqual(dispatcher.step(fire_at + 65), 1)
+        self.assertFalse(dispatcher.queues)
+
+    def test_late_jobs_are_dropped_or_rescheduled(self, delay):
+        first = self.add_occurrence(5)
+        self.add_occurrence(5.5)
+        fire_at = first.fire_at.timestamp()
+        self.event.category.lateness_tolerance = 1
+        for policy, expected in [(Category.SKIP, 0), (Category.COMPRESS, 1)]:
+            self.event.category.catch_up_policy = policy
+            self.event.category.save()
+            ScheduledOccurrence.objects.update(claimed_at=None)
+            dispatcher = Dispatcher(horizon=60, rate=1, now=self.now)
+            dispatcher.step(self.now)
+            self.assertEqual(dispatcher.step(fire_at + 1), 1)
+            self.assertEqual(dispatcher.step(fire_at + 65), expected)
+
+
+class FakeJournal(object):
+    """Delayed queue kept in a dict instead of Redis.
+    """
+
+    def __init__(self):
+        self.members = {}
+
+    def encode(self, job, attempt):
+        return (job.occurrence_pk, job.account_pk)
+
+    def zadd(self, scored):
+        self.members.update(scored)
+
+    def remove(self, members):
+        for member in members:
+            del self.members[member]
+
+
+class TestJournal(TestCase):
+
+    def setUp(self):
+        self.journal = FakeJournal()
+        self.enqueued = []
+        self.dispatcher = Dispatcher(
+            horizon=60,
+            enqueue=self.enqueued.append,
+            rate=1,
+            journal=self.journal,
+            now=0,
+        )
+        for index in range(3):
+            job = PublishJob(index, 1, 1, 1, '', [], 1)
+            self.dispatcher.push(job, 1, 100, Category.NORMAL)
+
+    def test_waiting_jobs_are_held_until_enqueued(self):
+        self.dispatcher.step(0)
+        self.assertEqual(len(self.enqueued), 1)
+        self.assertEqual(
+            self.journal.members,
+            {(1, 1): JOURNAL_LEASE, (2, 1): JOURNAL_LEASE}
+        )
+        self.dispatcher.step(61)
+        self.assertEqual(
+            self.journal.members,
+            {(2, 1): 61 + JOURNAL_LEASE}
+        )
+        self.dispatcher.flush(62)
+        self.assertEqual(self.journal.members, {})
+
+
+class TestAccountBatching(TestCase):
+
+    def setUp(self):
+        self.enqueued = []
+        self.dispatcher = Dispatcher(
+            horizon=60,
+            enqueue=lambda job: self.enqueued.append(job.account_pk),
+            batch_size=3,
+            now=0,
+        )
+
+    def push(self, account_pk, count, social_network_pk=1):
+        for index in range(count):
+            job = PublishJob(index, 1, 1, social_network_pk, '', [],
+                             account_pk)
+            self.dispatcher.push(job, 1, 100, Category.NORMAL)
+
+    def test_noisy_account_does_not_block_the_others(self):
+        self.push(1, 5)
+        self.push(2, 1)
+        self.push(3, 1)
+        self.assertEqual(self.dispatcher.drain(0), 3)
+        self.assertEqual(self.enqueued, [1, 2, 3])
+        self.assertEqual(self.dispatcher.drain(0), 3)
+        self.assertEqual(self.dispatcher.drain(0), 1)
+        self.assertFalse(self.dispatcher.queues)
+
+    def test_unserved_accounts_go_first_on_next_step(self):
+        for account_pk in range(1, 6):
+            self.push(account_pk, 2)
+        self.dispatcher.drain(0)
+        self.dispatcher.drain(0)
+        self.assertEqual(self.enqueued, [1, 2, 3, 4, 5, 1])
+
+    def test_rates_are_per_social_network(self):
+        self.dispatcher.batch_size = None
+        self.dispatcher.rates = {2: 2}
+        self.push(1, 3, social_network_pk=1)
+        self.push(1, 3, social_network_pk=2)
+        self.assertEqual(self.dispatcher.drain(0), 5)
+        self.assertEqual(len(self.dispatcher.queues), 1)
+
+
+class TestDeadlineQueue(TestCase):
+
+    def test_earliest_deadline_then_priority_first(self):
+        queue = DeadlineQueue()
+        queue.push('evergreen', 100)
+        queue.push('urgent', 10)
+        queue.push('important', 10, priority=2)
+        self.assertEqual(
+            [queue.pop() for _ in range(len(queue))],
+            ['important', 'urgent', 'evergreen']
+        )
+
+    def test_expired_jobs_are_dropped_or_served_last(self):
+        queue = DeadlineQueue()
+        queue.push('skipped', 10, reschedule=False)
+        queue.push('late', 20)
+        queue.push('on time', 100)
+        self.assertEqual(queue.expire(50), ['skipped'])
+        self.assertEqual(queue.pop(), 'on time')
+        self.assertEqual(queue.pop(), 'late')
+        self.assertFalse(queue)
@@ -0,0 +1,107 @@
+import datetime
+
+from django.test import override_settings
+from django.utils import timezone
+from test_plus.test import TestCase
+
+from social_autoscheduler.publication_scheduler.engagement import (
+    get_slot,
+    ingest_samples,
+    poll_engagement,
+)
+from social_autoscheduler.publication_scheduler.models import (
+    EngagementRollup,
+    EngagementSample,
+    PublishedPost,
+)
+
+from .factories import PublishedPostFactory, SocialNetworkFactory
+from .stub_network import StubNetworkServer
+
+
+class TestGetSlot(TestCase):
+
+    def test_slots_cover_the_week(self):
+        monday = datetime.datetime(2026, 10, 19)
+        self.assertEqual(get_slot(monday), 0)
+        self.assertEqual(get_slot(monday.replace(hour=1, minute=25)), 8)
+        self.assertEqual(
+            get_slot(monday + datetime.timedelta(days=6, hours=23, minutes=59)),
+            1007
+        )
+
+
+class TestPollEngagement(TestCase):
+
+    def setUp(self):
+        self.social_network = SocialNetworkFactory()
+        self.posts = [
+            PublishedPostFactory(social_network=self.social_network)
+            for _ in range(3)
+        ]
+
+    def poll(self, server, **kwargs):
+        with override_settings(
+                PUBLICATION_SCHEDULER_DEFAULT_NETWORK_CLIENT=(
+                    'social_autoscheduler.publication_scheduler.networks.'
+                    'JSONAPIClient'
+                ),
+                PUBLICATION_SCHEDULER_NETWORK_API_URLS={
+                    self.social_network.name: server.url,
+                }):
+            return poll_engagement(**kwargs)
+
+    def get_rollup(self, post, scope=EngagementRollup.PUBLICATION):
+        scope_id = {
+            EngagementRollup.PUBLICATION: post.publication_id,
+            EngagementRollup.CATEGORY: post.category_id,
+        }[scope]
+        return EngagementRollup.objects.get(
+            granularity=EngagementRollup.DAY,
+            scope=scope,
+            scope_id=scope_id,
+        )
+
+    def test_polls_in_batches(self):
+        with StubNetworkServer() as server:
+            self.assertEqual(self.poll(server, batch_size=2), 0)
+        self.assertEqual(server.requests, [('GET', '/engagement')] * 2)
+
+    def test_rollups_are_incremental(self):
+        post = self.posts[0]
+        with StubNetworkServer() as server:
+            server.engagement[post.network_post_id] = {
+                'likes': 3, 'shares': 1, 'clicks': 10,
+            }
+            self.assertEqual(self.poll(server), 1)
+            server.engagement[post.network_post_id] = {
+                'likes': 5, 'shares': 1, 'clicks': 12,
+            }
+            self.poll(server, now=timezone.now())
+        self.assertEqual(EngagementSample.objects.filter(post=post).count(), 2)
+        rollup = self.get_rollup(post)
+        self.assertEqual(
+            (rollup.posts, rollup.likes, rollup.shares, rollup.clicks),
+            (1, 5, 1, 12)
+        )
+        self.assertEqual(
+            self.get_rollup(post, EngagementRollup.CATEGORY).likes,
+            5
+        )
+
+    def test_overlapping_polls_count_once(self):
+        post = self.posts[0]
+        # Both polls loaded the posts before either stored its sample.
+        posts = list(PublishedPost.objects.filter(pk=post.pk).select_related(
+            'publication__author'
+        ))
+        engagement = {post.network_post_id: {'likes': 3}}
+        now = timezone.now()
+        self.assertEqual(ingest_samples(posts, engagement, now), 1)
+        self.assertEqual(
+            ingest_samples(posts, engagement, now + datetime.timedelta(1)),
+            1
+        )
+        self.assertEqual(ingest_samples(posts, engagement, now), 0)
+        rollup = self.get_rollup(post)
+        self.assertEqual((rollup.posts, rollup.likes), (1, 3))
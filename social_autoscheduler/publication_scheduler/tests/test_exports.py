@@ -0,0 +1,144 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.urlresolvers import reverse
+from django.test import override_settings
+from test_plus.test import TestCase
+
+from social_autoscheduler.publication_scheduler.exports import get_rrule
+
+from .factories import (
+    PublicationFactory,
+    PublishEventFactory,
+    SocialNetworkFactory,
+)
+
+
+class TestGetRrule(TestCase):
+
+    def test_weekly_rule(self):
+        self.assertEqual(
+            get_rrule('WEEKLY', 'byweekday:0;byhour:9;byminute:10'),
+            'FREQ=WEEKLY;BYDAY=MO;BYHOUR=9;BYMINUTE=10'
+        )
+
+
+class TestExportView(TestCase):
+
+    def setUp(self):
+        social_network = SocialNetworkFactory(name='Twitter')
+        self.publication = PublicationFactory(
+            content='Hello, world',
+            social_networks=[social_network],
+        )
+        self.user = self.publication.author
+        self.event = PublishEventFactory(
+            category=self.publication.category,
+            social_networks=[social_network],
+        )
+        PublicationFactory()
+        self.client.force_login(self.user)
+
+    def export(self, kind, export_format):
+        response = self.client.get(reverse('publication:export', kwargs={
+            'kind': kind,
+            'export_format': export_format,
+        }))
+        if response.streaming:
+            response.body = b''.join(response.streaming_content).decode()
+        return response
+
+    def test_csv(self):
+        response = self.export('publications', 'csv')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        lines = response.body.splitlines()
+        self.assertEqual(lines[0], 'id,category,content,social_networks')
+        self.assertEqual(lines[1:], [
+            '{0},{1},"Hello, world",Twitter'.format(
+                self.publication.pk,
+                self.publication.category.name
+            ),
+        ])
+
+    def test_ics(self):
+        response = self.export('events', 'ics')
+        content = response.body
+        self.assertIn('UID:publish-event-{0}@'.format(self.event.pk), content)
+        self.assertIn('RRULE:FREQ=DAILY\r\n', content)
+        self.assertIn('DTSTART;TZID=Europe/Paris:', content)
+        self.assertEqual(self.export('publications', 'ics').status_code, 404)
+
+    @mock.patch(
+        'social_autoscheduler.publication_scheduler.views.export_to_storage'
+    )
+    def test_large_exports_are_written_by_a_task(self, export_to_storage):
+        export_to_storage.delay.return_value.id = 'task-id'
+        with self.settings(PUBLICATION_SCHEDULER_EXPORT_STREAM_LIMIT=0):
+            response = self.export('categories', 'jsonl')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(
+            response.json()['url'],
+            reverse('publication:export-download', kwargs={
+                'task_id': 'task-id',
+            })
+        )
+        args = export_to_storage.delay.call_args[0]
+        self.assertEqual(args[:3], (self.user.pk, 'categories', 'jsonl'))
+
+
+@mock.patch(
+    'social_autoscheduler.publication_scheduler.views.export_to_storage'
+)
+class TestExportDownloadView(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.user = self.make_user()
+        self.client.force_login(self.user)
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+
+    def download(self, export_to_storage, path, ready=True):
+        result = export_to_storage.AsyncResult.return_value
+        result.ready.return_value = ready
+        result.successful.return_value = True
+        result.status = 'SUCCESS' if ready else 'PENDING'
+        result.result = {'path': path}
+        response = self.client.get(reverse(
+            'publication:export-download',
+            kwargs={'task_id': 'task-id'}
+        ))
+        if response.streaming:
+            response.body = b''.join(response.streaming_content)
+        return response
+
+    def test_saved_name_is_served(self, export_to_storage):
+        requested = 'exports/{0}/categories.jsonl'.format(self.user.pk)
+        default_storage.save(requested, ContentFile(b'first'))
+        saved = default_storage.save(requested, ContentFile(b'second'))
+        response = self.download(export_to_storage, saved)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.body, b'second')
+        export_to_storage.AsyncResult.assert_called_once_with('task-id')
+
+    def test_pending_export(self, export_to_storage):
+        response = self.download(export_to_storage, None, ready=False)
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json(), {'status': 'PENDING'})
+
+    def test_exports_of_other_users_are_hidden(self, export_to_storage):
+        path = default_storage.save(
+            'exports/{0}/categories.jsonl'.format(self.user.pk + 1),
+            ContentFile(b'other')
+        )
+        self.assertEqual(
+            self.download(export_to_storage, path).status_code,
+            404
+        )
@@ -0,0 +1,43 @@
+from test_plus.test import TestCase
+
+from social_autoscheduler.publication_scheduler.load_testing import (
+    Sample,
+    compare_with_baseline,
+    summarize,
+)
+
+
+class TestLoadTestResults(TestCase):
+
+    def setUp(self):
+        self.results = summarize([
+            Sample('publication-list GET', latency / 1000, 200, 4)
+            for latency in range(1, 101)
+        ] + [
+            Sample('category-create POST', 0.05, 302, 6),
+            Sample('category-create POST', 0.05, 200, 5),
+        ], elapsed=10)
+
+    def test_summarize(self):
+        result = self.results['publication-list GET']
+        self.assertEqual(result['requests'], 100)
+        self.assertEqual(result['throughput'], 10)
+        self.assertAlmostEqual(result['p50'], 50)
+        self.assertAlmostEqual(result['p95'], 95)
+        self.assertEqual(result['queries'], 4)
+        self.assertEqual(result['errors'], 0)
+        self.assertEqual(self.results['category-create POST']['errors'], 1)
+
+    def test_regressions(self):
+        baseline = {
+            'publication-list GET': dict(
+                self.results['publication-list GET'],
+                throughput=20,
+                queries=3,
+            ),
+        }
+        self.assertEqual(compare_with_baseline(self.results, baseline), [
+            'category-create POST: 1 failed requests',
+            'publication-list GET: throughput 10.0/s < 20.0/s',
+            'publication-list GET: 4.0 queries > 3.0',
+        ])
@@ -0,0 +1,161 @@
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from test_plus.test import TestCase
+
+from social_autoscheduler.publication_scheduler.media import (
+    MediaIdCache,
+    attach_files,
+    iter_blob_chunks,
+    store_blob,
+)
+from social_autoscheduler.publication_scheduler.models import MediaBlob
+from social_autoscheduler.publication_scheduler.networks import NetworkClient
+
+from .factories import PublicationFactory, SocialNetworkFactory
+
+
+class CountingClient(NetworkClient):
+    media_id_lifetime = 2 * 60 * 60
+
+    def upload_media(self, blob, chunks):
+        self.uploads = getattr(self, 'uploads', 0) + 1
+        return '{0}-{1}'.format(blob.sha256[:8], self.uploads)
+
+
+class TestMediaStorage(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+
+    def test_same_content_is_stored_once(self):
+        first = store_blob(SimpleUploadedFile('a.txt', b'same content'))
+        second = store_blob(SimpleUploadedFile('b.txt', b'same content'))
+        self.assertEqual(first, second)
+        self.assertEqual(MediaBlob.objects.count(), 1)
+        self.assertTrue(first.file.name.endswith(first.sha256 + '.txt'))
+
+    def test_attach_files_shares_blobs(self):
+        publications = [PublicationFactory() for _ in range(2)]
+        for publication in publications:
+            attach_files(publication, [
+                SimpleUploadedFile('image.gif', b'GIF89a', 'image/gif'),
+            ])
+        blob = MediaBlob.objects.get()
+        self.assertEqual(blob.attachments.count(), 2)
+        self.assertEqual(blob.content_type, 'image/gif')
+
+    def test_iter_blob_chunks(self):
+        content = b'0123456789' * 10
+        blob = store_blob(SimpleUploadedFile('data.bin', content))
+        chunks = list(iter_blob_chunks(blob, chunk_size=30))
+        self.assertEqual(len(chunks), 4)
+        self.assertEqual(b''.join(chunks), content)
+
+
+class TestMediaIdCache(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.media_id_cache = MediaIdCache(refresh_margin=60 * 60)
+        self.network_client = CountingClient(
+            SocialNetworkFactory(),
+            'account'
+        )
+        self.blob = MediaBlob(sha256='a' * 64, content_type='image/png', size=1)
+
+    def test_live_media_id_is_reused(self):
+        first = self.media_id_cache.get_media_id(
+            self.network_client,
+            self.blob,
+            now=1
+        )
+        second = self.media_id_cache.get_media_id(
+            self.network_client,
+            self.blob,
+            now=2
+        )
+        self.assertEqual(first, second)
+        self.assertEqual(self.network_client.uploads, 1)
+        self.assertEqual(
+            self.media_id_cache.get_stats(),
+            {'hits': 1, 'misses': 1, 'refreshes': 0}
+        )
+
+    def test_expiring_media_id_is_refreshed(self):
+        self.media_id_cache.get_media_id(self.network_client, self.blob,
+                                         now=1)
+        media_id = self.media_id_cache.get_media_id(
+            self.network_client,
+            self.blob,
+            now=1 + 60 * 60 + 1
+        )
+        self.assertTrue(media_id.endswith('-2'))
+        self.assertEqual(self.media_id_cache.get_stats()['refreshes'], 1)
+
+    def test_media_id_expiring_before_post_is_refreshed_ahead(self):
+        self.media_id_cache.get_media_id(self.network_client, self.blob,
+                                         now=1)
+        self.assertTrue(self.media_id_cache.refresh_media_id(
+            self.network_client,
+            self.blob,
+            due_at=1 + 60 * 60 + 1,
+            now=10
+        ))
+        media_id = self.media_id_cache.get_media_id(
+            self.network_client,
+            self.blob,
+            now=1 + 60 * 60 + 1
+        )
+        self.assertTrue(media_id.endswith('-2'))
+        self.assertEqual(self.network_client.uploads, 2)
+
+    def test_media_id_too_short_lived_is_not_refreshed_ahead(self):
+        self.media_id_cache.get_media_id(self.network_client, self.blob,
+                                         now=1)
+        self.assertFalse(self.media_id_cache.refresh_media_id(
+            self.network_client,
+            self.blob,
+            due_at=1 + 60 * 60 + 1,
+            now=2
+        ))
+        self.assertEqual(self.network_client.uploads, 1)
+
+    def test_media_id_live_at_post_is_not_refreshed(self):
+        self.media_id_cache.get_media_id(self.network_client, self.blob,
+                                         now=1)
+        self.assertFalse(self.media_id_cache.refresh_media_id(
+            self.network_client,
+            self.blob,
+            due_at=60,
+            now=2
+        ))
+        self.assertEqual(self.network_client.uploads, 1)
+
+    def test_uncached_media_is_not_uploaded_ahead(self):
+        self.assertFalse(self.media_id_cache.refresh_media_id(
+            self.network_client,
+            self.blob,
+            due_at=1,
+            now=1
+        ))
+        self.assertFalse(hasattr(self.network_client, 'uploads'))
+
+    def test_media_ids_are_cached_per_account(self):
+        other_client = CountingClient(
+            self.network_client.social_network,
+            'other'
+        )
+        self.media_id_cache.get_media_id(self.network_client, self.blob,
+                                         now=1)
+        self.media_id_cache.get_media_id(other_client, self.blob, now=1)
+        self.assertEqual(other_client.uploads, 1)
@@ -0,0 +1,57 @@
+from unittest import mock
+
+import redis
+from test_plus.test import TestCase
+
+from social_autoscheduler.publication_scheduler.network_limits import (
+    SATURATED_DELAY,
+    NetworkLimiter,
+    NetworkUnavailable,
+)
+
+
+class TestNetworkLimiter(TestCase):
+
+    def setUp(self):
+        self.client = mock.Mock()
+        self.acquire_script = mock.Mock(return_value=[1, b'0'])
+        self.release_script = mock.Mock(return_value=0)
+        self.client.register_script.side_effect = [
+            self.acquire_script,
+            self.release_script,
+        ]
+        self.limiter = NetworkLimiter(self.client, 3)
+
+    def test_open_breaker_defers_until_cooldown(self):
+        self.acquire_script.return_value = [0, b'12.5']
+        with self.assertRaises(NetworkUnavailable) as context:
+            self.limiter.acquire()
+        self.assertTrue(12.5 <= context.exception.retry_after <= 18.75)
+
+    def test_saturated_network_defers(self):
+        self.acquire_script.return_value = [0, b'0']
+        with self.assertRaises(NetworkUnavailable) as context:
+            self.limiter.acquire()
+        self.assertTrue(
+            SATURATED_DELAY <= context.exception.retry_after <= SATURATED_DELAY * 1.5
+        )
+
+    def test_failed_requests_are_recorded(self):
+        with self.assertRaises(ValueError):
+            with self.limiter.request():
+                raise ValueError
+        args = self.release_script.call_args[1]['args']
+        self.assertEqual(args[1], self.acquire_script.call_args[1]['args'][1])
+        self.assertEqual(args[3], 1)
+
+    def test_requests_are_not_limited_while_redis_is_down(self):
+        self.acquire_script.side_effect = redis.ConnectionError
+        with self.limiter.request():
+            pass
+        self.assertFalse(self.release_script.called)
+
+    def test_requests_are_not_limited_without_redis(self):
+        limiter = NetworkLimiter(None, 3)
+        with limiter.request():
+            pass
+        self.assertIsNone(limiter.acquire())
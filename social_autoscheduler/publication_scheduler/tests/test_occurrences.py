@@ -0,0 +1,129 @@
+import datetime
+
+from django.utils import timezone
+from test_plus.test import TestCase
+
+from social_autoscheduler.publication_scheduler.models import (
+    BlackoutWindow,
+    ScheduledOccurrence,
+)
+from social_autoscheduler.publication_scheduler.occurrences import (
+    IntervalSet,
+    claim_due_occurrences,
+    refresh_occurrence_index,
+    set_paused,
+    update_suppression,
+)
+
+from .factories import PublishEventFactory, SocialNetworkFactory
+
+
+class TestIntervalSet(TestCase):
+
+    def test_merges_overlapping_intervals(self):
+        intervals = IntervalSet([(5, 8), (1, 3), (2, 4), (4, 4)])
+        self.assertEqual(len(intervals), 2)
+        self.assertIn(1, intervals)
+        self.assertIn(3, intervals)
+        self.assertNotIn(4, intervals)
+        self.assertIn(7, intervals)
+        self.assertNotIn(8, intervals)
+        self.assertNotIn(0, intervals)
+
+
+class TestOccurrenceIndex(TestCase):
+
+    def setUp(self):
+        self.now = timezone.now()
+        self.event = PublishEventFactory(
+            start=self.now + datetime.timedelta(hours=1)
+        )
+
+    def refresh(self):
+        return refresh_occurrence_index(
+            now=self.now,
+            horizon=datetime.timedelta(days=3)
+        )
+
+    def test_refresh_creates_occurrences_once(self):
+        self.assertEqual(self.refresh(), (3, 0))
+        self.assertEqual(self.refresh(), (0, 0))
+
+    def test_refresh_suppresses_blackout_occurrences(self):
+        BlackoutWindow.objects.create(
+            created_by=self.event.creator,
+            start=self.now,
+            end=self.now + datetime.timedelta(days=1),
+            category=self.event.category,
+        )
+        self.refresh()
+        self.assertEqual(
+            ScheduledOccurrence.objects.filter(is_suppressed=True).count(),
+            1
+        )
+
+    def test_set_paused_updates_pending_occurrences(self):
+        self.refresh()
+        self.assertEqual(set_paused(self.event.category, True), 3)
+        self.assertFalse(
+            ScheduledOccurrence.objects.filter(is_suppressed=False).exists()
+        )
+        self.assertEqual(set_paused(self.event.category, False), 3)
+
+    def test_set_paused_excludes_single_social_network(self):
+        social_network = self.event.social_networks.get()
+        self.event.social_networks.add(SocialNetworkFactory())
+        self.refresh()
+        self.assertEqual(set_paused(social_network, True), 3)
+        self.assertEqual(
+            ScheduledOccurrence.objects.filter(
+                is_suppressed=False,
+                excluded_social_networks=[social_network.pk],
+            ).count(),
+            3
+        )
+
+    def test_update_suppression_releases_deleted_blackout(self):
+        window = BlackoutWindow.objects.create(
+            created_by=self.event.creator,
+            start=self.now,
+            end=self.now + datetime.timedelta(days=3),
+        )
+        self.refresh()
+        window.delete()
+        self.assertEqual(
+            update_suppression(now=self.now,
+                               publish_event__creator=self.event.creator),
+            3
+        )
+
+    def test_update_suppression_covers_last_occurrence(self):
+        self.refresh()
+        last = ScheduledOccurrence.objects.order_by('fire_at').last()
+        BlackoutWindow.objects.create(
+            created_by=self.event.creator,
+            start=last.fire_at,
+            end=last.fire_at + datetime.timedelta(hours=1),
+        )
+        self.assertEqual(update_suppression(now=self.now), 1)
+        last.refresh_from_db()
+        self.assertTrue(last.is_suppressed)
+
+    def test_claim_skips_suppressed_occurrences(self):
+        self.refresh()
+        first, second = ScheduledOccurrence.objects.order_by('fire_at')[:2]
+        second.is_suppressed = True
+        second.save()
+        claimed = claim_due_occurrences(
+            now=self.now + datetime.timedelta(days=2),
+        )
+        self.assertEqual(claimed, [first.pk])
+        self.assertEqual(claim_due_occurrences(now=second.fire_at), [])
+
+    def test_claim_batch_size_defaults_to_setting(self):
+        self.refresh()
+        first, second = ScheduledOccurrence.objects.order_by('fire_at')[:2]
+        self.assertEqual(
+            claim_due_occurrences(now=second.fire_at),
+            [first.pk, second.pk]
+        )
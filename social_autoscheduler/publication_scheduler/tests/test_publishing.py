@@ -0,0 +1,95 @@
+import datetime
+
+from django.utils import timezone
+from test_plus.test import TestCase
+
+from social_autoscheduler.publication_scheduler.models import (
+    ScheduledOccurrence,
+    SocialNetwork,
+)
+from social_autoscheduler.publication_scheduler.publishing import (
+    SOCIAL_NETWORK_TTL,
+    get_claimed_jobs,
+    get_social_network,
+    preload,
+    social_networks,
+)
+from social_autoscheduler.publication_scheduler.rendering import pipelines
+
+from .factories import (
+    PublicationFactory,
+    PublishEventFactory,
+    SocialNetworkFactory,
+)
+
+
+class TestFanOut(TestCase):
+
+    def setUp(self):
+        self.social_networks = [SocialNetworkFactory() for _ in range(3)]
+        self.event = PublishEventFactory(social_networks=self.social_networks)
+        self.publication = PublicationFactory(
+            category=self.event.category,
+            social_networks=self.social_networks[:2],
+        )
+        self.occurrence = ScheduledOccurrence.objects.create(
+            publish_event=self.event,
+            fire_at=timezone.now() - datetime.timedelta(minutes=1),
+            claimed_at=timezone.now(),
+        )
+
+    def test_one_job_per_publication_social_network(self):
+        jobs = get_claimed_jobs([self.occurrence.pk])
+        self.assertEqual(
+            sorted(job.social_network_pk for job in jobs),
+            [social_network.pk for social_network in self.social_networks[:2]]
+        )
+        self.assertEqual(
+            set(job.content for job in jobs),
+            {self.publication.content}
+        )
+
+    def test_excluded_social_networks_are_skipped(self):
+        self.occurrence.excluded_social_networks = [self.social_networks[0].pk]
+        self.occurrence.save()
+        jobs = get_claimed_jobs([self.occurrence.pk])
+        self.assertEqual(
+            [job.social_network_pk for job in jobs],
+            [self.social_networks[1].pk]
+        )
+
+    def test_no_job_without_publication(self):
+        self.publication.delete()
+        self.assertEqual(get_claimed_jobs([self.occurrence.pk]), [])
+
+
+class TestGetSocialNetwork(TestCase):
+
+    def setUp(self):
+        social_networks.clear()
+        self.social_network = SocialNetworkFactory(name='Before')
+
+    def test_changes_are_seen_after_ttl(self):
+        pk = self.social_network.pk
+        self.assertEqual(get_social_network(pk, now=1).name, 'Before')
+        SocialNetwork.objects.filter(pk=pk).update(name='After')
+        with self.assertNumQueries(0):
+            self.assertEqual(get_social_network(pk, now=2).name, 'Before')
+        self.assertEqual(
+            get_social_network(pk, now=2 + SOCIAL_NETWORK_TTL).name,
+            'After'
+        )
+
+
+class TestPreload(TestCase):
+
+    def test_builds_render_pipelines(self):
+        steps = [
+            ('social_autoscheduler.publication_scheduler.rendering.truncate',
+             {'length': 10}),
+        ]
+        with self.settings(PUBLICATION_SCHEDULER_RENDER_PIPELINES={
+                'Preloaded': steps}):
+            preload()
+        self.addCleanup(pipelines.pop, 'Preloaded')
+        self.assertEqual(pipelines['Preloaded'].render('x' * 20), 'x' * 7 + '...')
@@ -0,0 +1,95 @@
+import datetime
+
+from django.core.cache import cache
+from test_plus.test import TestCase
+
+from social_autoscheduler.publication_scheduler.models import EngagementRollup
+from social_autoscheduler.publication_scheduler.recommendations import (
+    SLOTS,
+    apply_rollup_deltas,
+    get_grid,
+    get_slot_time,
+    get_window_sums,
+    recommend_slots,
+)
+from social_autoscheduler.users.tests.factories import UserFactory
+
+from .factories import SocialNetworkFactory
+
+
+class TestGetWindowSums(TestCase):
+
+    def test_wraps_around_the_week(self):
+        self.assertEqual(
+            get_window_sums([1, 0, 0, 0, 2], radius=1),
+            [4, 1, 0, 2, 5]
+        )
+
+
+class TestRecommendSlots(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = UserFactory()
+        self.social_network = SocialNetworkFactory()
+
+    def add_rollup(self, slot, posts, likes):
+        EngagementRollup.objects.create(
+            granularity=EngagementRollup.SLOT,
+            scope=EngagementRollup.USER,
+            scope_id=self.user.pk,
+            social_network=self.social_network,
+            bucket=slot,
+            posts=posts,
+            likes=likes,
+        )
+
+    def recommend(self, **kwargs):
+        return recommend_slots(
+            EngagementRollup.USER,
+            self.user.pk,
+            self.social_network.pk,
+            **kwargs
+        )
+
+    def test_no_engagement(self):
+        self.assertEqual(self.recommend(), [])
+
+    def test_best_slot_first(self):
+        self.add_rollup(slot=100, posts=2, likes=10)
+        self.add_rollup(slot=500, posts=2, likes=100)
+        self.assertEqual(self.recommend(count=1)[0][0], 500)
+
+    def test_slots_without_data_rank_last(self):
+        self.add_rollup(slot=100, posts=2, likes=10)
+        self.add_rollup(slot=500, posts=2, likes=100)
+        slots = [slot for slot, _ in self.recommend(count=20)]
+        self.assertEqual(slots[0], 500)
+        self.assertEqual(
+            set(slots[:10]),
+            set(range(498, 503)) | set(range(98, 103))
+        )
+
+    def test_grid_is_updated_incrementally(self):
+        self.add_rollup(slot=100, posts=2, likes=10)
+        self.assertEqual(self.recommend(count=1)[0][0], 100)
+        apply_rollup_deltas({
+            (EngagementRollup.SLOT, EngagementRollup.USER, self.user.pk,
+             self.social_network.pk, 700): [4, 200, 0, 0],
+        })
+        with self.assertNumQueries(0):
+            self.assertEqual(self.recommend(count=1)[0][0], 700)
+        posts, engagement = get_grid(
+            EngagementRollup.USER,
+            self.user.pk,
+            self.social_network.pk
+        )
+        self.assertEqual(len(posts), SLOTS)
+        self.assertEqual((posts[700], engagement[700]), (4, 200))
+
+
+class TestGetSlotTime(TestCase):
+
+    def test_matches_time_steps(self):
+        self.assertEqual(get_slot_time(0), (0, datetime.time(0, 0)))
+        self.assertEqual(get_slot_time(1007), (6, datetime.time(23, 50)))
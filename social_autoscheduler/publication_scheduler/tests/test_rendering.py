@@ -0,0 +1,64 @@
+from test_plus.test import TestCase
+
+from social_autoscheduler.publication_scheduler import rendering
+from social_autoscheduler.publication_scheduler.caching import LRUCache
+
+from .factories import SocialNetworkFactory
+
+
+class TestLRUCache(TestCase):
+
+    def test_evicts_least_recently_used_key(self):
+        lru = LRUCache(maxsize=2)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')
+        lru.set('c', 3)
+        self.assertEqual(lru.get('a'), 1)
+        self.assertIsNone(lru.get('b'))
+        self.assertEqual(lru.get('c'), 3)
+
+
+class TestRenderSteps(TestCase):
+
+    def test_append_hashtags_skips_existing_ones(self):
+        self.assertEqual(
+            rendering.append_hashtags('Hello #Django', ['django', 'python']),
+            'Hello #Django #python'
+        )
+
+    def test_truncate(self):
+        self.assertEqual(rendering.truncate('a' * 10, 5), 'aa...')
+
+
+class TestRender(TestCase):
+
+    def setUp(self):
+        self.social_network = SocialNetworkFactory()
+        rendering.pipelines[self.social_network.name] = rendering.RenderPipeline([
+            ('social_autoscheduler.publication_scheduler.rendering.escape', {}),
+            ('social_autoscheduler.publication_scheduler.rendering.truncate',
+             {'length': 12}),
+        ])
+
+    def tearDown(self):
+        rendering.pipelines.pop(self.social_network.name)
+
+    def test_render_runs_steps_in_order(self):
+        self.assertEqual(
+            rendering.render(1, 'Tom & Jerry forever', self.social_network),
+            'Tom &amp;...'
+        )
+
+    def test_render_is_memoized_by_content(self):
+        pipeline = rendering.pipelines[self.social_network.name]
+        rendering.render(2, 'content', self.social_network)
+        pipeline.steps = []
+        self.assertEqual(
+            rendering.render(2, 'content', self.social_network),
+            'content'
+        )
+        self.assertEqual(
+            rendering.render(2, 'new & content', self.social_network),
+            'new & content'
+        )
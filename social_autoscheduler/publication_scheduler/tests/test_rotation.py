@@ -0,0 +1,132 @@
+import random
+
+from django.core.cache import cache
+from test_plus.test import TestCase
+
+from social_autoscheduler.publication_scheduler.models import (
+    Category,
+    EngagementRollup,
+    PublishEvent,
+)
+from social_autoscheduler.publication_scheduler.publishing import (
+    pick_publication,
+)
+from social_autoscheduler.publication_scheduler.rotation import (
+    FenwickTree,
+    apply_publication_engagement,
+    get_sampler,
+    get_version_key,
+    samplers,
+)
+
+from .factories import (
+    PublicationFactory,
+    PublishEventFactory,
+    SocialNetworkFactory,
+)
+
+
+class TestFenwickTree(TestCase):
+
+    def test_find_skips_zero_weights(self):
+        tree = FenwickTree([1, 0, 2, 0, 3])
+        self.assertEqual(
+            [tree.find(value) for value in (0, 0.5, 1, 2.5, 3, 5.9)],
+            [0, 0, 2, 2, 4, 4]
+        )
+
+    def test_update(self):
+        tree = FenwickTree([1, 1, 1])
+        tree.update(1, 0)
+        tree.update(2, 5)
+        self.assertEqual(tree.total, 6)
+        self.assertEqual(tree.find(1), 2)
+
+
+class TestRotation(TestCase):
+
+    def setUp(self):
+        self.social_network = SocialNetworkFactory()
+        self.event = PublishEventFactory(social_networks=[self.social_network])
+        self.publications = [
+            PublicationFactory(
+                category=self.event.category,
+                social_networks=[self.social_network],
+            )
+            for _ in range(3)
+        ]
+
+    def test_concurrent_picks_rotate(self):
+        copy = PublishEvent.objects.get(pk=self.event.pk)
+        picks = [
+            pick_publication(self.event),
+            pick_publication(copy),
+            pick_publication(self.event),
+        ]
+        self.assertEqual(picks, self.publications)
+
+
+class TestWeightedRotation(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        samplers.clear()
+        self.social_network = SocialNetworkFactory()
+        self.event = PublishEventFactory(social_networks=[self.social_network])
+        Category.objects.filter(pk=self.event.category_id).update(
+            rotation=Category.WEIGHTED
+        )
+        self.event.category.rotation = Category.WEIGHTED
+        self.publications = [
+            PublicationFactory(
+                category=self.event.category,
+                social_networks=[self.social_network],
+            )
+            for _ in range(2)
+        ]
+        for publication, likes in zip(self.publications, (0, 1000)):
+            EngagementRollup.objects.create(
+                granularity=EngagementRollup.DAY,
+                scope=EngagementRollup.PUBLICATION,
+                scope_id=publication.pk,
+                social_network=self.social_network,
+                bucket=0,
+                posts=10,
+                likes=likes,
+            )
+
+    def test_favors_engaging_publications(self):
+        random.seed(0)
+        picks = [pick_publication(self.event) for _ in range(50)]
+        self.assertGreater(picks.count(self.publications[1]), 40)
+
+    def test_sampler_is_updated_incrementally(self):
+        sampler = get_sampler(self.event.category_id)
+        weight = sampler.tree.weights[0]
+        apply_publication_engagement({
+            (self.event.category_id, self.publications[0].pk): [1, 500],
+        })
+        self.assertGreater(
+            get_sampler(self.event.category_id).tree.weights[0],
+            weight
+        )
+
+    def test_ineligible_publications_are_skipped(self):
+        self.publications[1].social_networks.clear()
+        picks = set(pick_publication(self.event) for _ in range(10))
+        self.assertEqual(picks, {self.publications[0]})
+        self.assertGreater(
+            get_sampler(self.event.category_id).tree.weights[1],
+            0
+        )
+
+    def test_sampler_is_kept_in_process(self):
+        self.assertIs(
+            get_sampler(self.event.category_id),
+            get_sampler(self.event.category_id)
+        )
+
+    def test_sampler_is_rebuilt_on_new_version(self):
+        sampler = get_sampler(self.event.category_id)
+        cache.set(get_version_key(self.event.category_id), 'other', None)
+        self.assertIsNot(get_sampler(self.event.category_id), sampler)
@@ -0,0 +1,111 @@
+import datetime
+from unittest import mock
+
+from django.utils import timezone
+from test_plus.test import TestCase
+
+from social_autoscheduler.publication_scheduler.dispatcher import Dispatcher
+from social_autoscheduler.publication_scheduler.models import (
+    ScheduledOccurrence,
+)
+from social_autoscheduler.publication_scheduler.sharding import (
+    StaleLeaseError,
+    acquire_fencing_token,
+    assign_shards,
+    check_fencing_token,
+)
+
+from .factories import PublicationFactory, PublishEventFactory
+
+
+class TestAssignShards(TestCase):
+
+    def test_assigns_every_shard_once(self):
+        assignment = assign_shards(['a', 'b', 'c'], 64)
+        shards = [shard for owned in assignment.values() for shard in owned]
+        self.assertEqual(sorted(shards), list(range(64)))
+        self.assertTrue(all(assignment.values()))
+
+    def test_only_moves_shards_of_leaving_member(self):
+        before = assign_shards(['a', 'b', 'c'], 64)
+        after = assign_shards(['a', 'b'], 64)
+        self.assertTrue(before['a'] <= after['a'])
+        self.assertTrue(before['b'] <= after['b'])
+
+
+class TestFencingToken(TestCase):
+
+    def test_stale_token_is_rejected(self):
+        token = acquire_fencing_token(3)
+        check_fencing_token(3, token)
+        self.assertEqual(acquire_fencing_token(3), token + 1)
+        with self.assertRaises(StaleLeaseError):
+            check_fencing_token(3, token)
+
+
+class FakeLeases(object):
+    """Leases handed out without Redis.
+    """
+
+    def __init__(self, shards, tokens):
+        self.shards = shards
+        self.ttl = 10
+        self.tokens = tokens
+
+    def update(self, now):
+        return dict(self.tokens)
+
+    def release(self):
+        self.tokens = {}
+
+
+@mock.patch(
+    'social_autoscheduler.publication_scheduler.dispatcher.publish_job.delay'
+)
+class TestShardedDispatcher(TestCase):
+
+    def setUp(self):
+        self.now = timezone.now().timestamp()
+        self.events = [PublishEventFactory() for _ in range(2)]
+        for event in self.events:
+            PublicationFactory(
+                category=event.category,
+                social_networks=event.social_networks.all(),
+            )
+        self.occurrences = [
+            ScheduledOccurrence.objects.create(
+                publish_event=event,
+                fire_at=timezone.now() + datetime.timedelta(seconds=5),
+            )
+            for event in self.events
+        ]
+        self.shard = self.events[0].creator_id % 2
+        self.leases = FakeLeases(2, {
+            self.shard: acquire_fencing_token(self.shard),
+        })
+
+    def test_only_claims_owned_shards(self, delay):
+        dispatcher = Dispatcher(horizon=60, leases=self.leases, now=self.now)
+        self.assertEqual(dispatcher.step(self.now + 6), 1)
+        owned, other = self.occurrences
+        owned.refresh_from_db()
+        other.refresh_from_db()
+        self.assertIsNotNone(owned.claimed_at)
+        self.assertIsNone(other.claimed_at)
+
+    def test_claims_overdue_occurrences_of_acquired_shards(self, delay):
+        owned = self.occurrences[0]
+        ScheduledOccurrence.objects.filter(pk=owned.pk).update(
+            fire_at=timezone.now() - datetime.timedelta(minutes=1)
+        )
+        dispatcher = Dispatcher(horizon=60, leases=self.leases, now=self.now)
+        self.assertEqual(dispatcher.step(self.now), 1)
+        owned.refresh_from_db()
+        self.assertIsNotNone(owned.claimed_at)
+
+    def test_lost_lease_stops_claims(self, delay):
+        dispatcher = Dispatcher(horizon=60, leases=self.leases, now=self.now)
+        dispatcher.step(self.now)
+        acquire_fencing_token(self.shard)
+        self.assertEqual(dispatcher.step(self.now + 6), 0)
+        self.assertFalse(delay.called)
@@ -0,0 +1,90 @@
+import datetime
+
+from django.utils import timezone
+from test_plus.test import TestCase
+
+from social_autoscheduler.publication_scheduler.models import (
+    Category,
+    PublishEvent,
+)
+from social_autoscheduler.publication_scheduler.occurrences import (
+    refresh_occurrence_index,
+)
+from social_autoscheduler.publication_scheduler.simulation import (
+    Simulation,
+    create_synthetic_schedule,
+)
+
+from .factories import (
+    CategoryFactory,
+    PublicationFactory,
+    PublishEventFactory,
+    SocialNetworkFactory,
+)
+
+
+class TestSimulation(TestCase):
+
+    def setUp(self):
+        self.start = timezone.now().replace(second=0, microsecond=0)
+        social_network = SocialNetworkFactory()
+        self.category = CategoryFactory()
+        for _ in range(5):
+            PublishEventFactory(
+                start=self.start + datetime.timedelta(seconds=30),
+                category=self.category,
+                social_networks=[social_network],
+            )
+        PublicationFactory(
+            category=self.category,
+            social_networks=[social_network],
+        )
+        refresh_occurrence_index(
+            now=self.start,
+            horizon=datetime.timedelta(minutes=10)
+        )
+
+    def test_rate_limited_posts_are_deferred(self):
+        simulation = Simulation(workers=1, job_duration=1, rate=1)
+        minutes = list(simulation.run(self.start, 4))
+        self.assertEqual(
+            [(stats.claimed, stats.published, stats.deferred, stats.dropped)
+             for stats in minutes],
+            [(5, 1, 4, 0), (0, 1, 3, 0), (0, 1, 2, 0), (0, 1, 1, 0)]
+        )
+        self.assertEqual(minutes[0].queue_depth, 0)
+        self.assertEqual(minutes[0].utilization, 1 / 60)
+
+    def test_late_posts_are_dropped(self):
+        Category.objects.filter(pk=self.category.pk).update(
+            catch_up_policy=Category.SKIP,
+            lateness_tolerance=0,
+        )
+        simulation = Simulation(workers=1, job_duration=1, rate=2)
+        minutes = list(simulation.run(self.start, 2))
+        self.assertEqual(
+            [(stats.claimed, stats.published, stats.deferred, stats.dropped)
+             for stats in minutes],
+            [(5, 2, 0, 3), (0, 0, 0, 0)]
+        )
+
+    def test_jobs_wait_for_workers(self):
+        simulation = Simulation(workers=1, job_duration=30)
+        minutes = list(simulation.run(self.start, 3))
+        self.assertEqual(
+            [(stats.published, stats.queue_depth) for stats in minutes],
+            [(2, 3), (2, 1), (1, 0)]
+        )
+
+
+class TestCreateSyntheticSchedule(TestCase):
+
+    def test_events_are_weekly(self):
+        now = timezone.now()
+        create_synthetic_schedule(20, social_networks=2, now=now)
+        created, _ = refresh_occurrence_index(
+            now=now,
+            horizon=datetime.timedelta(days=7)
+        )
+        self.assertEqual(PublishEvent.objects.count(), 20)
+        self.assertEqual(created, 20)
@@ -0,0 +1,87 @@
+import datetime
+
+import pytz
+from test_plus.test import TestCase
+
+from social_autoscheduler.publication_scheduler.models import (
+    ScheduledOccurrence,
+)
+from social_autoscheduler.publication_scheduler.occurrences import (
+    refresh_occurrence_index,
+)
+from social_autoscheduler.publication_scheduler.slot_tables import (
+    get_rule_slot,
+    get_slot_table,
+)
+
+from .factories import PublishEventFactory, RuleFactory
+
+
+def utc(*args):
+    return datetime.datetime(*args, tzinfo=pytz.utc)
+
+
+class TestGetRuleSlot(TestCase):
+
+    def test_weekly_rules(self):
+        self.assertEqual(
+            get_rule_slot('WEEKLY', 'byweekday:0;byhour:9;byminute:10'),
+            55
+        )
+        self.assertIsNone(get_rule_slot('DAILY', ''))
+        self.assertIsNone(
+            get_rule_slot('WEEKLY', 'byweekday:0;byhour:9;byminute:15')
+        )
+
+
+class TestSlotTable(TestCase):
+
+    def test_summer_time_starts(self):
+        # Sunday 29 March 2026, 02:30 does not exist in Paris.
+        start, end = utc(2026, 3, 28), utc(2026, 3, 30)
+        table = get_slot_table('Europe/Paris', start, end)
+        sunday = 6 * 144
+        self.assertEqual(
+            table.get_fire_times(sunday + 9 * 6, start, end),
+            [utc(2026, 3, 29, 7)]
+        )
+        self.assertEqual(
+            table.get_fire_times(sunday + 2 * 6 + 3, start, end),
+            [utc(2026, 3, 29, 1, 30)]
+        )
+
+    def test_summer_time_ends(self):
+        # Sunday 25 October 2026, 02:30 happens twice in Paris.
+        start, end = utc(2026, 10, 24), utc(2026, 10, 26)
+        table = get_slot_table('Europe/Paris', start, end)
+        sunday = 6 * 144
+        self.assertEqual(
+            table.get_fire_times(sunday + 2 * 6 + 3, start, end),
+            [utc(2026, 10, 25, 0, 30)]
+        )
+        self.assertEqual(
+            table.get_fire_times(sunday + 9 * 6, start, end),
+            # Paris is back to UTC+1.
+            [utc(2026, 10, 25, 8)]
+        )
+
+
+class TestSlotOccurrences(TestCase):
+
+    def test_events_fire_in_creator_time_zone(self):
+        now = utc(2026, 10, 19, 12)
+        event = PublishEventFactory(
+            start=now,
+            rule=RuleFactory(
+                frequency='WEEKLY',
+                params='byweekday:1;byhour:9;byminute:0',
+            ),
+            category__created_by__time_zone='America/New_York',
+        )
+        refresh_occurrence_index(now=now, horizon=datetime.timedelta(days=14))
+        self.assertEqual(
+            list(ScheduledOccurrence.objects.filter(
+                publish_event=event
+            ).order_by('fire_at').values_list('fire_at', flat=True)),
+            [utc(2026, 10, 20, 13), utc(2026, 10, 27, 13)]
+        )
@@ -0,0 +1,189 @@
+import datetime
+
+from allauth.socialaccount.models import SocialAccount, SocialApp, SocialToken
+from django.core.cache import cache
+from django.test import override_settings
+from django.utils import timezone
+from test_plus.test import TestCase
+
+from social_autoscheduler.publication_scheduler.models import (
+    ScheduledOccurrence,
+)
+from social_autoscheduler.publication_scheduler.publishing import (
+    get_claimed_jobs,
+)
+from social_autoscheduler.publication_scheduler.social_tokens import (
+    EXPIRED_TOKEN_TTL,
+    TokenCache,
+    refresh_tokens,
+    set_token_versions,
+)
+from social_autoscheduler.users.tests.factories import UserFactory
+
+from .factories import PublicationFactory, PublishEventFactory
+from .stub_network import StubNetworkServer
+
+
+class SocialAccountMixin(object):
+
+    def setUp(self):
+        self.now = timezone.now()
+        self.app = SocialApp.objects.create(
+            provider='stub',
+            name='Stub',
+            client_id='client',
+            secret='secret',
+        )
+        self.event = PublishEventFactory()
+        self.account = self.create_account(self.event.creator)
+
+    def create_account(self, user, expires_in=datetime.timedelta(minutes=10)):
+        account = SocialAccount.objects.create(
+            user=user,
+            provider='stub',
+            uid=str(user.pk),
+        )
+        SocialToken.objects.create(
+            app=self.app,
+            account=account,
+            token='access-0',
+            token_secret='refresh-0',
+            expires_at=self.now + expires_in,
+        )
+        return account
+
+    def add_occurrence(self, delay, **kwargs):
+        return ScheduledOccurrence.objects.create(
+            publish_event=self.event,
+            fire_at=self.now + delay,
+            **kwargs
+        )
+
+
+class TestRefreshTokens(SocialAccountMixin, TestCase):
+
+    def test_refreshes_tokens_expiring_before_posts(self):
+        self.add_occurrence(datetime.timedelta(minutes=20))
+        # Expires after the horizon.
+        later_event = PublishEventFactory()
+        self.create_account(
+            later_event.creator,
+            expires_in=datetime.timedelta(hours=2)
+        )
+        ScheduledOccurrence.objects.create(
+            publish_event=later_event,
+            fire_at=self.now + datetime.timedelta(minutes=20),
+        )
+        # Has no scheduled post.
+        self.create_account(UserFactory())
+        # Expired already.
+        expired_event = PublishEventFactory()
+        self.create_account(
+            expired_event.creator,
+            expires_in=-datetime.timedelta(minutes=1)
+        )
+        ScheduledOccurrence.objects.create(
+            publish_event=expired_event,
+            fire_at=self.now + datetime.timedelta(minutes=20),
+        )
+        with StubNetworkServer() as server:
+            with override_settings(PUBLICATION_SCHEDULER_TOKEN_REFRESH_URLS={
+                    'stub': server.url + '/token',
+            }):
+                self.assertEqual(refresh_tokens(now=self.now), 1)
+        self.assertEqual(server.refreshes[0]['refresh_token'], ['refresh-0'])
+        token = SocialToken.objects.get(account=self.account)
+        self.assertEqual(token.token, 'access-1')
+        self.assertEqual(token.token_secret, 'refresh-1')
+        self.assertEqual(
+            token.expires_at,
+            self.now + datetime.timedelta(hours=1)
+        )
+
+
+class TestTokenCache(SocialAccountMixin, TestCase):
+
+    def setUp(self):
+        super(TestTokenCache, self).setUp()
+        cache.clear()
+
+    def test_tokens_are_read_again_after_ttl(self):
+        token_cache = TokenCache(ttl=60)
+        now = self.now.timestamp()
+        self.assertEqual(token_cache.get_token(self.account.pk, now), 'access-0')
+        SocialToken.objects.update(token='access-1')
+        self.assertEqual(
+            token_cache.get_token(self.account.pk, now + 30),
+            'access-0'
+        )
+        self.assertEqual(
+            token_cache.get_token(self.account.pk, now + 61),
+            'access-1'
+        )
+
+    def test_refreshed_tokens_are_read_again(self):
+        token_cache = TokenCache(ttl=60)
+        now = self.now.timestamp()
+        self.assertEqual(token_cache.get_token(self.account.pk, now), 'access-0')
+        SocialToken.objects.update(token='access-1')
+        set_token_versions([self.account.pk])
+        self.assertEqual(
+            token_cache.get_token(self.account.pk, now + 1),
+            'access-1'
+        )
+
+    def test_expired_tokens_are_cached_briefly(self):
+        token_cache = TokenCache(ttl=60)
+        SocialToken.objects.update(
+            expires_at=self.now - datetime.timedelta(minutes=1)
+        )
+        now = self.now.timestamp()
+        token_cache.get_token(self.account.pk, now)
+        with self.assertNumQueries(0):
+            token_cache.get_token(self.account.pk, now + 1)
+        with self.assertNumQueries(1):
+            token_cache.get_token(self.account.pk, now + EXPIRED_TOKEN_TTL + 1)
+
+
+class TestJobAccounts(SocialAccountMixin, TestCase):
+
+    def test_jobs_publish_with_the_creator_account(self):
+        PublicationFactory(
+            category=self.event.category,
+            social_networks=self.event.social_networks.all(),
+        )
+        occurrence = self.add_occurrence(
+            datetime.timedelta(0),
+            claimed_at=self.now
+        )
+        network = self.event.social_networks.get()
+        with override_settings(PUBLICATION_SCHEDULER_NETWORK_PROVIDERS={
+                network.name: 'stub',
+        }):
+            jobs = get_claimed_jobs([occurrence.pk])
+        self.assertEqual([job.account_pk for job in jobs], [self.account.pk])
+
+    def test_jobs_fan_out_to_event_accounts(self):
+        PublicationFactory(
+            category=self.event.category,
+            social_networks=self.event.social_networks.all(),
+        )
+        second_account = SocialAccount.objects.create(
+            user=self.event.creator,
+            provider='stub',
+            uid='second',
+        )
+        self.event.social_accounts.set([self.account, second_account])
+        occurrence = self.add_occurrence(
+            datetime.timedelta(0),
+            claimed_at=self.now
+        )
+        network = self.event.social_networks.get()
+        with override_settings(PUBLICATION_SCHEDULER_NETWORK_PROVIDERS={
+                network.name: 'stub',
+        }):
+            jobs = get_claimed_jobs([occurrence.pk])
+        self.assertEqual(
+            sorted(job.account_pk for job in jobs),
+            [self.account.pk, second_account.pk]
+        )
@@ -0,0 +1,40 @@
+from test_plus.test import TestCase
+
+from social_autoscheduler.publication_scheduler.timing_wheel import TimingWheel
+
+
+class TestTimingWheel(TestCase):
+
+    def setUp(self):
+        self.wheel = TimingWheel(tick=0.1, sizes=(10, 10, 10), now=1000)
+
+    def test_fires_within_a_tick(self):
+        self.wheel.insert('a', 1000.55, 'a')
+        self.assertEqual(self.wheel.advance(1000.5), [])
+        self.assertEqual(self.wheel.advance(1000.6), ['a'])
+        self.assertEqual(len(self.wheel), 0)
+
+    def test_cascades_from_coarse_wheels(self):
+        self.wheel.insert('a', 1042.35, 'a')
+        self.assertEqual(self.wheel.locations['a'][0], 2)
+        self.assertEqual(self.wheel.advance(1042.3), [])
+        self.assertEqual(self.wheel.locations['a'][0], 0)
+        self.assertEqual(self.wheel.advance(1042.4), ['a'])
+
+    def test_cancel_and_replace(self):
+        self.wheel.insert('a', 1005, 'a')
+        self.wheel.insert('b', 1005, 'b')
+        self.wheel.insert('b', 1007, 'b')
+        self.assertTrue(self.wheel.cancel('a'))
+        self.assertFalse(self.wheel.cancel('a'))
+        self.assertEqual(self.wheel.advance(1006), [])
+        self.assertEqual(self.wheel.advance(1008), ['b'])
+
+    def test_due_timers_fire_on_next_advance(self):
+        self.wheel.insert('a', 999, 'a')
+        self.assertIn('a', self.wheel)
+        self.assertEqual(self.wheel.advance(1000), ['a'])
+
+    def test_capacity(self):
+        with self.assertRaises(ValueError):
+            self.wheel.insert('a', 1000 + 100, 'a')
@@ -0,0 +1,121 @@
+"""Rate limiting of publications sent to social networks.
+"""
+import collections
+import heapq
+import itertools
+import time
+
+
+class TokenBucket(object):
+    """Token bucket refilled at a constant rate, up to its capacity.
+
+    Attributes:
+        rate (float): number of tokens added per second.
+        capacity (float): maximum number of tokens.
+        tokens (float): number of available tokens, negative while tokens
+            reserved in advance are not refilled yet.
+        updated_at (float): timestamp of the last refill.
+    """
+
+    def __init__(self, rate, capacity, now=None):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = now if now is not None else time.time()
+
+    def refill(self, now):
+        """Adds the tokens accumulated since the last refill.
+        """
+        if now > self.updated_at:
+            self.tokens = min(
+                self.capacity,
+                self.tokens + (now - self.updated_at) * self.rate
+            )
+            self.updated_at = now
+
+    def take(self, count=1, now=None):
+        """Takes tokens if they are available.
+
+        Returns:
+            bool: whether the tokens were taken.
+        """
+        self.refill(now if now is not None else time.time())
+        if self.tokens < count:
+            return False
+        self.tokens -= count
+        return True
+
+    def reserve(self, count=1, now=None):
+        """Takes tokens, in advance if they are not available yet.
+
+        Returns:
+            float: timestamp at which the reserved tokens are available, i.e.
+                when the action they pay for may run.
+        """
+        now = now if now is not None else time.time()
+        self.refill(now)
+        self.tokens -= count
+        if self.tokens >= 0:
+            return now
+        return now - self.tokens / self.rate
+
+
+class DeadlineQueue(object):
+    """Jobs waiting for a rate limit, served earliest deadline first.
+
+    Jobs still able to make their deadline are kept in a heap ordered by
+    deadline, then by decreasing priority, then in insertion order. Jobs whose
+    deadline passed are popped off the top of the heap by `expire`, and either
+    dropped or moved to a queue of late jobs, only served once no job is on
+    time any more.
+
+    Attributes:
+        heap (list): `(deadline, -priority, sequence, job, reschedule)` tuples
+            of the jobs on time.
+        late (:obj:`collections.deque`): late jobs, in expiration order.
+    """
+
+    def __init__(self):
+        self.heap = []
+        self.late = collections.deque()
+        self.sequence = itertools.count()
+
+    def __len__(self):
+        return len(self.heap) + len(self.late)
+
+    def push(self, job, deadline, priority=0, reschedule=True):
+        """Adds a job.
+
+        Args:
+            job: the queued job.
+            deadline (float): timestamp after which the job is late.
+            priority (int): rank of the job among jobs of equal deadline.
+            reschedule (bool): whether the job is still served once late,
+                instead of dropped.
+        """
+        heapq.heappush(
+            self.heap,
+            (deadline, -priority, next(self.sequence), job, reschedule)
+        )
+
+    def expire(self, now):
+        """Takes the jobs which missed their deadline out of the heap.
+
+        Returns:
+            list: the dropped jobs.
+        """
+        dropped = []
+        while self.heap and self.heap[0][0] < now:
+            _, _, _, job, reschedule = heapq.heappop(self.heap)
+            if reschedule:
+                self.late.append(job)
+            else:
+                dropped.append(job)
+        return dropped
+
+    def pop(self):
+        """Removes and returns the next job to serve.
+        """
+        if self.heap:
+            return heapq.heappop(self.heap)[3]
+        return self.late.popleft()
@@ -0,0 +1,128 @@
+"""Hierarchical timing wheel.
+
+Timers are kept in the slots of several wheels of increasing resolution: a
+timer far in the future sits in a coarse slot, and cascades into finer wheels
+as time advances, until it fires from the finest wheel. Inserting and
+cancelling a timer take O(1) time, and advancing the clock only visits the
+slots of elapsed ticks.
+"""
+import functools
+import operator
+
+
+class TimingWheel(object):
+    """Hierarchical timing wheel of keyed timers.
+
+    With the default sizes and a 0.1 second tick, wheels cover 10 seconds,
+    10 minutes and 1 day.
+
+    Attributes:
+        tick (float): duration of a tick of the finest wheel, in seconds.
+        sizes (list): number of slots of each wheel, from the finest.
+        current_tick (int): the last elapsed tick, counted from the epoch.
+    """
+
+    def __init__(self, tick=0.1, sizes=(100, 60, 144), now=0.0):
+        self.tick = tick
+        self.sizes = list(sizes)
+        # Number of ticks covered by a slot of each wheel.
+        self.spans = [
+            functools.reduce(operator.mul, self.sizes[:level], 1)
+            for level in range(len(self.sizes))
+        ]
+        self.wheels = [[{} for _ in range(size)] for size in self.sizes]
+        self.current_tick = self.get_tick(now)
+        self.locations = {}
+        self.expired = {}
+
+    def __len__(self):
+        return len(self.locations) + len(self.expired)
+
+    def __contains__(self, key):
+        return key in self.locations or key in self.expired
+
+    @property
+    def capacity(self):
+        """Returns how far ahead timers can always be inserted, in seconds.
+        """
+        return (self.sizes[-1] - 1) * self.spans[-1] * self.tick
+
+    def get_tick(self, timestamp):
+        return int(timestamp // self.tick)
+
+    def insert(self, key, deadline, value):
+        """Inserts a timer, replacing the timer with the same key if any.
+
+        Args:
+            key (hashable): identifier of the timer.
+            deadline (float): timestamp at which the timer fires. Timers
+                already due fire on the next `advance` call.
+            value (object): returned by `advance` when the timer fires.
+
+        Raises:
+            ValueError: if the deadline is beyond the wheel capacity.
+        """
+        self.cancel(key)
+        self.place(key, self.get_tick(deadline), value)
+
+    def place(self, key, tick, value):
+        if tick <= self.current_tick:
+            self.expired[key] = value
+            return
+        for level, (span, size) in enumerate(zip(self.spans, self.sizes)):
+            if tick // span - self.current_tick // span < size:
+                slot = tick // span % size
+                self.wheels[level][slot][key] = (tick, value)
+                self.locations[key] = (level, slot)
+                return
+        raise ValueError('Timer deadline is beyond the wheel capacity')
+
+    def cancel(self, key):
+        """Cancels a timer.
+
+        Returns:
+            bool: whether the timer was pending.
+        """
+        if key in self.expired:
+            del self.expired[key]
+            return True
+        location = self.locations.pop(key, None)
+        if location is None:
+            return False
+        level, slot = location
+        del self.wheels[level][slot][key]
+        return True
+
+    def advance(self, now):
+        """Moves the clock forward and collects the timers which fired.
+
+        Args:
+            now (float): current timestamp.
+
+        Returns:
+            list: values of the fired timers, in firing order.
+        """
+        fired = list(self.expired.values())
+        self.expired.clear()
+        target = self.get_tick(now)
+        while self.current_tick < target:
+            self.current_tick += 1
+            # Cascade coarse slots reached by the clock into finer wheels.
+            for level in range(len(self.sizes) - 1, 0, -1):
+                span = self.spans[level]
+                if self.current_tick % span:
+                    continue
+                slot = self.current_tick // span % self.sizes[level]
+                timers = self.wheels[level][slot]
+                self.wheels[level][slot] = {}
+                for key, (tick, value) in timers.items():
+                    del self.locations[key]
+                    self.place(key, tick, value)
+            slot = self.wheels[0][self.current_tick % self.sizes[0]]
+            for key in slot:
+                del self.locations[key]
+            fired.extend(value for _, value in slot.values())
+            slot.clear()
+            fired.extend(self.expired.values())
+            self.expired.clear()
+        return fired
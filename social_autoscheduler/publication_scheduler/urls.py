@@ -25,4 +25,19 @@ urlpatterns = [
         view=views.PublishEventCreate.as_view(),
         name='publish-event-create'
     ),
+    url(
+        regex=r'^event/recommendations/$',
+        view=views.SlotRecommendationView.as_view(),
+        name='slot-recommendations'
+    ),
+    url(
+        regex=r'^export/(?P<kind>\w+)\.(?P<export_format>\w+)$',
+        view=views.ExportView.as_view(),
+        name='export'
+    ),
+    url(
+        regex=r'^export/download/(?P<task_id>[\w-]+)/$',
+        view=views.ExportDownloadView.as_view(),
+        name='export-download'
+    ),
 ]
@@ -1,23 +1,37 @@
-import datetime
-
+from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.messages.views import SuccessMessageMixin
+from django.db import transaction
+from django.core.files.storage import default_storage
+from django.core.urlresolvers import reverse
+from django.http import (FileResponse, Http404, JsonResponse,
+                         StreamingHttpResponse)
+from django.utils import timezone
+from django.views.generic import View
 from django.views.generic.edit import CreateView, FormView
 
 from crispy_forms.helper import FormHelper
 from crispy_forms.layout import Submit
 from django_tables2 import SingleTableView
 
-from social_autoscheduler.publication_scheduler.forms import EventForm
+from social_autoscheduler.publication_scheduler import exports
+from social_autoscheduler.publication_scheduler.forms import (EventForm,
+                                                              PublicationForm)
 from social_autoscheduler.publication_scheduler.models import (Publication,
                                                                SocialNetwork,
-                                                               Category)
+                                                               Category,
+                                                               EngagementRollup)
+from social_autoscheduler.publication_scheduler.recommendations import (
+    get_slot_time,
+    recommend_slots,
+)
 from social_autoscheduler.publication_scheduler.tables import PublicationTable
+from social_autoscheduler.publication_scheduler.tasks import export_to_storage
 
 
-def set_initial_social_network(initial_data):
+def set_initial_social_networks(initial_data):
     if SocialNetwork.objects.count() == 1:
-        initial_data.update({'social_network': SocialNetwork.objects.get()})
+        initial_data.update({'social_networks': SocialNetwork.objects.all()})
 
 
 class CrispySubmitMixin(object):
@@ -43,30 +57,49 @@ class CrispySubmitMixin(object):
         return form
 
 
+class AtomicFormValidMixin(object):
+    """Mixin running a `FormView`'s `form_valid` in a transaction.
+
+    Requests run in autocommit mode, so use this mixin with views saving
+    several rows: the transaction only spans the writes, not the form
+    rendering.
+    """
+
+    def form_valid(self, form):
+        """Calls parent `form_valid` inside an atomic block.
+        """
+        with transaction.atomic():
+            return super().form_valid(form)
+
+
 class PublicationCreate(LoginRequiredMixin, SuccessMessageMixin,
-                        CrispySubmitMixin, CreateView):
+                        CrispySubmitMixin, AtomicFormValidMixin, CreateView):
     """View managing the creation of `Publication` instances.
     """
 
     model = Publication
-    fields = ['content', 'category', 'social_network']
+    form_class = PublicationForm
     success_url = '/'
     success_message = 'Publication created successfully'
 
     def get_initial(self):
-        """Generates initial data and sets `social_network` fields.
+        """Generates initial data and sets `social_networks` fields.
 
         Returns:
             initial_data (dict): a dict in the form `{'field_name': field_value}`
         """
         initial_data = super().get_initial()
-        set_initial_social_network(initial_data)
+        set_initial_social_networks(initial_data)
         return initial_data
 
     def form_valid(self, form):
-        """Sets `author` `Publication` field to current user then redirect to
-        success url.
+        """Stores uploaded files, sets `author` `Publication` field to current
+        user then redirect to success url.
+
+        Files are stored before the transaction saving the publication, so
+        that it is not held open while they are uploaded to the storage.
         """
+        form.store_attachments()
         form.instance.author = self.request.user
         return super().form_valid(form)
 
@@ -91,12 +124,13 @@ class PublicationList(LoginRequiredMixin, SingleTableView):
 
 
 class CategoryCreate(LoginRequiredMixin, SuccessMessageMixin,
-                     CrispySubmitMixin, CreateView):
+                     CrispySubmitMixin, AtomicFormValidMixin, CreateView):
     """View managing the creation of `Category` instances.
     """
 
     model = Category
-    fields = ['name']
+    fields = ['name', 'rotation', 'catch_up_policy', 'priority',
+              'lateness_tolerance']
     success_url = '/'
     success_message = 'Category created successfully'
 
@@ -120,11 +154,24 @@ class PublishEventCreate(LoginRequiredMixin, SuccessMessageMixin,
 
     def get_initial(self):
         """Generates initial data and adds current weekday, time and social
-        network to it.
+        network to it, in the time zone of current user.
         """
-        now = datetime.datetime.now()
+        now = timezone.localtime(
+            timezone.now(),
+            self.request.user.get_time_zone()
+        )
         initial_data = {'weekday': now.weekday(), 'time': now.time()}
-        set_initial_social_network(initial_data)
+        set_initial_social_networks(initial_data)
+        if 'social_networks' in initial_data:
+            slots = recommend_slots(
+                EngagementRollup.USER,
+                self.request.user.pk,
+                initial_data['social_networks'][0].pk,
+                count=1
+            )
+            if slots:
+                weekday, time = get_slot_time(slots[0][0])
+                initial_data.update({'weekday': weekday, 'time': time})
         return initial_data
 
     def get_form_kwargs(self):
@@ -139,3 +186,112 @@ class PublishEventCreate(LoginRequiredMixin, SuccessMessageMixin,
         """
         form.get_or_create_event()
         return super().form_valid(form)
+
+
+class SlotRecommendationView(LoginRequiredMixin, View):
+    """View returning the best weekly time slots to publish at, as JSON.
+
+    The `social_network` query parameter is required. Slots are scored from
+    the engagement of the given `category` of current user, or of all their
+    publications if no category is given.
+    """
+
+    def get(self, request, *args, **kwargs):
+        """Returns the recommended slots, best first.
+        """
+        try:
+            social_network = SocialNetwork.objects.get(
+                pk=int(request.GET.get('social_network', ''))
+            )
+            scope, scope_id = EngagementRollup.USER, request.user.pk
+            if request.GET.get('category'):
+                scope, scope_id = EngagementRollup.CATEGORY, Category.objects.get(
+                    pk=int(request.GET['category']),
+                    created_by=request.user
+                ).pk
+        except (ValueError, SocialNetwork.DoesNotExist, Category.DoesNotExist):
+            raise Http404('Unknown social network or category')
+
+        slots = []
+        for slot, score in recommend_slots(scope, scope_id, social_network.pk):
+            weekday, time = get_slot_time(slot)
+            slots.append({
+                'weekday': weekday,
+                'hour': time.hour,
+                'minute': time.minute,
+                'score': round(score, 3),
+            })
+        return JsonResponse({'slots': slots})
+
+
+class ExportView(LoginRequiredMixin, View):
+    """View exporting current user publications, categories or publish
+    events.
+
+    Exports are streamed, unless they have more rows than the
+    `PUBLICATION_SCHEDULER_EXPORT_STREAM_LIMIT` setting: they are then written
+    to the storage by a Celery task, and the view answers with the URL of
+    `ExportDownloadView` for the task.
+    """
+
+    def get(self, request, kind, export_format):
+        """Streams the export, or enqueues it for large accounts.
+        """
+        if not exports.is_supported(kind, export_format):
+            raise Http404('Unsupported export')
+        queryset = exports.EXPORTS[kind].get_queryset(request.user)
+        # Pick the database now, replica reads are only enabled while the
+        # view runs, not while the response is streamed.
+        queryset = queryset.using(queryset.db)
+        if queryset.count() > settings.PUBLICATION_SCHEDULER_EXPORT_STREAM_LIMIT:
+            path = exports.get_export_path(request.user, kind, export_format)
+            result = export_to_storage.delay(
+                request.user.pk,
+                kind,
+                export_format,
+                path
+            )
+            return JsonResponse({
+                'url': reverse('publication:export-download', kwargs={
+                    'task_id': result.id,
+                }),
+            }, status=202)
+
+        response = StreamingHttpResponse(
+            exports.encode(kind, export_format, queryset.iterator()),
+            content_type=exports.CONTENT_TYPES[export_format]
+        )
+        response['Content-Disposition'] = (
+            'attachment; filename="{0}.{1}"'.format(kind, export_format)
+        )
+        return response
+
+
+class ExportDownloadView(LoginRequiredMixin, View):
+    """View downloading an export written to the storage by a task.
+
+    The stored file is looked up in the task result, as the storage may have
+    saved it under another name than the requested one.
+    """
+
+    def get(self, request, task_id):
+        """Serves the stored export once written, or answers with the task
+        status.
+        """
+        result = export_to_storage.AsyncResult(task_id)
+        if not result.ready():
+            return JsonResponse({'status': result.status}, status=202)
+        if not result.successful():
+            raise Http404('Export failed')
+        path = result.result['path']
+        if not exports.is_export_of(request.user, path):
+            raise Http404('Unknown export')
+        export_format = path.rsplit('.', 1)[-1]
+        response = FileResponse(
+            default_storage.open(path),
+            content_type=exports.CONTENT_TYPES[export_format]
+        )
+        response['Content-Disposition'] = (
+            'attachment; filename="{0}"'.format(path.rsplit('/', 1)[-1])
+        )
+        return response
@@ -0,0 +1,92 @@
+"""Preloading of worker processes, and measurement of their boot.
+
+Prefork workers import the task modules in the main process, then fork their
+child processes, which share its memory pages until they write to them. The
+garbage collector writes to the header of every object it visits, so a
+collection in a child unshares the pages of everything inherited from the
+main process. Preloaded objects are therefore frozen out of the collector
+before forking, with the collector disabled meanwhile so that no page gets
+holes freed by a collection.
+
+Run as a script, this module boots Django with the current settings, forks
+children and prints the boot time and memory usage as JSON.
+"""
+import gc
+import json
+import os
+import sys
+import time
+
+
+def preload_worker():
+    """Preloads the publishing path and freezes it out of the collector.
+    """
+    from social_autoscheduler.publication_scheduler import publishing
+
+    gc.disable()
+    publishing.preload()
+    if hasattr(gc, 'freeze'):
+        gc.freeze()
+    gc.enable()
+
+
+def get_memory_usage(pid='self'):
+    """Returns the memory usage of a process, from `/proc`.
+
+    Returns:
+        dict: the `rss`, `shared` and `private` memory, in kB.
+    """
+    usage = {'rss': 0, 'shared': 0, 'private': 0}
+    with open('/proc/{0}/smaps_rollup'.format(pid)) as smaps:
+        for line in smaps:
+            name, _, value = line.partition(':')
+            if name == 'Rss':
+                usage['rss'] = int(value.split()[0])
+            elif name.startswith('Shared_'):
+                usage['shared'] += int(value.split()[0])
+            elif name.startswith('Private_'):
+                usage['private'] += int(value.split()[0])
+    return usage
+
+
+def measure_boot(children=4):
+    """Boots Django like a worker, then forks children like the prefork pool.
+
+    Each child runs a garbage collection, as any long enough task would, then
+    reports its memory usage.
+
+    Returns:
+        dict: the `boot_time` in seconds, the memory usage of the `main`
+            process and the list of memory usages of the `children`.
+    """
+    started_at = time.perf_counter()
+    import django
+    django.setup()
+    from django.conf import settings
+    import social_autoscheduler.publication_scheduler.tasks  # noqa
+    if settings.WORKER_PRELOAD:
+        preload_worker()
+    boot_time = time.perf_counter() - started_at
+
+    usages = []
+    for _ in range(children):
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if not pid:
+            os.close(read_fd)
+            gc.collect()
+            os.write(write_fd, json.dumps(get_memory_usage()).encode())
+            os._exit(0)
+        os.close(write_fd)
+        with os.fdopen(read_fd) as reader:
+            usages.append(json.loads(reader.read()))
+        os.waitpid(pid, 0)
+    return {
+        'boot_time': boot_time,
+        'main': get_memory_usage(),
+        'children': usages,
+    }
+
+
+if __name__ == '__main__':
+    print(json.dumps(measure_boot(int(sys.argv[1]) if len(sys.argv) > 1 else 4)))
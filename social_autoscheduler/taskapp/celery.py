@@ -2,9 +2,12 @@
 from __future__ import absolute_import
 import os
 from celery import Celery
+from celery.signals import worker_init
 from django.apps import apps, AppConfig
 from django.conf import settings
 
+from social_autoscheduler.taskapp.boot import preload_worker
+
 
 if not settings.configured:
     # set the default Django settings module for the 'celery' program.
@@ -30,6 +33,13 @@ class CeleryConfig(AppConfig):
         
 
 
+@worker_init.connect
+def on_worker_init(**kwargs):
+    # Runs in the main worker process, before the pool forks.
+    if settings.WORKER_PRELOAD:
+        preload_worker()
+
+
 @app.task(bind=True)
 def debug_task(self):
     print('Request: {0!r}'.format(self.request))  # pragma: no cover
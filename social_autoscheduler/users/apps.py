@@ -10,4 +10,10 @@ class UsersConfig(AppConfig):
             Users system checks
             Users signal registration
         """
-        pass
+        from django.db.models.signals import post_delete, post_save
+
+        from .backends import invalidate_cached_user
+        from .models import User
+
+        post_save.connect(invalidate_cached_user, sender=User)
+        post_delete.connect(invalidate_cached_user, sender=User)
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.db import router
+
+from allauth.account.auth_backends import AuthenticationBackend
+
+USER_CACHE_TIMEOUT = 60 * 60
+
+# Fields never written to the shared cache.
+UNCACHED_USER_FIELDS = ('password',)
+
+
+def get_version_key(user_id):
+    return 'users:version:{0}'.format(user_id)
+
+
+def get_user_key(user_id, version):
+    return 'users:{0}:{1}'.format(user_id, version)
+
+
+def invalidate_cached_user(sender, instance, **kwargs):
+    """Signal receiver bumping the cached version of a saved or deleted user.
+
+    Cached copies of older versions are never read again and expire on their
+    own, so a concurrent request cannot put a stale copy back in the cache.
+    """
+    key = get_version_key(instance.pk)
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+
+def dump_user(user):
+    """Returns the cached representation of a user.
+
+    The password hash is left out, only the session hash derived from it is
+    kept to verify sessions.
+
+    Returns:
+        dict: the cached field values, by attribute name, and the session
+            hash.
+    """
+    return {
+        'fields': [
+            (field.attname, getattr(user, field.attname))
+            for field in user._meta.concrete_fields
+            if field.attname not in UNCACHED_USER_FIELDS
+        ],
+        'session_auth_hash': user.get_session_auth_hash(),
+    }
+
+
+def load_user(data):
+    """Builds a user from its cached representation.
+
+    Fields which are not cached are deferred, and loaded on access.
+    """
+    UserModel = get_user_model()
+    user = UserModel.from_db(
+        router.db_for_read(UserModel),
+        [name for name, _ in data['fields']],
+        [value for _, value in data['fields']],
+    )
+    user.cached_session_auth_hash = data['session_auth_hash']
+    return user
+
+
+class CachedUserMixin(object):
+    """Authentication backend mixin loading users from the cache.
+
+    `AuthenticationMiddleware` loads the user of every authenticated request
+    through its backend `get_user` method: with a warm cache, this takes no
+    database query. Password hashes are never cached.
+    """
+
+    def get_user(self, user_id):
+        version = cache.get(get_version_key(user_id))
+        if version is None:
+            version = 1
+            cache.add(get_version_key(user_id), version, None)
+        key = get_user_key(user_id, version)
+        data = cache.get(key)
+        if data is None:
+            user = super().get_user(user_id)
+            if user is None:
+                return None
+            cache.set(key, dump_user(user), USER_CACHE_TIMEOUT)
+        else:
+            user = load_user(data)
+        return user if self.user_can_authenticate(user) else None
+
+
+class CachedModelBackend(CachedUserMixin, ModelBackend):
+    pass
+
+
+class CachedAuthenticationBackend(CachedUserMixin, AuthenticationBackend):
+    pass
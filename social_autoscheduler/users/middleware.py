@@ -0,0 +1,18 @@
+from django.utils import timezone
+
+
+class TimeZoneMiddleware(object):
+    """Middleware activating the time zone of the authenticated user.
+
+    Dates are then rendered and form inputs parsed in the user's local time.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.user.is_authenticated:
+            timezone.activate(request.user.get_time_zone())
+        else:
+            timezone.deactivate()
+        return self.get_response(request)
@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11 on 2026-10-19 19:05
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import pytz
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='time_zone',
+            field=models.CharField(choices=[(name, name) for name in pytz.common_timezones], default='Europe/Paris', max_length=64, verbose_name='Time zone'),
+        ),
+    ]
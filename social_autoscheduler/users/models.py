@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals, absolute_import
 
+import pytz
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser
 from django.core.urlresolvers import reverse
 from django.db import models
@@ -8,15 +10,37 @@ from django.utils.encoding import python_2_unicode_compatible
 from django.utils.translation import ugettext_lazy as _
 
 
+TIME_ZONE_CHOICES = [(name, name) for name in pytz.common_timezones]
+
+
 @python_2_unicode_compatible
 class User(AbstractUser):
 
     # First Name and Last Name do not cover name patterns
     # around the globe.
     name = models.CharField(_('Name of User'), blank=True, max_length=255)
+    # Local time of publish events, views and exports.
+    time_zone = models.CharField(
+        _('Time zone'),
+        max_length=64,
+        choices=TIME_ZONE_CHOICES,
+        default=settings.TIME_ZONE
+    )
 
     def __str__(self):
         return self.username
 
+    def get_session_auth_hash(self):
+        # Users loaded from the cache have no password hash, only the session
+        # hash derived from it.
+        if 'password' in self.get_deferred_fields():
+            cached = getattr(self, 'cached_session_auth_hash', None)
+            if cached is not None:
+                return cached
+        return super().get_session_auth_hash()
+
+    def get_time_zone(self):
+        return pytz.timezone(self.time_zone)
+
     def get_absolute_url(self):
         return reverse('users:detail', kwargs={'username': self.username})
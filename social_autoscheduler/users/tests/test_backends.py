@@ -0,0 +1,43 @@
+from django.core.cache import cache
+
+from test_plus.test import TestCase
+
+from ..backends import CachedModelBackend, get_user_key
+
+
+class TestCachedModelBackend(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = self.make_user()
+        self.backend = CachedModelBackend()
+
+    def test_get_user_uses_cache_when_warm(self):
+        self.backend.get_user(self.user.pk)
+        with self.assertNumQueries(0):
+            user = self.backend.get_user(self.user.pk)
+        self.assertEqual(user, self.user)
+
+    def test_password_hash_is_not_cached(self):
+        self.backend.get_user(self.user.pk)
+        data = cache.get(get_user_key(self.user.pk, 1))
+        self.assertNotIn('password', dict(data['fields']))
+        with self.assertNumQueries(0):
+            user = self.backend.get_user(self.user.pk)
+            self.assertEqual(
+                user.get_session_auth_hash(),
+                self.user.get_session_auth_hash()
+            )
+
+    def test_saving_user_invalidates_cache(self):
+        self.backend.get_user(self.user.pk)
+        self.user.name = 'New name'
+        self.user.save()
+        with self.assertNumQueries(1):
+            user = self.backend.get_user(self.user.pk)
+        self.assertEqual(user.name, 'New name')
+
+    def test_inactive_user_is_not_returned(self):
+        self.user.is_active = False
+        self.user.save()
+        self.assertIsNone(self.backend.get_user(self.user.pk))